@@ -1,4 +1,6 @@
 from django.contrib import admin
-from .models import Test, TestQuestion
+from .models import QuestionAllocator, QuestionVariant, Test, TestQuestion
 admin.site.register(Test)
 admin.site.register(TestQuestion)
+admin.site.register(QuestionVariant)
+admin.site.register(QuestionAllocator)
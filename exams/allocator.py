@@ -0,0 +1,118 @@
+# exams/allocator.py
+"""
+Распределитель вариантов: соседи по группе не должны получать одинаковые параметры.
+
+Случайный выбор из маленького пространства сталкивается часто (14 вариантов —
+уже у 5 студентов из группы вероятность совпадения больше половины). Вместо этого
+у каждого (тест, вопрос) есть QuestionAllocator со счётчиком выданных слотов:
+  - slot = issued++  — один атомарный UPDATE одной строки, без сканов таблиц;
+  - slot -> номер кортежа в индексе параметров (param_index) аффинной перестановкой
+        i = (stride * slot + offset) mod size,   gcd(stride, size) = 1,
+    так что первые size слотов дают size различных кортежей, а дальше круг
+    повторяется: каждый кортеж выдан либо k, либо k+1 раз — совпадения распределены
+    равномерно. stride/offset свои у каждого вопроса (от id теста и номера вопроса),
+    поэтому порядок выдачи не повторяется между тестами;
+  - сид шагов слота — derive_seed("slot", question.id, slot): на втором круге у тех же
+    параметров другие n для a_n/S_n.
+Занятость хранить не нужно: она однозначно задаётся счётчиком. Тест привязан к одной
+группе, поэтому различие «внутри группы» = различие внутри (тест, вопрос).
+Темы без param_space: слот даёт только сид, параметры выбирает генератор (без гарантий).
+То же, если полное пространство темы больше MAX_INDEX_ROWS: индекс строится прямо
+в запросе старта попытки, и огромное пространство повесило бы воркер.
+
+settings.QUESTION_ALLOCATOR = {"MAX_INDEX_ROWS": 200000}
+"""
+import math
+from typing import Any, Dict, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from generator_app.seeding import derive_seed
+from generator_app.variants import topic_index, topic_space_size
+
+from .models import QuestionAllocator, TestQuestion
+
+DEFAULTS = {"MAX_INDEX_ROWS": 200000}
+
+
+def allocator_settings() -> Dict[str, Any]:
+    from django.conf import settings
+    return {**DEFAULTS, **(getattr(settings, "QUESTION_ALLOCATOR", {}) or {})}
+
+
+def question_complexity(question) -> Optional[int]:
+    return (question.payload_json or {}).get("complexity")
+
+
+def question_formula_steps(question) -> bool:
+    """Флаг вопроса: добавлять шаги-формулы (type="formula", проверка identity.py)."""
+    return bool((question.payload_json or {}).get("formula_steps"))
+
+
+def _permutation(question: TestQuestion, size: Optional[int]) -> Tuple[int, int]:
+    """(stride, offset) для вопроса: stride взаимно прост с size."""
+    if not size:
+        return 1, 0
+    stride = derive_seed("alloc-stride", question.test_id, question.order) % size or 1
+    while math.gcd(stride, size) != 1:
+        stride = stride % size + 1
+    return stride, derive_seed("alloc-offset", question.test_id, question.order) % size
+
+
+def _index_size(question: TestQuestion) -> Optional[int]:
+    """Число кортежей в индексе темы; None — индекса нет или он слишком большой (только сид)."""
+    complexity = question_complexity(question)
+    full = topic_space_size(question.topic_id, complexity)
+    limit = allocator_settings()["MAX_INDEX_ROWS"]
+    if full is None:
+        return None
+    if limit and full > limit:
+        print(f"⚠️ Распределитель: у темы {question.topic_id} (сложность {complexity}) "
+              f"{full} кортежей > MAX_INDEX_ROWS={limit} — слоты только по сиду")
+        return None
+    index = topic_index(question.topic_id, complexity)
+    return len(index) if index is not None and len(index) else None
+
+
+def get_allocator(question: TestQuestion) -> QuestionAllocator:
+    """Распределитель вопроса (создаётся при первом обращении)."""
+    found = QuestionAllocator.objects.filter(question=question).first()
+    if found is not None:
+        return found
+    size = _index_size(question)
+    stride, offset = _permutation(question, size)
+    try:
+        with transaction.atomic():
+            return QuestionAllocator.objects.create(question=question, size=size, stride=stride, offset=offset)
+    except IntegrityError:
+        return QuestionAllocator.objects.get(question=question)     # параллельно уже создали
+
+
+def next_slot(question: TestQuestion) -> Tuple[QuestionAllocator, int]:
+    """Следующий слот вопроса (атомарно): -> (распределитель, slot)."""
+    alloc = get_allocator(question)
+    with transaction.atomic():
+        QuestionAllocator.objects.filter(pk=alloc.pk).update(issued=F("issued") + 1)
+        alloc.issued = QuestionAllocator.objects.values_list("issued", flat=True).get(pk=alloc.pk)
+    return alloc, alloc.issued - 1
+
+
+def slot_params(alloc: QuestionAllocator, question: TestQuestion, slot: int) -> Optional[Dict[str, Any]]:
+    """Кортеж параметров слота; None — у темы нет индекса (параметры выберет генератор)."""
+    if not alloc.size:
+        return None
+    index = topic_index(question.topic_id, question_complexity(question))
+    if index is None or len(index) != alloc.size:
+        return None     # пространство темы поменялось после создания распределителя
+    return index.at((alloc.stride * slot + alloc.offset) % alloc.size)
+
+
+def slot_seed(question: TestQuestion, slot: int) -> int:
+    return derive_seed("slot", question.id, slot)
+
+
+def slot_job(alloc: QuestionAllocator, question: TestQuestion, slot: int) -> tuple:
+    """Аргументы compile_question_job для слота."""
+    return (question.topic_id, question_complexity(question), slot_seed(question, slot),
+            slot_params(alloc, question, slot), question_formula_steps(question))
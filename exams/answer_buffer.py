@@ -0,0 +1,288 @@
+# exams/answer_buffer.py
+"""
+Буфер ответов (write-behind) на пик экзамена: ответ на шаг сначала попадает в кэш,
+а в TestAnswer уходит пачками.
+
+Когда вся группа пишет один тест, каждый ответ — отдельная запись в БД, и на SQLite
+запросы упираются в "database is locked". С буфером (settings.ANSWER_BUFFER["ENABLED"]):
+  - запись ответа — три операции кэша (Django cache framework, CACHES[ALIAS]):
+        incr  seq                          — номер записи в журнале;
+        set   s:<attempt>:<order>:<key>    — последняя версия строки шага (по ней же читает плеер);
+        set   j:<seq>                      — журнал: какой шаг поменялся;
+  - фоновый поток раз в FLUSH_INTERVAL секунд читает журнал от последнего сброса,
+    берёт последние версии изменённых шагов и пишет их в TestAnswer одной транзакцией
+    (upsert пачками по BATCH_SIZE), после чего чистит журнал и сброшенные версии;
+  - плеер (exams/answers.py) накладывает ещё не сброшенные версии поверх строк БД,
+    так что студент сразу видит свой ответ;
+  - api_finish_attempt сбрасывает все шаги своей попытки сам, не дожидаясь потока
+    (flush_attempt), а регрейд сначала сбрасывает весь журнал.
+
+Гарантии сохранности (что можно потерять):
+  - ответ, на который студент получил ответ сервера, до сброса живёт только в кэше:
+    падение процесса (LocMemCache) или рестарт кэша без персистентности (Redis/Memcached)
+    теряет не больше FLUSH_INTERVAL секунд ответов (плюс время самого сброса);
+  - вытеснение из кэша (MAX_ENTRIES, TIMEOUT) до сброса — тоже потеря: держите под буфер
+    отдельный алиас с запасом MAX_ENTRIES и TIMEOUT много больше FLUSH_INTERVAL;
+  - завершённая попытка не теряет ничего: finish сбрасывает все её шаги в БД до того,
+    как посчитать баллы, а ошибка сброса — 503, попытка остаётся незавершённой;
+  - LocMemCache — только для одного процесса (runserver, один воркер): у каждого
+    процесса свой кэш, и другой воркер чужих несброшенных ответов не увидит.
+    Несколько воркеров — только общий кэш (Redis/Memcached);
+  - порядок: в БД оказывается последняя версия ответа на шаг, как и при прямой записи.
+    Если кэш недоступен, ответ пишется в БД сразу (как без буфера).
+
+settings.ANSWER_BUFFER = {"ENABLED": False, "ALIAS": "answer_buffer", "FLUSH_INTERVAL": 2.0,
+                          "BATCH_SIZE": 500, "TIMEOUT": 3600, "GAP_TIMEOUT": 30.0}
+"""
+import atexit
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import close_old_connections, connection, transaction
+
+from .models import TestAnswer
+
+DEFAULTS = {"ENABLED": False, "ALIAS": "answer_buffer", "FLUSH_INTERVAL": 2.0,
+            "BATCH_SIZE": 500, "TIMEOUT": 3600, "GAP_TIMEOUT": 30.0}
+KEY_PREFIX = "ansbuf:v1:"
+SEQ_KEY = KEY_PREFIX + "seq"          # последний выданный номер записи журнала
+DONE_KEY = KEY_PREFIX + "done"        # журнал сброшен по этот номер включительно
+LOCK_KEY = KEY_PREFIX + "lock"        # сбрасывает один процесс за раз
+LOCK_TIMEOUT = 60
+ROW_FIELDS = ("value", "is_correct", "score_awarded", "max_score", "feedback")
+
+
+def buffer_settings() -> Dict[str, Any]:
+    from django.conf import settings
+    return {**DEFAULTS, **(getattr(settings, "ANSWER_BUFFER", {}) or {})}
+
+
+def enabled() -> bool:
+    return bool(buffer_settings()["ENABLED"])
+
+
+def _cache():
+    from django.core.cache import caches
+    return caches[buffer_settings()["ALIAS"]]
+
+
+def step_cache_key(attempt_id: int, order: int, subq_key: str) -> str:
+    return f"{KEY_PREFIX}s:{attempt_id}:{order}:{subq_key}"
+
+
+def _journal_key(seq: int) -> str:
+    return f"{KEY_PREFIX}j:{seq}"
+
+
+def _to_dict(row: TestAnswer, seq: int) -> Dict[str, Any]:
+    out = {f: getattr(row, f) for f in ROW_FIELDS}
+    out.update(attempt_id=row.attempt_id, question_order=row.question_order, subq_key=row.subq_key, seq=seq)
+    return out
+
+
+def _to_row(entry: Dict[str, Any]) -> TestAnswer:
+    return TestAnswer(attempt_id=entry["attempt_id"], question_order=entry["question_order"],
+                      subq_key=entry["subq_key"], **{f: entry[f] for f in ROW_FIELDS})
+
+
+# ---------- запись ----------
+def write(rows: List[TestAnswer]) -> None:
+    """Ответы в буфер; кэш недоступен — сразу в БД."""
+    from .answers import upsert
+
+    conf = buffer_settings()
+    try:
+        cache = _cache()
+        cache.add(SEQ_KEY, 0, None)
+        for row in rows:
+            seq = cache.incr(SEQ_KEY)
+            cache.set(step_cache_key(row.attempt_id, row.question_order, row.subq_key), _to_dict(row, seq),
+                      conf["TIMEOUT"])
+            cache.set(_journal_key(seq), step_cache_key(row.attempt_id, row.question_order, row.subq_key),
+                      conf["TIMEOUT"])
+    except Exception as e:
+        print(f"⚠️ Буфер ответов: кэш недоступен ({e}) — пишем в БД сразу")
+        upsert(rows)
+        return
+    get_flusher().ensure_started()
+
+
+# ---------- чтение ----------
+def overlay(attempt_id: int, keys: Iterable[tuple], rows: Iterable[TestAnswer]) -> List[TestAnswer]:
+    """Строки БД + ещё не сброшенные версии шагов keys = [(order, subq_key), ...] поверх них."""
+    rows = list(rows)
+    cache_keys = [step_cache_key(attempt_id, order, k) for order, k in keys]
+    if not cache_keys:
+        return rows
+    try:
+        found = _cache().get_many(cache_keys)
+    except Exception:
+        return rows
+    if not found:
+        return rows
+    merged = {(r.question_order, r.subq_key): r for r in rows}
+    for entry in found.values():
+        merged[(entry["question_order"], entry["subq_key"])] = _to_row(entry)
+    return list(merged.values())
+
+
+# ---------- сброс ----------
+class FlushStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.flushes = self.rows = self.lost = 0
+        self.max_seconds = 0.0
+
+    def record(self, rows: int, lost: int, seconds: float) -> None:
+        with self._lock:
+            self.flushes += 1
+            self.rows += rows
+            self.lost += lost
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"flushes": self.flushes, "rows": self.rows, "lost": self.lost,
+                    "max_ms": round(1000 * self.max_seconds, 2)}
+
+
+flush_stats = FlushStats()
+_gap: Dict[str, Any] = {"seq": None, "since": 0.0}     # первая «дыра» журнала и с какого момента она висит
+
+
+def _persist(entries: List[Dict[str, Any]]) -> None:
+    from .answers import upsert
+
+    with transaction.atomic():
+        upsert([_to_row(e) for e in entries])
+
+
+def _forget(cache, entries: List[Dict[str, Any]], upto: int) -> None:
+    """Убрать сброшенные версии (если после сброса шаг не перезаписали более новой)."""
+    keys = [step_cache_key(e["attempt_id"], e["question_order"], e["subq_key"]) for e in entries]
+    current = cache.get_many(keys)
+    cache.delete_many([k for k in keys if k in current and current[k]["seq"] <= upto])
+
+
+def flush(force: bool = False) -> int:
+    """
+    Сбрасывает журнал в TestAnswer; -> сколько строк записано.
+    force — ждать, если сейчас сбрасывает другой процесс/поток (регрейд), иначе пропустить.
+    """
+    conf = buffer_settings()
+    cache = _cache()
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(LOCK_KEY, os.getpid(), LOCK_TIMEOUT):
+        if not force or time.monotonic() > deadline:
+            return 0
+        time.sleep(0.01)
+
+    t0 = time.perf_counter()
+    written = lost = 0
+    try:
+        head = cache.get(SEQ_KEY) or 0
+        done = cache.get(DONE_KEY) or 0
+        while done < head:
+            upto = min(head, done + int(conf["BATCH_SIZE"]))
+            journal = cache.get_many([_journal_key(s) for s in range(done + 1, upto + 1)])
+            step_keys, last = [], done
+            for seq in range(done + 1, upto + 1):
+                key = journal.get(_journal_key(seq))
+                if key is None:
+                    # номер уже выдан, а запись ещё не легла (писатель между incr и set) — ждём;
+                    # висит дольше GAP_TIMEOUT — запись вытеснена из кэша, пропускаем
+                    if _gap["seq"] != seq:
+                        _gap.update(seq=seq, since=time.monotonic())
+                    if time.monotonic() - _gap["since"] < conf["GAP_TIMEOUT"]:
+                        break
+                    lost += 1
+                else:
+                    step_keys.append(key)
+                last = seq
+            if last == done:
+                break
+            entries = list(cache.get_many(list(dict.fromkeys(step_keys))).values())
+            if entries:
+                _persist(entries)
+                _forget(cache, entries, last)
+            cache.delete_many([_journal_key(s) for s in range(done + 1, last + 1)])
+            cache.set(DONE_KEY, last, None)
+            written += len(entries)
+            done = last
+    finally:
+        cache.delete(LOCK_KEY)
+    if written or lost:
+        flush_stats.record(written, lost, time.perf_counter() - t0)
+    if lost:
+        print(f"⚠️ Буфер ответов: {lost} записей журнала пропали из кэша до сброса")
+    return written
+
+
+def flush_attempt(attempt, questions) -> int:
+    """Все несброшенные шаги попытки — в TestAnswer сейчас же (api_finish_attempt); -> строк."""
+    if not enabled():
+        return 0
+    from .answers import step_key
+    from .materialize import question_payload
+
+    q_states = (attempt.answers_json or {}).get("questions") or {}
+    keys = []
+    for q in questions:
+        steps = question_payload(q, q_states.get(str(q.order))).get("steps") or []
+        keys.extend(step_cache_key(attempt.id, q.order, step_key(s, i)) for i, s in enumerate(steps))
+    cache = _cache()
+    entries = list(cache.get_many(keys).values()) if keys else []
+    if entries:
+        _persist(entries)
+        # версии не удаляем: журнал ещё ссылается на них и сбросит их (повторно, upsert идемпотентен)
+    return len(entries)
+
+
+# ---------- фоновый поток ----------
+class BufferFlusher:
+    """Поток, который раз в FLUSH_INTERVAL секунд сбрасывает журнал буфера в БД."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="answer-buffer", daemon=True)
+                self._thread.start()
+                atexit.register(_flush_at_exit)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(float(buffer_settings()["FLUSH_INTERVAL"]))
+            try:
+                close_old_connections()
+                flush()
+            except Exception as e:
+                print(f"⚠️ Буфер ответов: сброс упал: {e}")
+            finally:
+                connection.close()      # поток живёт долго — соединение не держим
+
+
+def _flush_at_exit() -> None:
+    """Штатная остановка воркера: дописать то, что успели принять."""
+    try:
+        flush(force=True)
+    except Exception as e:
+        print(f"⚠️ Буфер ответов: сброс при остановке упал: {e}")
+
+
+_flusher: Optional[BufferFlusher] = None
+_flusher_pid: Optional[int] = None
+
+
+def get_flusher() -> BufferFlusher:
+    global _flusher, _flusher_pid
+    if _flusher is None or _flusher_pid != os.getpid():
+        _flusher, _flusher_pid = BufferFlusher(), os.getpid()
+    return _flusher
@@ -0,0 +1,158 @@
+# exams/answers.py
+"""
+Ответы попытки построчно в TestAnswer вместо перезаписи всего answers_json.
+
+Раньше каждый ответ на шаг читал состояние попытки целиком, менял один шаг и
+сохранял весь blob обратно: запись росла с размером теста, а два одновременных
+ответа (две вкладки, повтор запроса) затирали друг друга. Теперь:
+  - ответ на шаг — один upsert строки TestAnswer(attempt, question_order, subq_key)
+    (INSERT ... ON CONFLICT DO UPDATE), остальные строки не трогаются;
+  - в answers_json остаётся только то, что не меняется после старта:
+        answers_json["questions"]["<order>"] = {"max_points": ..., "payload": {...}}
+  - состояние плеера выводится из строк: шаги без строки — без ответа,
+    current_step — число верных шагов подряд с начала (перейти к следующему
+    шагу можно только после верного ответа), done — все шаги пройдены.
+Вид состояния тот же, что был в blob'е:
+    {"current_step", "done", "max_points", "steps": [{"key", "value", "ok", "score"}], "payload"}
+Старые blob'ы переводит миграция 0005_answers_to_rows.
+С settings.ANSWER_BUFFER["ENABLED"] ответы пишутся через буфер в кэше (exams/answer_buffer.py),
+и несброшенные версии шагов накладываются поверх строк БД при чтении.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from asgiref.sync import sync_to_async
+
+from . import answer_buffer
+from .materialize import question_payload
+from .models import TestAnswer, TestAttempt
+
+UPSERT_FIELDS = ["value", "is_correct", "score_awarded", "max_score", "feedback"]
+
+
+def step_key(step: Dict[str, Any], idx: int) -> str:
+    return step.get("key") or f"step{idx + 1}"
+
+
+def step_row(attempt: TestAttempt, order: int, steps: List[Dict[str, Any]], idx: int,
+             value: Any, res: Dict[str, Any]) -> TestAnswer:
+    """Строка ответа на шаг idx по результату check_step."""
+    step = steps[idx]
+    return TestAnswer(
+        attempt=attempt,
+        question_order=order,
+        subq_key=step_key(step, idx),
+        value="" if value is None else str(value),
+        is_correct=bool(res.get("ok")),
+        score_awarded=float(res.get("score", 0.0)),
+        max_score=float(step.get("points", 0)),
+        feedback=res.get("explain") or "",
+    )
+
+
+def _upsert_kwargs() -> Dict[str, Any]:
+    return {"update_conflicts": True, "unique_fields": ["attempt", "question_order", "subq_key"],
+            "update_fields": UPSERT_FIELDS}
+
+
+def upsert(rows: List[TestAnswer]) -> None:
+    if rows:
+        TestAnswer.objects.bulk_create(rows, **_upsert_kwargs())
+
+
+async def aupsert(rows: List[TestAnswer]) -> None:
+    if rows:
+        await TestAnswer.objects.abulk_create(rows, **_upsert_kwargs())
+
+
+def save(rows: List[TestAnswer]) -> None:
+    """Ответы на шаги из view: через буфер, если он включён, иначе сразу upsert."""
+    if answer_buffer.enabled():
+        answer_buffer.write(rows)
+    else:
+        upsert(rows)
+
+
+async def asave(rows: List[TestAnswer]) -> None:
+    if answer_buffer.enabled():
+        await sync_to_async(answer_buffer.write)(rows)
+    else:
+        await aupsert(rows)
+
+
+def _buffered(attempt: TestAttempt, order: int, payload: Dict[str, Any], rows) -> Iterable[TestAnswer]:
+    if not answer_buffer.enabled():
+        return rows
+    keys = [(order, step_key(s, i)) for i, s in enumerate(payload.get("steps") or [])]
+    return answer_buffer.overlay(attempt.id, keys, rows)
+
+
+# ---------- состояние из строк ----------
+def derive_state(q_state: Optional[Dict[str, Any]], payload: Dict[str, Any],
+                 rows: Iterable[TestAnswer]) -> Dict[str, Any]:
+    """Состояние вопроса: неизменная часть из answers_json + шаги из строк TestAnswer."""
+    steps = payload.get("steps") or []
+    by_key = {r.subq_key: r for r in rows}
+    steps_state = []
+    for i, step in enumerate(steps):
+        key = step_key(step, i)
+        r = by_key.get(key)
+        steps_state.append({
+            "key": key,
+            "value": r.value if r is not None else None,
+            "ok": r.is_correct if r is not None else False,
+            "score": r.score_awarded if r is not None else 0.0,
+        })
+    current = 0
+    while current < len(steps_state) and steps_state[current]["ok"]:
+        current += 1
+    max_points = (q_state or {}).get("max_points")
+    return {
+        "current_step": current,
+        "done": current >= len(steps_state),
+        "max_points": float(max_points if max_points is not None else sum(float(s.get("points", 0)) for s in steps)),
+        "steps": steps_state,
+        "payload": payload,
+    }
+
+
+def question_state(attempt: TestAttempt, question) -> Optional[Dict[str, Any]]:
+    """Состояние одного вопроса попытки (один запрос по уникальному индексу); None — вопрос не собран."""
+    q_state = ((attempt.answers_json or {}).get("questions") or {}).get(str(question.order))
+    if not q_state:
+        return None
+    payload = question_payload(question, q_state)
+    rows = TestAnswer.objects.filter(attempt=attempt, question_order=question.order)
+    return derive_state(q_state, payload, _buffered(attempt, question.order, payload, rows))
+
+
+async def aquestion_state(attempt: TestAttempt, question) -> Optional[Dict[str, Any]]:
+    q_state = ((attempt.answers_json or {}).get("questions") or {}).get(str(question.order))
+    if not q_state:
+        return None
+    payload = question_payload(question, q_state)
+    rows = [r async for r in TestAnswer.objects.filter(attempt=attempt, question_order=question.order)]
+    return derive_state(q_state, payload, _buffered(attempt, question.order, payload, rows))
+
+
+def attempt_state(attempt: TestAttempt, questions=None, rows: Optional[Iterable[TestAnswer]] = None) -> Dict[str, Any]:
+    """
+    Состояние всей попытки в прежнем виде {"questions": {"<order>": {...}}}.
+    rows — уже загруженные строки попытки (регрейд грузит их сразу для всех попыток).
+    """
+    if questions is None:
+        questions = attempt.test.questions.order_by("order")
+    if rows is None:
+        rows = TestAnswer.objects.filter(attempt=attempt)
+    by_order: Dict[int, List[TestAnswer]] = {}
+    for r in rows:
+        by_order.setdefault(r.question_order, []).append(r)
+
+    q_states = (attempt.answers_json or {}).get("questions") or {}
+    out = {}
+    for q in questions:
+        q_state = q_states.get(str(q.order))
+        if q_state is None and q.order not in by_order:
+            continue
+        payload = question_payload(q, q_state)
+        out[str(q.order)] = derive_state(q_state, payload, _buffered(attempt, q.order, payload, by_order.get(q.order, [])))
+    return {"questions": out}
@@ -0,0 +1,256 @@
+# exams/bank.py
+"""
+Банк вариантов вопросов теста — заранее собранные варианты для слотов распределителя.
+
+Когда 200 студентов начинают один тест за минуту, каждый старт сам генерирует
+и разбирает свои задачи. Вместо этого Test.publish() заранее собирает по
+каждому TestQuestion варианты для первых SIZE слотов распределителя
+(exams/allocator.py): params, HTML условия, шаги с каноном ответов — в таблицу
+QuestionVariant (уникальна по (question, slot)). Старт попытки:
+  - берёт следующий слот вопроса (атомарный счётчик распределителя);
+  - забирает вариант этого слота одним запросом по индексу — без генерации
+    и без гонки за строки: слот у каждой попытки свой;
+  - собранных слотов впереди счётчика меньше LOW_WATER — фоновый поток
+    достраивает банк ещё на SIZE слотов вперёд;
+  - варианта слота нет (доливка не успела) — вопрос собирается на старте по
+    параметрам того же слота, различие вариантов от этого не страдает.
+
+settings.VARIANT_BANK = {"ENABLED": True, "SIZE": 30, "LOW_WATER": 10, "BACKGROUND": True}
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from django.db import close_old_connections, connection
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from generator_app.offload import ExecutorBusy, compile_question_job, map_cpu
+
+from . import allocator
+from .allocator import question_complexity
+from .models import QuestionAllocator, QuestionVariant, TestQuestion
+
+DEFAULTS = {"ENABLED": True, "SIZE": 30, "LOW_WATER": 10, "BACKGROUND": True}
+CHUNK_SIZE = 16      # заданий за раз в пул анализатора (меньше MAX_PENDING)
+
+
+def bank_settings() -> Dict[str, Any]:
+    from django.conf import settings
+    return {**DEFAULTS, **(getattr(settings, "VARIANT_BANK", {}) or {})}
+
+
+def params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+# ---------- наполнение ----------
+def _compile_many(jobs: List[tuple]) -> List[Optional[Dict[str, Any]]]:
+    """Пачка compile_question_job: в пуле анализатора, а если он забит — здесь же."""
+    out: List[Optional[Dict[str, Any]]] = []
+    for i in range(0, len(jobs), CHUNK_SIZE):
+        chunk = jobs[i:i + CHUNK_SIZE]
+        try:
+            out.extend(map_cpu(compile_question_job, chunk) if len(chunk) > 1 else [compile_question_job(*chunk[0])])
+        except ExecutorBusy:
+            out.extend(compile_question_job(*job) for job in chunk)
+    return out
+
+
+def _built_upto(question: TestQuestion) -> int:
+    """Номер первого слота после уже собранных (слоты собираются подряд)."""
+    top = QuestionVariant.objects.filter(question=question).aggregate(m=Max("slot"))["m"]
+    return 0 if top is None else top + 1
+
+
+def _fill(questions: List[TestQuestion], ahead: int) -> Dict[int, int]:
+    """Собирает варианты слотов [issued, issued + ahead) каждого вопроса; -> {question_id: добавлено}."""
+    jobs, owners = [], []
+    for q in questions:
+        alloc = allocator.get_allocator(q)
+        for slot in range(max(_built_upto(q), alloc.issued), alloc.issued + ahead):
+            jobs.append(allocator.slot_job(alloc, q, slot))
+            owners.append((q, slot))
+    rows = []
+    added = {q.id: 0 for q in questions}
+    for (q, slot), payload in zip(owners, _compile_many(jobs)):
+        if payload is None:
+            continue
+        added[q.id] += 1
+        rows.append(QuestionVariant(
+            question=q, slot=slot, seed=payload["seed"], params=payload["params"],
+            params_key=params_key(payload["params"]),
+            statement_html=payload["statement_html"], steps=payload["steps"],
+        ))
+    QuestionVariant.objects.bulk_create(rows, ignore_conflicts=True)    # слот мог собрать параллельный поток
+    return added
+
+
+def fill_question(question: TestQuestion, ahead: Optional[int] = None) -> int:
+    ahead = bank_settings()["SIZE"] if ahead is None else ahead
+    return _fill([question], ahead)[question.id]
+
+
+def fill_test(test, ahead: Optional[int] = None) -> Dict[str, Any]:
+    """Банк по всем вопросам теста (на публикации); -> отчёт bank_report + время."""
+    t0 = time.perf_counter()
+    ahead = bank_settings()["SIZE"] if ahead is None else ahead
+    added = _fill(list(test.questions.order_by("order")), ahead)
+    report = bank_report(test)
+    report["added"] = sum(added.values())
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    print(f"🏦 Банк вариантов теста #{test.id}: +{report['added']} за {report['seconds']} s")
+    return report
+
+
+def bank_report(test) -> Dict[str, Any]:
+    rows = (test.questions.order_by("order")
+            .annotate(size=Count("variants"), claimed=Count("variants", filter=Q(variants__claimed_by__isnull=False)),
+                      built_upto=Max("variants__slot")))
+    allocs = {a.question_id: a for a in QuestionAllocator.objects.filter(question__test=test)}
+    out = []
+    for q in rows:
+        alloc = allocs.get(q.id)
+        issued = alloc.issued if alloc else 0
+        built = 0 if q.built_upto is None else q.built_upto + 1
+        out.append({
+            "order": q.order, "topic_id": q.topic_id, "size": q.size, "claimed": q.claimed,
+            "ahead": max(0, built - issued),            # собрано слотов впереди счётчика
+            "issued": issued,                           # выдано слотов
+            "space": alloc.size if alloc else None,     # различных кортежей параметров
+        })
+    return {"test_id": test.id, "questions": out, "claims": claim_stats.snapshot()}
+
+
+# ---------- выдача ----------
+class ClaimStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.claims = self.misses = 0
+        self.seconds = self.max_seconds = 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.claims = self.misses = 0
+            self.seconds = self.max_seconds = 0.0
+
+    def record(self, hit: bool, seconds: float) -> None:
+        with self._lock:
+            if hit:
+                self.claims += 1
+            else:
+                self.misses += 1
+            self.seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.claims + self.misses
+            return {
+                "claims": self.claims,
+                "misses": self.misses,
+                "avg_ms": round(1000 * self.seconds / calls, 2) if calls else None,
+                "max_ms": round(1000 * self.max_seconds, 2),
+            }
+
+
+claim_stats = ClaimStats()
+
+
+def claim(question: TestQuestion, alloc: QuestionAllocator, slot: int, attempt) -> Optional[QuestionVariant]:
+    """Вариант выданного попытке слота (закрепляется за attempt); None — слот ещё не собран."""
+    t0 = time.perf_counter()
+    variant = QuestionVariant.objects.filter(question=question, slot=slot).first()
+    if variant is not None:
+        QuestionVariant.objects.filter(pk=variant.pk).update(claimed_by=attempt, claimed_at=timezone.now())
+    claim_stats.record(variant is not None, time.perf_counter() - t0)
+
+    low_water = bank_settings()["LOW_WATER"]
+    if low_water and _built_upto(question) - alloc.issued < low_water:
+        request_refill(question.id)
+    return variant
+
+
+def release(variant_ids: List[int]) -> None:
+    """Снять отметку с вариантов, которые попытка так и не использовала (повтор старта возьмёт их снова)."""
+    if variant_ids:
+        QuestionVariant.objects.filter(id__in=variant_ids).update(claimed_by=None, claimed_at=None)
+
+
+def variant_payload(variant: QuestionVariant, question: TestQuestion) -> Dict[str, Any]:
+    """Payload вопроса попытки (тот же вид, что у compile_question_job) из варианта банка."""
+    return {
+        "topic_id": question.topic_id,
+        "complexity": question_complexity(question),
+        "seed": variant.seed,
+        "params": variant.params,
+        "statement_html": variant.statement_html,
+        "steps": variant.steps,
+        "slot": variant.slot,
+        "variant_id": variant.id,
+    }
+
+
+# ---------- фоновая доливка ----------
+class BankRefiller:
+    """Поток, который доливает банки вопросов, ставших «тонкими» после выдачи."""
+
+    def __init__(self):
+        self._pending: Set[int] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refills = 0
+        self.added = 0
+
+    def request(self, question_id: int) -> None:
+        with self._lock:
+            self._pending.add(question_id)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="variant-bank", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        break
+                    qid = self._pending.pop()
+                try:
+                    close_old_connections()
+                    question = TestQuestion.objects.filter(id=qid).first()
+                    if question is not None:
+                        added = fill_question(question)
+                        with self._lock:
+                            self.refills += 1
+                            self.added += added
+                except Exception as e:
+                    print(f"⚠️ Банк вариантов: доливка вопроса {qid} упала: {e}")
+                finally:
+                    connection.close()      # поток живёт долго — соединение не держим
+
+
+_refiller: Optional[BankRefiller] = None
+_refiller_pid: Optional[int] = None
+
+
+def get_refiller() -> BankRefiller:
+    global _refiller, _refiller_pid
+    if _refiller is None or _refiller_pid != os.getpid():
+        _refiller, _refiller_pid = BankRefiller(), os.getpid()
+    return _refiller
+
+
+def request_refill(question_id: int) -> None:
+    if bank_settings()["BACKGROUND"]:
+        get_refiller().request(question_id)
+    else:
+        question = TestQuestion.objects.filter(id=question_id).first()
+        if question is not None:
+            fill_question(question)
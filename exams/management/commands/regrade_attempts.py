@@ -0,0 +1,49 @@
+# exams/management/commands/regrade_attempts.py
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.models import Test
+from exams.regrade import attempts_for_group, attempts_for_test, regrade_attempts
+
+
+class Command(BaseCommand):
+    help = "Перепроверяет все попытки теста (или всех тестов группы) и записывает новые баллы."
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument("--test", type=int, help="ID теста")
+        target.add_argument("--group", type=int, help="ID группы (все тесты группы)")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Процессов для проверки (0 — в текущем процессе)")
+        parser.add_argument("--dry-run", action="store_true", help="Только посчитать, ничего не записывать")
+
+    def handle(self, *args, **opts):
+        if opts["test"]:
+            try:
+                test = Test.objects.get(id=opts["test"])
+            except Test.DoesNotExist:
+                raise CommandError(f"Тест {opts['test']} не найден.")
+            attempts = attempts_for_test(test)
+        else:
+            from courses.models import ClassGroup
+            try:
+                group = ClassGroup.objects.get(id=opts["group"])
+            except ClassGroup.DoesNotExist:
+                raise CommandError(f"Группа {opts['group']} не найдена.")
+            attempts = attempts_for_group(group)
+
+        report = regrade_attempts(attempts, workers=opts["workers"], dry_run=opts["dry_run"])
+
+        self.stdout.write(
+            f"Попыток: {report['attempts']}, шагов: {report['steps']}, "
+            f"уникальных проверок: {report['unique_checks']}"
+        )
+        self.stdout.write(
+            f"Проверка: {report['check_seconds']} s ({report['checks_per_second']} проверок/с), "
+            f"всего: {report['total_seconds']} s ({report['steps_per_second']} шагов/с)"
+        )
+        for ch in report["changed"]:
+            self.stdout.write(f"  попытка #{ch['attempt_id']} {ch['student']}: {ch['old_score']} -> {ch['new_score']}")
+        suffix = " (dry-run, ничего не записано)" if report["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(f"Изменено попыток: {len(report['changed'])}{suffix}"))
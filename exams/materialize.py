@@ -0,0 +1,175 @@
+# exams/materialize.py
+"""
+Материализация попытки: на старте попытки все вопросы теста генерируются
+и разбираются анализатором сразу, пачкой.
+
+Раньше api_start_attempt только создавал TestAttempt, а плеер ждал готовые
+payload["steps"] и состояние в answers_json, которые никто не заполнял.
+Теперь:
+  1) каждый вопрос берёт следующий слот своего распределителя (exams/allocator.py):
+     слот задаёт кортеж параметров и сид — соседи по группе получают разные
+     параметры, пока пространство темы не исчерпано, а дальше совпадения
+     распределяются равномерно. Взятые слоты сразу записываются в попытку
+     (answers_json["slots"]["<order>"]) отдельной транзакцией: повтор после 503/ошибки
+     и параллельный двойной клик берут те же слоты, а не тратят новые;
+  2) если вариант слота уже собран в банке (exams/bank.py, собирается на публикации) —
+     он просто забирается, ничего не генерируется;
+  3) остальные слоты строятся параллельно в пуле анализатора (generator_app/offload.py):
+     условие (HTML), шаги и канон ответов (answer_canon);
+  4) всё пишется в answers_json одной транзакцией:
+       answers_json["questions"]["<order>"] = {
+           "max_points": ...,
+           "payload": {"topic_id", "complexity", "seed", "params", "statement_html", "steps",
+                       "slot", "variant_id" (если из банка)},
+       }
+     (ответы на шаги пишутся построчно в TestAnswer, см. exams/answers.py);
+variant_seed попытки (случайный, один раз) остаётся отметкой «попытка собрана».
+После старта плеер (api_get_question / api_post_answer) читает только payload
+попытки и не ждёт ни генератор, ни sympy на построение шагов.
+
+settings.ATTEMPT_MATERIALIZE = {"PARALLEL": True}
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from generator_app.offload import ExecutorBusy, compile_question_job, map_cpu
+from generator_app.seeding import resolve_seed
+
+from . import allocator, bank
+from .models import TestAttempt
+
+DEFAULTS = {"PARALLEL": True}
+
+
+class MaterializationError(Exception):
+    """Вопрос попытки не удалось собрать (например, темы нет в реестре)."""
+
+
+def materialize_settings() -> Dict[str, Any]:
+    from django.conf import settings
+    return {**DEFAULTS, **(getattr(settings, "ATTEMPT_MATERIALIZE", {}) or {})}
+
+
+def question_payload(question, q_state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Payload вопроса: собранный для попытки, иначе (старые попытки) — общий из TestQuestion."""
+    return (q_state or {}).get("payload") or question.payload_json or {}
+
+
+def initial_state(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Неизменная часть состояния вопроса; шаги плеер выводит из TestAnswer (exams/answers.py)."""
+    steps = payload.get("steps") or []
+    return {
+        "max_points": sum(float(s.get("points", 0)) for s in steps),
+        "payload": payload,
+    }
+
+
+def _missing(attempt: TestAttempt, questions) -> List:
+    """Вопросы без состояния (у старых попыток уже начатые вопросы не трогаем)."""
+    q_states = (attempt.answers_json or {}).get("questions") or {}
+    return [q for q in questions if str(q.order) not in q_states]
+
+
+def _reserve_slots(attempt: TestAttempt, todo) -> Dict[int, Tuple[Any, int]]:
+    """
+    Слоты вопросов попытки: уже взятые (записаны в answers_json["slots"]) — те же,
+    остальные — следующие у распределителя, и сразу записываются. -> {order: (alloc, slot)}
+    Под блокировкой строки попытки: параллельный старт ждёт и видит записанные слоты.
+    """
+    out = {}
+    with transaction.atomic():
+        locked = TestAttempt.objects.select_for_update().get(pk=attempt.pk)
+        state = locked.answers_json or {}
+        drawn = state.setdefault("slots", {})
+        fresh = False
+        for q in todo:
+            if str(q.order) in drawn:
+                out[q.order] = (allocator.get_allocator(q), drawn[str(q.order)])
+            else:
+                out[q.order] = allocator.next_slot(q)
+                drawn[str(q.order)] = out[q.order][1]
+                fresh = True
+        if fresh:
+            locked.answers_json = state
+            locked.save(update_fields=["answers_json"])
+    attempt.answers_json = locked.answers_json
+    return out
+
+
+def materialize_attempt(attempt: TestAttempt, *, parallel: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Собирает все ещё не собранные вопросы попытки и сохраняет их одной транзакцией.
+    Повторный вызов ничего не делает. -> {"questions": собрано, "from_bank": из банка, "seconds": ...}
+    ExecutorBusy — пул анализатора забит (view отвечает 503).
+    """
+    t0 = time.perf_counter()
+    questions = list(attempt.test.questions.order_by("order"))
+    todo = _missing(attempt, questions)
+    if not todo:
+        return {"questions": 0, "from_bank": 0, "seconds": 0.0}
+
+    variant_seed = attempt.variant_seed if attempt.variant_seed is not None else resolve_seed(None)
+
+    # 1) слоты распределителя; вариант слота из банка — генерировать не нужно
+    payloads: Dict[int, Dict[str, Any]] = {}
+    claimed: Dict[int, int] = {}     # order -> id варианта банка
+    use_bank = bank.bank_settings()["ENABLED"]
+    rest, jobs = [], []
+    slots = _reserve_slots(attempt, todo)
+    for q in todo:
+        alloc, slot = slots[q.order]
+        variant = bank.claim(q, alloc, slot, attempt) if use_bank else None
+        if variant is not None:
+            payloads[q.order] = bank.variant_payload(variant, q)
+            claimed[q.order] = variant.id
+        else:
+            rest.append(q)
+            jobs.append(allocator.slot_job(alloc, q, slot))
+
+    # 2) остальное — генерация и sympy, вне транзакции: строки не держим, пока считается
+    if parallel is None:
+        parallel = materialize_settings()["PARALLEL"]
+    try:
+        if parallel and len(jobs) > 1:
+            built_payloads = map_cpu(compile_question_job, jobs)
+        else:
+            built_payloads = [compile_question_job(*job) for job in jobs]
+    except ExecutorBusy:
+        bank.release(list(claimed.values()))
+        raise
+    except Exception as e:
+        # генератор упал (сложность вне диапазона у старого теста, бюджет генерации и т.п.)
+        bank.release(list(claimed.values()))
+        raise MaterializationError(f"Не удалось собрать вопросы попытки: {e}") from e
+
+    for q, payload in zip(rest, built_payloads):
+        if payload is None:
+            bank.release(list(claimed.values()))
+            raise MaterializationError(f"Вопрос {q.order}: генератор для '{q.topic_id}' не найден.")
+        payloads[q.order] = {**payload, "slot": slots[q.order][1]}
+
+    with transaction.atomic():
+        locked = TestAttempt.objects.select_for_update().get(pk=attempt.pk)
+        if locked.variant_seed is not None and locked.variant_seed != variant_seed:
+            # параллельный старт успел первым — его варианты и оставляем, свои возвращаем в банк
+            bank.release(list(claimed.values()))
+            attempt.refresh_from_db(fields=["variant_seed", "answers_json"])
+            return {"questions": 0, "from_bank": 0, "seconds": round(time.perf_counter() - t0, 3)}
+        state = locked.answers_json or {}
+        q_states = state.setdefault("questions", {})
+        built, unused = 0, []
+        for q in todo:
+            if str(q.order) not in q_states:
+                q_states[str(q.order)] = initial_state(payloads[q.order])
+                built += 1
+            elif q.order in claimed:
+                unused.append(claimed.pop(q.order))    # вопрос уже собран параллельным стартом
+        bank.release(unused)
+        locked.variant_seed = variant_seed
+        locked.answers_json = state
+        locked.save(update_fields=["variant_seed", "answers_json"])
+
+    attempt.variant_seed, attempt.answers_json = locked.variant_seed, locked.answers_json
+    return {"questions": built, "from_bank": len(claimed), "seconds": round(time.perf_counter() - t0, 3)}
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testattempt',
+            name='answers_json',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0002_testattempt_answers_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seed', models.IntegerField()),
+                ('params', models.JSONField(default=dict)),
+                ('params_key', models.CharField(max_length=255)),
+                ('statement_html', models.TextField(blank=True, default='')),
+                ('steps', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('claimed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_variants', to='exams.testattempt')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='exams.testquestion')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['question', 'claimed_by'], name='exams_variant_free_idx')],
+                'unique_together': {('question', 'params_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_questionvariant'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='questionvariant',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='questionvariant',
+            name='slot',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='questionvariant',
+            unique_together={('question', 'slot')},
+        ),
+        migrations.CreateModel(
+            name='QuestionAllocator',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.PositiveIntegerField(blank=True, null=True)),
+                ('stride', models.PositiveIntegerField(default=1)),
+                ('offset', models.PositiveIntegerField(default=0)),
+                ('issued', models.PositiveIntegerField(default=0)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='allocator', to='exams.testquestion')),
+            ],
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Ответы на шаги из answers_json -> строки TestAnswer (exams/answers.py).
+# В blob'е остаются только {"max_points", "payload"} каждого вопроса.
+
+from django.db import migrations
+
+STATE_KEYS = ("current_step", "done", "steps")
+
+
+def _payload(question, q_state):
+    return q_state.get("payload") or (question.payload_json if question is not None else None) or {}
+
+
+def _step_key(step, idx):
+    return step.get("key") or f"step{idx + 1}"
+
+
+def blobs_to_rows(apps, schema_editor):
+    TestAttempt = apps.get_model("exams", "TestAttempt")
+    TestAnswer = apps.get_model("exams", "TestAnswer")
+    TestQuestion = apps.get_model("exams", "TestQuestion")
+
+    questions = {(q.test_id, q.order): q for q in TestQuestion.objects.all()}
+    rows, changed = [], []
+    for a in TestAttempt.objects.exclude(answers_json={}).iterator():
+        q_states = (a.answers_json or {}).get("questions") or {}
+        touched = False
+        for order, q_state in q_states.items():
+            if not isinstance(q_state, dict) or not any(k in q_state for k in STATE_KEYS):
+                continue
+            steps = _payload(questions.get((a.test_id, int(order))), q_state).get("steps") or []
+            for i, st in enumerate(q_state.get("steps") or []):
+                if not isinstance(st, dict) or st.get("value") is None:
+                    continue
+                step = steps[i] if i < len(steps) else {}
+                rows.append(TestAnswer(
+                    attempt_id=a.id,
+                    question_order=int(order),
+                    subq_key=st.get("key") or _step_key(step, i),
+                    value=str(st["value"]),
+                    is_correct=bool(st.get("ok")),
+                    score_awarded=float(st.get("score", 0.0)),
+                    max_score=float(step.get("points", 0)),
+                ))
+            q_state.setdefault("max_points", sum(float(s.get("points", 0)) for s in steps))
+            for k in STATE_KEYS:
+                q_state.pop(k, None)
+            touched = True
+        if touched:
+            changed.append(a)
+    TestAnswer.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+    TestAttempt.objects.bulk_update(changed, ["answers_json"], batch_size=500)
+
+
+def rows_to_blobs(apps, schema_editor):
+    TestAttempt = apps.get_model("exams", "TestAttempt")
+    TestAnswer = apps.get_model("exams", "TestAnswer")
+    TestQuestion = apps.get_model("exams", "TestQuestion")
+
+    questions = {(q.test_id, q.order): q for q in TestQuestion.objects.all()}
+    answers = {}
+    for r in TestAnswer.objects.all():
+        answers.setdefault(r.attempt_id, {}).setdefault(r.question_order, {})[r.subq_key] = r
+    changed = []
+    for a in TestAttempt.objects.exclude(answers_json={}).iterator():
+        q_states = (a.answers_json or {}).get("questions") or {}
+        for order, q_state in q_states.items():
+            steps = _payload(questions.get((a.test_id, int(order))), q_state).get("steps") or []
+            by_key = answers.get(a.id, {}).get(int(order), {})
+            steps_state = []
+            for i, step in enumerate(steps):
+                r = by_key.get(_step_key(step, i))
+                steps_state.append({
+                    "key": step.get("key"),
+                    "value": r.value if r is not None else None,
+                    "ok": r.is_correct if r is not None else False,
+                    "score": r.score_awarded if r is not None else 0.0,
+                })
+            current = 0
+            while current < len(steps_state) and steps_state[current]["ok"]:
+                current += 1
+            q_state.update({"current_step": current, "done": current >= len(steps_state), "steps": steps_state})
+        changed.append(a)
+    TestAttempt.objects.bulk_update(changed, ["answers_json"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0004_question_allocator'),
+    ]
+
+    operations = [
+        migrations.RunPython(blobs_to_rows, rows_to_blobs),
+    ]
@@ -21,9 +21,18 @@ class Test(models.Model):
     published_at = models.DateTimeField(null=True, blank=True)
 
     def publish(self):
+        """
+        Публикация: сначала банк вариантов по каждому вопросу (exams/bank.py),
+        потом статус — чтобы первые студенты уже разбирали готовые варианты.
+        -> отчёт о наполнении банка (None — банк выключен).
+        """
+        from .bank import bank_settings, fill_test
+
+        report = fill_test(self) if bank_settings()["ENABLED"] else None
         self.state = self.PUBLISHED
         self.published_at = timezone.now()
         self.save(update_fields=["state", "published_at"])
+        return report
 
     def __str__(self): 
         return f"{self.title} ({self.get_state_display()})"
@@ -44,6 +53,44 @@ class TestQuestion(models.Model):
     def __str__(self): return f"Q{self.order} [{self.topic_id}]"
 
 
+class QuestionAllocator(models.Model):
+    """
+    Распределитель вариантов вопроса (exams/allocator.py): атомарный счётчик выданных
+    слотов; слот k -> кортеж параметров index[(stride * k + offset) mod size].
+    """
+    question = models.OneToOneField(TestQuestion, on_delete=models.CASCADE, related_name="allocator")
+    size = models.PositiveIntegerField(null=True, blank=True)   # None — у темы нет индекса параметров
+    stride = models.PositiveIntegerField(default=1)             # взаимно прост с size
+    offset = models.PositiveIntegerField(default=0)
+    issued = models.PositiveIntegerField(default=0)
+
+    def __str__(self): return f"{self.question}: {self.issued}/{self.size or '?'}"
+
+
+class QuestionVariant(models.Model):
+    """
+    Готовый вариант вопроса из банка теста (собирается при публикации, см. exams/bank.py)
+    для слота распределителя: попытка получает слот и забирает вариант этого слота.
+    """
+    question = models.ForeignKey(TestQuestion, on_delete=models.CASCADE, related_name="variants")
+    slot = models.PositiveIntegerField(null=True, blank=True)
+    seed = models.IntegerField()
+    params = models.JSONField(default=dict)
+    params_key = models.CharField(max_length=255)   # params одной строкой (для отчётов и поиска)
+    statement_html = models.TextField(blank=True, default="")
+    steps = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_by = models.ForeignKey("TestAttempt", on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name="claimed_variants")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = [("question", "slot")]
+        indexes = [models.Index(fields=["question", "claimed_by"], name="exams_variant_free_idx")]
+
+    def __str__(self): return f"{self.question} slot {self.slot}: {self.params_key}"
+
+
 class TestAttempt(models.Model):
     test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name="attempts")
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="attempts")
@@ -52,6 +99,9 @@ class TestAttempt(models.Model):
     total_score = models.FloatField(default=0)
     total_percent = models.FloatField(default=0)
     variant_seed = models.IntegerField(null=True, blank=True)
+    # собранные вопросы попытки: {"questions": {"<order>": {"max_points", "payload"}}};
+    # ответы на шаги — строками TestAnswer, состояние плеера из них выводит exams/answers.py
+    answers_json = models.JSONField(default=dict, blank=True)
 
     class Meta:
         unique_together = [("test", "student", "started_at")]
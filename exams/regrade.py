@@ -0,0 +1,277 @@
+# exams/regrade.py
+"""
+Массовая перепроверка попыток (после смены ключа ответа или допуска в _sympy_equal).
+
+Идея:
+  1) собрать все (шаг, ответ студента) по всем попыткам теста/группы;
+  2) схлопнуть одинаковые пары — на экзамене их очень много;
+  3) проверить уникальные пары пачками в пуле процессов;
+  4) разложить вердикты обратно и записать изменённые строки TestAnswer и баллы
+     попыток двумя bulk_update.
+В отчёте — пропускная способность и список попыток, у которых изменился балл.
+
+Из API (api_regrade_test) перепроверка идёт фоновым заданием, а не в запросе:
+view проверяет размер (не больше MAX_ATTEMPTS попыток, больше — только
+`manage.py regrade_attempts`), ставит задание в очередь и сразу отвечает 202 с job_id.
+Поток заданий (по одному за раз в процессе) гоняет проверку в пуле из WORKERS
+spawn-процессов, как и команда; статус задания лежит в CACHES[CACHE_ALIAS]
+(LocMemCache виден только своему процессу — для нескольких воркеров нужен общий кэш).
+
+settings.REGRADE = {"WORKERS": 2, "MAX_ATTEMPTS": 500, "BACKGROUND": True,
+                    "CACHE_ALIAS": "default", "JOB_TIMEOUT": 86400}
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import close_old_connections, connection, transaction
+
+from . import answer_buffer
+from .answers import attempt_state, step_key
+from .materialize import question_payload
+from .models import TestAnswer, TestAttempt
+
+CHUNK_SIZE = 200
+DEFAULTS = {"WORKERS": 2, "MAX_ATTEMPTS": 500, "BACKGROUND": True, "CACHE_ALIAS": "default", "JOB_TIMEOUT": 86400}
+JOB_KEY_PREFIX = "regrade:job:"
+
+
+def regrade_settings() -> Dict[str, Any]:
+    from django.conf import settings
+    return {**DEFAULTS, **(getattr(settings, "REGRADE", {}) or {})}
+
+
+def _step_fingerprint(step: Dict[str, Any]) -> str:
+    """
+    Всё, от чего зависит проверка шага, в стабильной строке (ключ дедупликации).
+    answer_canon выбрасываем: его пересобирают из answer_expr перед проверкой (_grade_chunk).
+    """
+    step = {k: v for k, v in step.items() if k != "answer_canon"}
+    return json.dumps(step, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _grade_chunk(items: List[Tuple[str, str, Any]]) -> List[Dict[str, Any]]:
+    """Выполняется в процессе пула: [(topic_id, step_json, value)] -> [результат check_step]."""
+    from generator_app.analyzer import TaskAnalyzer, compile_answer
+
+    analyzer = TaskAnalyzer()
+    out = []
+    for topic_id, step_json, value in items:
+        step = json.loads(step_json)
+        # канон, собранный при старте попытки, мог устареть (исправили answer_expr, поменяли допуск):
+        # check_step решает по канону, если он есть, — поэтому пересобираем его из текущего ключа
+        if step.get("type") == "input" and step.get("answer_expr") is not None:
+            step["answer_canon"] = compile_answer(step["answer_expr"])
+        out.append(analyzer.check_step(topic_id, step.get("key"), value, {"steps": [step]}))
+    return out
+
+
+def _totals(questions, attempt: TestAttempt, rows: List[TestAnswer]) -> Tuple[float, float]:
+    q_states = attempt_state(attempt, questions, rows)["questions"]
+    total = max_total = 0.0
+    for q in questions:
+        q_state = q_states.get(str(q.order))
+        if q_state is None:
+            max_total += sum(float(s.get("points", 0)) for s in (q.payload_json or {}).get("steps") or [])
+            continue
+        total += sum(float(s["score"]) for s in q_state["steps"])
+        max_total += q_state["max_points"]
+    return total, max_total
+
+
+def regrade_attempts(
+    attempts: Iterable[TestAttempt],
+    *,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Перепроверяет попытки и (если не dry_run) записывает новые баллы.
+    workers=0 — проверка в текущем процессе, иначе пул spawn-процессов (generator_app.offload.process_pool).
+    """
+    t0 = time.perf_counter()
+    if answer_buffer.enabled():
+        answer_buffer.flush(force=True)     # перепроверяем то, что уже в БД — сначала сбросить буфер
+    attempts = list(attempts)
+    questions_by_test: Dict[int, list] = {}
+    for a in attempts:
+        if a.test_id not in questions_by_test:
+            questions_by_test[a.test_id] = list(a.test.questions.order_by("order"))
+
+    # ответы всех попыток — одним запросом
+    rows_by_attempt: Dict[int, List[TestAnswer]] = {a.id: [] for a in attempts}
+    for r in TestAnswer.objects.filter(attempt_id__in=list(rows_by_attempt)):
+        rows_by_attempt[r.attempt_id].append(r)
+
+    # 1-2. собираем и дедуплицируем пары (тема, шаг, ответ)
+    unique: Dict[Tuple[str, str, str], int] = {}
+    jobs: List[Tuple[str, str, Any]] = []
+    refs = []   # (attempt, строка TestAnswer, номер задания)
+    total_steps = 0
+    for a in attempts:
+        q_states = (a.answers_json or {}).get("questions") or {}
+        rows = {(r.question_order, r.subq_key): r for r in rows_by_attempt[a.id]}
+        for q in questions_by_test[a.test_id]:
+            q_state = q_states.get(str(q.order))
+            steps = question_payload(q, q_state).get("steps") or []
+            for i, step in enumerate(steps):
+                r = rows.get((q.order, step_key(step, i)))
+                if r is None:
+                    continue
+                total_steps += 1
+                step_json = _step_fingerprint(step)
+                key = (q.topic_id, step_json, r.value)
+                if key not in unique:
+                    unique[key] = len(jobs)
+                    jobs.append((q.topic_id, step_json, r.value))
+                refs.append((a, r, unique[key]))
+
+    # 3. проверяем уникальные пары
+    t_check = time.perf_counter()
+    chunks = [jobs[i:i + CHUNK_SIZE] for i in range(0, len(jobs), CHUNK_SIZE)]
+    results: List[Dict[str, Any]] = []
+    if workers == 0 or len(chunks) <= 1:
+        for chunk in chunks:
+            results.extend(_grade_chunk(chunk))
+    else:
+        from generator_app.offload import process_pool
+
+        with process_pool(workers or os.cpu_count() or 1) as pool:
+            for part in pool.map(_grade_chunk, chunks):
+                results.extend(part)
+    check_time = time.perf_counter() - t_check
+
+    # 4. раскладываем вердикты обратно
+    touched, changed_rows = {}, []
+    for a, r, job_idx in refs:
+        res = results[job_idx]
+        if res.get("verdict"):
+            continue            # проверка не состоялась (таймаут и т.п.) — оставляем старое
+        ok, score = bool(res.get("ok")), float(res.get("score", 0.0))
+        if r.is_correct != ok or r.score_awarded != score:
+            r.is_correct, r.score_awarded = ok, score
+            changed_rows.append(r)
+            touched[a.id] = a
+
+    changes = []
+    for a in touched.values():
+        total, max_total = _totals(questions_by_test[a.test_id], a, rows_by_attempt[a.id])
+        old = a.total_score
+        if a.finished_at is not None:
+            a.total_score = total
+            a.total_percent = 0 if max_total == 0 else round(100.0 * total / max_total, 2)
+        changes.append({
+            "attempt_id": a.id,
+            "student": a.student.username if a.student_id else None,
+            "old_score": old,
+            "new_score": total,
+        })
+
+    if touched and not dry_run:
+        with transaction.atomic():
+            TestAnswer.objects.bulk_update(changed_rows, ["is_correct", "score_awarded"], batch_size=500)
+            TestAttempt.objects.bulk_update(list(touched.values()), ["total_score", "total_percent"], batch_size=500)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "attempts": len(attempts),
+        "steps": total_steps,
+        "unique_checks": len(jobs),
+        "check_seconds": round(check_time, 3),
+        "total_seconds": round(elapsed, 3),
+        "checks_per_second": round(len(jobs) / check_time, 1) if check_time > 0 else None,
+        "steps_per_second": round(total_steps / elapsed, 1) if elapsed > 0 else None,
+        "changed": changes,
+        "dry_run": dry_run,
+    }
+
+
+def attempts_for_test(test) -> "QuerySet[TestAttempt]":
+    return TestAttempt.objects.filter(test=test).select_related("student", "test")
+
+
+def attempts_for_group(group, author=None) -> "QuerySet[TestAttempt]":
+    qs = TestAttempt.objects.filter(test__group=group)
+    if author is not None:
+        qs = qs.filter(test__author=author)
+    return qs.select_related("student", "test")
+
+
+# ---------- фоновые задания (API) ----------
+def _cache():
+    from django.core.cache import caches
+    return caches[regrade_settings()["CACHE_ALIAS"]]
+
+
+def job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """{"state": queued|running|done|failed, "owner", "attempts", "dry_run", "report"?, "error"?}"""
+    return _cache().get(JOB_KEY_PREFIX + str(job_id))
+
+
+def _set_job(job_id: str, **fields) -> None:
+    job = {**(job_status(job_id) or {}), **fields}
+    _cache().set(JOB_KEY_PREFIX + job_id, job, regrade_settings()["JOB_TIMEOUT"])
+
+
+def _run_job(job_id: str, attempt_ids: List[int], dry_run: bool) -> None:
+    _set_job(job_id, state="running")
+    try:
+        attempts = TestAttempt.objects.filter(id__in=attempt_ids).select_related("student", "test")
+        report = regrade_attempts(attempts, workers=regrade_settings()["WORKERS"], dry_run=dry_run)
+    except Exception as e:
+        print(f"⚠️ Перепроверка {job_id} упала: {e}")
+        _set_job(job_id, state="failed", error=str(e))
+        return
+    _set_job(job_id, state="done", report=report)
+
+
+class RegradeRunner:
+    """Поток, который по очереди выполняет задания перепроверки этого процесса."""
+
+    def __init__(self):
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, job_id: str, attempt_ids: List[int], dry_run: bool) -> None:
+        self._queue.put((job_id, attempt_ids, dry_run))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="regrade", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                close_old_connections()
+                _run_job(*job)
+            finally:
+                connection.close()      # поток живёт долго — соединение не держим
+
+
+_runner: Optional[RegradeRunner] = None
+_runner_pid: Optional[int] = None
+
+
+def get_runner() -> RegradeRunner:
+    global _runner, _runner_pid
+    if _runner is None or _runner_pid != os.getpid():
+        _runner, _runner_pid = RegradeRunner(), os.getpid()
+    return _runner
+
+
+def submit_regrade(attempt_ids: List[int], *, owner_id: int, dry_run: bool = False) -> str:
+    """Ставит перепроверку попыток в очередь; -> job_id (статус — job_status)."""
+    job_id = uuid.uuid4().hex
+    attempt_ids = list(attempt_ids)
+    _set_job(job_id, state="queued", owner=owner_id, attempts=len(attempt_ids), dry_run=dry_run)
+    if regrade_settings()["BACKGROUND"]:
+        get_runner().submit(job_id, attempt_ids, dry_run)
+    else:
+        _run_job(job_id, attempt_ids, dry_run)
+    return job_id
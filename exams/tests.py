@@ -0,0 +1,312 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import ClassGroup
+
+from generator_app.offload import ExecutorBusy
+
+from . import allocator, answer_buffer, answers, materialize
+from .models import QuestionAllocator, Test, TestAnswer, TestAttempt, TestQuestion
+from .regrade import attempts_for_test, regrade_attempts
+
+migration_0005 = import_module("exams.migrations.0005_answers_to_rows")
+
+# второй шаг без key — в строках и в состоянии он "step2"
+STEPS = [
+    {"key": "a_n", "type": "input", "points": 1},
+    {"key": None, "type": "input", "points": 2},
+    {"key": "conv", "type": "choice", "points": 1},
+]
+PAYLOAD = {"topic_id": "series_class_1", "steps": STEPS}
+
+
+def make_attempt(answers_json=None):
+    teacher = User.objects.create(username="teacher")
+    student = User.objects.create(username="student")
+    group = ClassGroup.objects.create(name="g", teacher=teacher)
+    test = Test.objects.create(author=teacher, group=group, num_questions=1)
+    question = TestQuestion.objects.create(test=test, order=1, topic_id="series_class_1", payload_json=PAYLOAD)
+    if answers_json is None:
+        answers_json = {"questions": {"1": {"max_points": 4.0, "payload": PAYLOAD}}}
+    attempt = TestAttempt.objects.create(test=test, student=student, answers_json=answers_json)
+    return attempt, question
+
+
+def row(attempt, idx, value, ok):
+    return answers.step_row(attempt, 1, STEPS, idx, value, {"ok": ok, "score": STEPS[idx]["points"] if ok else 0.0})
+
+
+class AnswerRowsMigrationTests(TestCase):
+    """0005: blob answers_json -> строки TestAnswer и обратно."""
+
+    BLOB_STEPS = [
+        {"key": "a_n", "value": "1/n", "ok": True, "score": 1.0},
+        {"key": None, "value": "2", "ok": True, "score": 2.0},
+        {"key": "conv", "value": None, "ok": False, "score": 0.0},
+    ]
+
+    def setUp(self):
+        blob = {"questions": {"1": {"current_step": 2, "done": False, "steps": self.BLOB_STEPS, "payload": PAYLOAD}}}
+        self.attempt, self.question = make_attempt(blob)
+
+    def test_blob_to_rows_and_back(self):
+        migration_0005.blobs_to_rows(apps, None)
+
+        rows = {r.subq_key: r for r in TestAnswer.objects.filter(attempt=self.attempt)}
+        self.assertEqual(set(rows), {"a_n", "step2"})     # шаг без ответа строки не получает
+        self.assertEqual((rows["step2"].value, rows["step2"].is_correct, rows["step2"].max_score), ("2", True, 2.0))
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.answers_json, {"questions": {"1": {"payload": PAYLOAD, "max_points": 4.0}}})
+
+        migration_0005.rows_to_blobs(apps, None)
+
+        self.attempt.refresh_from_db()
+        q_state = self.attempt.answers_json["questions"]["1"]
+        self.assertEqual((q_state["current_step"], q_state["done"]), (2, False))
+        self.assertEqual(q_state["steps"], self.BLOB_STEPS)
+
+    def test_rows_derive_same_state_as_blob(self):
+        migration_0005.blobs_to_rows(apps, None)
+        self.attempt.refresh_from_db()
+
+        state = answers.question_state(self.attempt, self.question)
+        self.assertEqual((state["current_step"], state["done"], state["max_points"]), (2, False, 4.0))
+        self.assertEqual([s["key"] for s in state["steps"]], ["a_n", "step2", "conv"])
+        self.assertEqual([s["value"] for s in state["steps"]], ["1/n", "2", None])
+
+
+class AttemptStateTests(TestCase):
+    def setUp(self):
+        self.attempt, self.question = make_attempt()
+
+    def state(self):
+        return answers.question_state(self.attempt, self.question)
+
+    def test_current_step_stops_at_first_wrong_step(self):
+        answers.save([row(self.attempt, 0, "1/n", True), row(self.attempt, 1, "3", False),
+                      row(self.attempt, 2, "Сходится", True)])
+        state = self.state()
+        self.assertEqual((state["current_step"], state["done"]), (1, False))
+        self.assertEqual([s["ok"] for s in state["steps"]], [True, False, True])
+
+    def test_done_when_all_steps_correct(self):
+        answers.save([row(self.attempt, i, "x", True) for i in range(len(STEPS))])
+        state = self.state()
+        self.assertEqual((state["current_step"], state["done"]), (3, True))
+
+    def test_no_rows_means_fresh_question(self):
+        state = self.state()
+        self.assertEqual((state["current_step"], state["done"]), (0, False))
+        self.assertEqual([s["value"] for s in state["steps"]], [None, None, None])
+
+    def test_upsert_overwrites_previous_answer(self):
+        answers.upsert([row(self.attempt, 0, "1/n^2", False)])
+        answers.upsert([row(self.attempt, 0, "1/n", True)])
+
+        rows = TestAnswer.objects.filter(attempt=self.attempt, question_order=1, subq_key="a_n")
+        self.assertEqual(rows.count(), 1)
+        self.assertEqual((rows[0].value, rows[0].is_correct, rows[0].score_awarded), ("1/n", True, 1.0))
+        self.assertEqual(self.state()["current_step"], 1)
+
+
+BUFFER_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "answer_buffer": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-answer-buffer"},
+}
+BUFFER = {"ENABLED": True, "ALIAS": "answer_buffer", "GAP_TIMEOUT": 30.0}
+
+
+@override_settings(CACHES=BUFFER_CACHES, ANSWER_BUFFER=BUFFER)
+class AnswerBufferTests(TestCase):
+    """Буфер ответов на LocMemCache; фоновый поток не запускается — сбрасываем руками."""
+
+    def setUp(self):
+        self.attempt, self.question = make_attempt()
+        self.cache = caches["answer_buffer"]
+        self.cache.clear()
+        answer_buffer._gap.update(seq=None, since=0.0)
+        patcher = mock.patch.object(answer_buffer.BufferFlusher, "ensure_started")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.cache.clear)
+
+    def db_rows(self):
+        return {r.subq_key: r.value for r in TestAnswer.objects.filter(attempt=self.attempt)}
+
+    def test_write_overlay_flush(self):
+        answers.save([row(self.attempt, 0, "1/n", True), row(self.attempt, 1, "2", True)])
+        self.assertEqual(self.db_rows(), {})
+        state = answers.question_state(self.attempt, self.question)     # плеер видит несброшенное
+        self.assertEqual([s["value"] for s in state["steps"]], ["1/n", "2", None])
+        self.assertEqual(state["current_step"], 2)
+
+        self.assertEqual(answer_buffer.flush(), 2)
+
+        self.assertEqual(self.db_rows(), {"a_n": "1/n", "step2": "2"})
+        self.assertIsNone(self.cache.get(answer_buffer.step_cache_key(self.attempt.id, 1, "a_n")))
+        self.assertIsNone(self.cache.get(answer_buffer._journal_key(1)))
+        self.assertEqual(self.cache.get(answer_buffer.DONE_KEY), self.cache.get(answer_buffer.SEQ_KEY))
+
+    def test_later_version_wins(self):
+        answers.save([row(self.attempt, 0, "1/n^2", False)])
+        answers.save([row(self.attempt, 0, "1/n", True)])
+        self.assertEqual(answer_buffer.flush(), 1)
+        self.assertEqual(self.db_rows(), {"a_n": "1/n"})
+
+    def test_flush_attempt_on_finish(self):
+        answers.save([row(self.attempt, 0, "1/n", True), row(self.attempt, 2, "Сходится", True)])
+
+        self.assertEqual(answer_buffer.flush_attempt(self.attempt, [self.question]), 2)
+
+        self.assertEqual(self.db_rows(), {"a_n": "1/n", "conv": "Сходится"})
+        # журнал остаётся и потом сбрасывает те же строки ещё раз (upsert идемпотентен)
+        self.assertEqual(answer_buffer.flush(), 2)
+        self.assertEqual(TestAnswer.objects.filter(attempt=self.attempt).count(), 2)
+
+    def test_missing_journal_entry_waits_then_skipped(self):
+        answers.save([row(self.attempt, 0, "1/n", True), row(self.attempt, 1, "2", True)])
+        self.cache.delete(answer_buffer._journal_key(1))       # запись журнала вытеснена из кэша
+
+        self.assertEqual(answer_buffer.flush(), 0)               # ждём: вдруг писатель между incr и set
+        self.assertEqual(self.db_rows(), {})
+
+        lost = answer_buffer.flush_stats.snapshot()["lost"]
+        with override_settings(ANSWER_BUFFER={**BUFFER, "GAP_TIMEOUT": 0}):
+            self.assertEqual(answer_buffer.flush(), 1)
+        self.assertEqual(self.db_rows(), {"step2": "2"})
+        self.assertEqual(answer_buffer.flush_stats.snapshot()["lost"], lost + 1)
+        self.assertEqual(self.cache.get(answer_buffer.DONE_KEY), 2)
+
+
+REGRADE_PAYLOAD = {"topic_id": "series_class_1", "steps": [
+    {"key": "lim", "type": "input", "label": "Предел", "points": 2, "answer_expr": "1/2"},
+]}
+
+
+class RegradeTests(TestCase):
+    """Две завершённые попытки с одинаковым ответом 0.5; в БД он записан как неверный."""
+
+    def setUp(self):
+        self.teacher = User.objects.create(username="teacher")
+        self.teacher.userprofile.role = "TEACHER"
+        self.teacher.userprofile.save()
+        group = ClassGroup.objects.create(name="g", teacher=self.teacher)
+        self.test = Test.objects.create(author=self.teacher, group=group, num_questions=1)
+        TestQuestion.objects.create(test=self.test, order=1, topic_id="series_class_1", payload_json=REGRADE_PAYLOAD)
+        self.attempts = []
+        for name in ("s1", "s2"):
+            attempt = TestAttempt.objects.create(
+                test=self.test, student=User.objects.create(username=name), finished_at=timezone.now(),
+                answers_json={"questions": {"1": {"max_points": 2.0, "payload": REGRADE_PAYLOAD}}},
+            )
+            TestAnswer.objects.create(attempt=attempt, question_order=1, subq_key="lim", value="0.5",
+                                      is_correct=False, score_awarded=0.0, max_score=2.0)
+            self.attempts.append(attempt)
+
+    def test_identical_answers_checked_once(self):
+        report = regrade_attempts(attempts_for_test(self.test), workers=0)
+        self.assertEqual((report["attempts"], report["steps"], report["unique_checks"]), (2, 2, 1))
+
+    def test_changed_scores_reported_and_written(self):
+        report = regrade_attempts(attempts_for_test(self.test), workers=0)
+
+        self.assertEqual(sorted((c["student"], c["old_score"], c["new_score"]) for c in report["changed"]),
+                         [("s1", 0.0, 2.0), ("s2", 0.0, 2.0)])
+        self.assertEqual(TestAnswer.objects.filter(is_correct=True, score_awarded=2.0).count(), 2)
+        self.attempts[0].refresh_from_db()
+        self.assertEqual((self.attempts[0].total_score, self.attempts[0].total_percent), (2.0, 100.0))
+
+        # второй прогон: всё уже верно, менять нечего
+        self.assertEqual(regrade_attempts(attempts_for_test(self.test), workers=0)["changed"], [])
+
+    def test_dry_run_writes_nothing(self):
+        report = regrade_attempts(attempts_for_test(self.test), workers=0, dry_run=True)
+
+        self.assertEqual(len(report["changed"]), 2)
+        self.assertFalse(TestAnswer.objects.filter(is_correct=True).exists())
+        self.attempts[0].refresh_from_db()
+        self.assertEqual(self.attempts[0].total_score, 0.0)
+
+    @override_settings(REGRADE={"BACKGROUND": False, "WORKERS": 0})
+    def test_api_runs_regrade_as_job(self):
+        self.client.force_login(self.teacher)
+        resp = self.client.post(reverse("exams_api_regrade_test", args=[self.test.id]), "{}",
+                                content_type="application/json")
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.json()["attempts"], 2)
+
+        job = self.client.get(reverse("exams_api_regrade_job", args=[resp.json()["job_id"]])).json()
+        self.assertEqual(job["state"], "done")
+        self.assertEqual(len(job["report"]["changed"]), 2)
+
+    @override_settings(REGRADE={"MAX_ATTEMPTS": 1})
+    def test_api_refuses_oversized_scope(self):
+        self.client.force_login(self.teacher)
+        resp = self.client.post(reverse("exams_api_regrade_test", args=[self.test.id]), '{"scope": "group"}',
+                                content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(TestAnswer.objects.filter(is_correct=True).exists())
+
+
+@override_settings(VARIANT_BANK={"ENABLED": False})
+class AllocatorTests(TestCase):
+    """series_class_2 на сложности 5: c из {1..5, -5..-3} — 8 вариантов."""
+
+    def setUp(self):
+        teacher = User.objects.create(username="teacher")
+        group = ClassGroup.objects.create(name="g", teacher=teacher)
+        self.test = Test.objects.create(author=teacher, group=group, num_questions=2)
+        self.question = TestQuestion.objects.create(test=self.test, order=1, topic_id="series_class_2",
+                                                    payload_json={"complexity": 5})
+        self.student = User.objects.create(username="student")
+
+    def draw(self, n):
+        out = []
+        for _ in range(n):
+            alloc, slot = allocator.next_slot(self.question)
+            out.append(tuple(allocator.slot_params(alloc, self.question, slot).items()))
+        return out
+
+    def test_distinct_until_exhausted(self):
+        size = allocator.get_allocator(self.question).size
+        self.assertEqual(size, 8)
+        drawn = self.draw(size)
+        for n in range(1, size + 1):    # первые n <= size слотов — n разных кортежей
+            self.assertEqual(len(set(drawn[:n])), n)
+
+    def test_wraps_evenly_past_size(self):
+        size = allocator.get_allocator(self.question).size
+        drawn = self.draw(3 * size + 5)
+        counts = {params: drawn.count(params) for params in set(drawn)}
+        self.assertEqual(len(counts), size)
+        self.assertEqual(sorted(set(counts.values())), [3, 4])
+        self.assertEqual(sum(1 for c in counts.values() if c == 4), 5)
+
+    @override_settings(QUESTION_ALLOCATOR={"MAX_INDEX_ROWS": 5})
+    def test_oversized_space_falls_back_to_seed_only(self):
+        alloc, slot = allocator.next_slot(self.question)
+        self.assertIsNone(alloc.size)
+        self.assertIsNone(allocator.slot_params(alloc, self.question, slot))
+
+    def test_retried_start_reuses_drawn_slots(self):
+        TestQuestion.objects.create(test=self.test, order=2, topic_id="series_class_2", payload_json={"complexity": 5})
+        attempt = TestAttempt.objects.create(test=self.test, student=self.student)
+
+        with mock.patch.object(materialize, "compile_question_job", side_effect=ExecutorBusy):
+            for _ in range(3):
+                with self.assertRaises(ExecutorBusy):
+                    materialize.materialize_attempt(attempt, parallel=False)
+        self.assertEqual(list(QuestionAllocator.objects.values_list("issued", flat=True)), [1, 1])
+
+        self.assertEqual(materialize.materialize_attempt(attempt, parallel=False)["questions"], 2)
+        attempt.refresh_from_db()
+        self.assertEqual(list(QuestionAllocator.objects.values_list("issued", flat=True)), [1, 1])
+        self.assertEqual(attempt.answers_json["slots"], {"1": 0, "2": 0})
+        self.assertEqual([q["payload"]["slot"] for q in attempt.answers_json["questions"].values()], [0, 0])
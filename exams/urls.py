@@ -16,6 +16,9 @@ urlpatterns = [
     path("api/tests/<int:test_id>/publish/", views.api_publish_test, name="api_publish_test"),
     path("api/teacher/tests/", views.api_teacher_tests, name="exams_api_teacher_tests"),
     path("api/tests/<int:test_id>/attempts/", views.api_test_attempts, name="exams_api_test_attempts"),
+    path("api/tests/<int:test_id>/regrade/", views.api_regrade_test, name="exams_api_regrade_test"),
+    path("api/regrade/<str:job_id>/", views.api_regrade_job, name="exams_api_regrade_job"),
+    path("api/tests/<int:test_id>/bank/", views.api_test_bank, name="exams_api_test_bank"),
 
     # API (student)
     path("api/my/", views.api_my_tests, name="exams_api_my_tests"),
@@ -24,5 +27,7 @@ urlpatterns = [
     # API для плеера
     path("api/attempts/<int:attempt_id>/question/<int:order>/", views.api_get_question, name="exams_api_get_question"),
     path("api/attempts/<int:attempt_id>/answer/<int:order>/", views.api_post_answer, name="exams_api_post_answer"),
+    path("api/attempts/<int:attempt_id>/answer/<int:order>/async/", views.api_post_answer_async,
+         name="exams_api_post_answer_async"),
     path("api/attempts/<int:attempt_id>/finish/", views.api_finish_attempt, name="exams_api_finish_attempt"),
 ]
@@ -1,6 +1,6 @@
 # exams/views.py
 import json
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import Http404, JsonResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404, render
 from django.views.decorators.http import require_http_methods, require_GET, require_POST
 from django.contrib.auth.decorators import login_required
@@ -8,10 +8,15 @@ from django.apps import apps
 from django.utils import timezone
 from django.db.models import Count
 
+from . import answer_buffer, answers
+from .bank import bank_report
+from .materialize import MaterializationError, materialize_attempt, question_payload
 from .models import Test, TestQuestion, TestAttempt
+from .regrade import attempts_for_group, attempts_for_test, job_status, regrade_settings, submit_regrade
 from generator_app.registry import controller
 from generator_app.html_renderer import HTMLRenderer
 from generator_app.analyzer import TaskAnalyzer  # <— используем твой analyzer напрямую
+from generator_app.offload import ExecutorBusy, check_step_job, run_cpu
 
 renderer = HTMLRenderer()
 analyzer = TaskAnalyzer()
@@ -91,16 +96,29 @@ def api_set_questions(request, test_id: int):
         return JsonResponse({"error": "forbidden"}, status=403)
     test = get_object_or_404(Test, id=test_id, author=request.user)
     data = json.loads(request.body or "{}")
-    items = data.get("questions", [])  # [{order, topic_id}]
+    items = data.get("questions", [])  # [{order, topic_id, complexity?, formula_steps?}]
     if not items:
         return JsonResponse({"error": "empty"}, status=400)
 
-    TestQuestion.objects.filter(test=test).delete()
     bulk = []
     for it in items:
-        order = int(it.get("order"))
+        try:
+            order = int(it.get("order"))
+            complexity = int(it["complexity"]) if it.get("complexity") is not None else None
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Некорректные 'order'/'complexity'"}, status=400)
         topic = str(it.get("topic_id"))
-        bulk.append(TestQuestion(test=test, order=order, topic_id=topic, payload_json={}))
+        # сложность уходит в генератор на публикации и старте попытки — проверяем сразу
+        error = controller.complexity_error(topic, complexity)
+        if error:
+            return JsonResponse({"error": f"Вопрос {order}: {error}"}, status=400)
+        # сложность нужна на старте попытки (materialize.py); без неё — умолчание генератора
+        payload = {"complexity": complexity} if complexity is not None else {}
+        if it.get("formula_steps"):
+            payload["formula_steps"] = True     # шаги-формулы (S_n как формула от n) — по выбору преподавателя
+        bulk.append(TestQuestion(test=test, order=order, topic_id=topic, payload_json=payload))
+
+    TestQuestion.objects.filter(test=test).delete()
     TestQuestion.objects.bulk_create(bulk)
     return JsonResponse({"ok": True, "count": len(bulk)})
 
@@ -112,9 +130,70 @@ def api_publish_test(request, test_id: int):
         return JsonResponse({"error": "forbidden"}, status=403)
     test = get_object_or_404(Test, id=test_id, author=request.user)
 
-    # На публикации можно ничего не «компилировать», мы это сделаем на старте попытки.
-    test.publish()
-    return JsonResponse({"ok": True, "state": test.state})
+    # вопросы, сохранённые до проверки сложности в api_set_questions, — отказ, а не падение генератора
+    for q in test.questions.order_by("order"):
+        error = controller.complexity_error(q.topic_id, (q.payload_json or {}).get("complexity"))
+        if error:
+            return JsonResponse({"error": f"Вопрос {q.order}: {error}"}, status=400)
+
+    # на публикации собирается банк вариантов (bank.py); старт попытки их только забирает
+    bank = test.publish()
+    return JsonResponse({"ok": True, "state": test.state, "bank": bank})
+
+
+@login_required
+@require_GET
+def api_test_bank(request, test_id: int):
+    """Банк вариантов теста: размер/свободно по вопросам и задержка выдачи (claims) этого процесса."""
+    if not _is_teacher(request.user):
+        return JsonResponse({"error": "forbidden"}, status=403)
+    test = get_object_or_404(Test, id=test_id, author=request.user)
+    return JsonResponse(bank_report(test))
+
+
+@login_required
+@require_POST
+def api_regrade_test(request, test_id: int):
+    """
+    Перепроверка всех попыток теста (или всех тестов его группы: {"scope": "group"}).
+    body: {"scope": "test"|"group", "dry_run": false}
+    Фоновое задание (exams/regrade.py): 202 {"job_id", "attempts"}, отчёт — api_regrade_job.
+    """
+    if not _is_teacher(request.user):
+        return JsonResponse({"error": "forbidden"}, status=403)
+    test = get_object_or_404(Test, id=test_id, author=request.user)
+    try:
+        data = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Некорректный JSON"}, status=400)
+
+    if data.get("scope") == "group":
+        attempts = attempts_for_group(test.group, author=request.user)
+    else:
+        attempts = attempts_for_test(test)
+
+    attempt_ids = list(attempts.values_list("id", flat=True))
+    limit = regrade_settings()["MAX_ATTEMPTS"]
+    if limit and len(attempt_ids) > limit:
+        return JsonResponse({
+            "error": f"Слишком много попыток для перепроверки из интерфейса ({len(attempt_ids)} > {limit}). "
+                     f"Используйте manage.py regrade_attempts.",
+        }, status=400)
+
+    job_id = submit_regrade(attempt_ids, owner_id=request.user.id, dry_run=bool(data.get("dry_run")))
+    return JsonResponse({"job_id": job_id, "attempts": len(attempt_ids)}, status=202)
+
+
+@login_required
+@require_GET
+def api_regrade_job(request, job_id: str):
+    """Статус задания перепроверки: {"state": queued|running|done|failed, "report"?, "error"?}."""
+    if not _is_teacher(request.user):
+        return JsonResponse({"error": "forbidden"}, status=403)
+    job = job_status(job_id)
+    if job is None or job.get("owner") != request.user.id:
+        return JsonResponse({"error": "Задание не найдено."}, status=404)
+    return JsonResponse({k: v for k, v in job.items() if k != "owner"})
 
 
 # ---------- API: STUDENT ----------
@@ -123,7 +202,7 @@ def api_publish_test(request, test_id: int):
 def api_start_attempt(request, test_id: int):
     # только студент
     try:
-        if not _role_required(request.user, "STUDENT"):
+        if not _is_student(request.user):
             return JsonResponse({"error": "Только для студентов."}, status=403)
 
         # тест должен быть опубликован
@@ -144,6 +223,14 @@ def api_start_attempt(request, test_id: int):
     # одна попытка на тест (если нужна многократность — поменяй на create)
     attempt, _created = TestAttempt.objects.get_or_create(test=test, student=request.user)
 
+    # все вопросы — сразу, пачкой: дальше плеер sympy не ждёт
+    try:
+        materialize_attempt(attempt)
+    except ExecutorBusy:
+        return JsonResponse({"error": "busy", "explain": "Сервер перегружен, попробуйте начать ещё раз."}, status=503)
+    except MaterializationError as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
     return JsonResponse({"attempt_id": attempt.id, "num_questions": test.num_questions})
 
 
@@ -153,11 +240,11 @@ def api_get_question(request, attempt_id: int, order: int):
     attempt = get_object_or_404(TestAttempt, id=attempt_id, student=request.user)
     q = get_object_or_404(TestQuestion, test=attempt.test, order=order)
 
-    payload = (q.payload_json or {})
-    steps = payload.get("steps", [])
-    q_state = (attempt.answers_json or {}).get("questions", {}).get(str(order))
+    q_state = answers.question_state(attempt, q)
     if not q_state:
         return JsonResponse({"error": "bad_state"}, status=400)
+    payload = q_state["payload"]
+    steps = payload.get("steps", [])
 
     idx = int(q_state.get("current_step", 0))
     if idx >= len(steps):
@@ -188,23 +275,17 @@ def api_get_question(request, attempt_id: int, order: int):
     return JsonResponse(data)
 
 
-@login_required
-@require_POST
-def api_post_answer(request, attempt_id: int, order: int):
-    attempt = get_object_or_404(TestAttempt, id=attempt_id, student=request.user)
-    q = get_object_or_404(TestQuestion, test=attempt.test, order=order)
-
-    body = json.loads(request.body or "{}")
+def _answer_target(q_state, body):
+    """
+    Разбор ответа на текущий шаг (состояние вопроса — из answers.question_state):
+    -> (steps, idx, key, value) или JsonResponse с ошибкой (общий код для sync и async версий).
+    """
     value = body.get("value")
     step_key = body.get("key")  # получаем ключ шага из фронта
 
-    payload = (q.payload_json or {})
-    steps = payload.get("steps", [])
-
-    state = attempt.answers_json or {}
-    q_state = state.get("questions", {}).get(str(order))
     if not q_state:
         return JsonResponse({"error": "bad_state"}, status=400)
+    steps = q_state["payload"].get("steps", [])
 
     idx = int(q_state.get("current_step", 0))
     if idx >= len(steps):
@@ -214,11 +295,14 @@ def api_post_answer(request, attempt_id: int, order: int):
     current_key = steps[idx].get("key")
     if step_key and step_key != current_key:
         return JsonResponse({"error": "wrong_step"}, status=400)
+    return steps, idx, current_key, value
 
-    # Проверка через analyzer.check_step
-    res = analyzer.check_step(q.topic_id, current_key, value, {"steps": steps})
 
-    # Обновляем состояние
+def _apply_answer(attempt, q, q_state, steps, idx, value, res):
+    """
+    Результат проверки: -> (строка TestAnswer для upsert, тело ответа).
+    q_state обновляется на месте — только чтобы посчитать next_step/question_done.
+    """
     q_state["steps"][idx]["value"] = value
     q_state["steps"][idx]["ok"] = bool(res.get("ok"))
     q_state["steps"][idx]["score"] = float(res.get("score", 0.0))
@@ -228,16 +312,66 @@ def api_post_answer(request, attempt_id: int, order: int):
         if q_state["current_step"] >= len(steps):
             q_state["done"] = True
 
-    attempt.answers_json = state
-    attempt.save(update_fields=["answers_json"])
-
-    return JsonResponse({
+    row = answers.step_row(attempt, q.order, steps, idx, value, res)
+    return row, {
         "ok": q_state["steps"][idx]["ok"],
         "score": q_state["steps"][idx]["score"],
         "correct": res.get("correct"),
+        "verdict": res.get("verdict"),      # timeout/memory/busy — если проверка не состоялась
+        "explain": res.get("explain"),
         "next_step": q_state["current_step"],
         "question_done": q_state["done"]
-    })
+    }
+
+
+@login_required
+@require_POST
+def api_post_answer(request, attempt_id: int, order: int):
+    attempt = get_object_or_404(TestAttempt, id=attempt_id, student=request.user)
+    q = get_object_or_404(TestQuestion, test=attempt.test, order=order)
+
+    q_state = answers.question_state(attempt, q)
+    target = _answer_target(q_state, json.loads(request.body or "{}"))
+    if isinstance(target, JsonResponse):
+        return target
+    steps, idx, current_key, value = target
+
+    # Проверка через analyzer.check_step
+    res = analyzer.check_step(q.topic_id, current_key, value, {"steps": steps})
+
+    row, data = _apply_answer(attempt, q, q_state, steps, idx, value, res)
+    answers.save([row])
+    return JsonResponse(data)
+
+
+@login_required
+@require_POST
+async def api_post_answer_async(request, attempt_id: int, order: int):
+    """
+    Асинхронный вариант api_post_answer (под ASGI): проверка уходит в пул
+    анализатора (generator_app/offload.py), воркер тем временем обслуживает другие запросы.
+    """
+    user = await request.auser()
+    try:
+        attempt = await TestAttempt.objects.aget(id=attempt_id, student=user)
+        q = await TestQuestion.objects.aget(test_id=attempt.test_id, order=order)
+    except (TestAttempt.DoesNotExist, TestQuestion.DoesNotExist):
+        raise Http404
+
+    q_state = await answers.aquestion_state(attempt, q)
+    target = _answer_target(q_state, json.loads(request.body or "{}"))
+    if isinstance(target, JsonResponse):
+        return target
+    steps, idx, current_key, value = target
+
+    try:
+        res = await run_cpu(check_step_job, q.topic_id, current_key, value, steps)
+    except ExecutorBusy:
+        return JsonResponse({"error": "busy", "explain": "Сервер проверки перегружен, попробуйте ещё раз."}, status=503)
+
+    row, data = _apply_answer(attempt, q, q_state, steps, idx, value, res)
+    await answers.asave([row])
+    return JsonResponse(data)
 
 
 @login_required
@@ -245,14 +379,21 @@ def api_post_answer(request, attempt_id: int, order: int):
 def api_finish_attempt(request, attempt_id: int):
     attempt = get_object_or_404(TestAttempt, id=attempt_id, student=request.user)
 
-    state = attempt.answers_json or {}
+    questions = list(attempt.test.questions.order_by("order"))
+    try:
+        answer_buffer.flush_attempt(attempt, questions)     # буфер ответов: всё своё — в БД до подсчёта
+    except Exception as e:
+        print(f"⚠️ Буфер ответов: попытка #{attempt.id} не сброшена: {e}")
+        return JsonResponse({"error": "busy", "explain": "Не удалось сохранить ответы, попробуйте ещё раз."},
+                            status=503)
+    state = answers.attempt_state(attempt, questions)
     total = 0.0
     max_total = 0.0
     per_question = []
 
-    for q in attempt.test.questions.order_by("order"):
-        payload = q.payload_json or {}
-        q_state = (state.get("questions") or {}).get(str(q.order), {})
+    for q in questions:
+        q_state = state["questions"].get(str(q.order), {})
+        payload = question_payload(q, q_state)
         steps_state = q_state.get("steps", [])
         score_q = sum(float(s.get("score", 0.0)) for s in steps_state)
         max_q = float(q_state.get("max_points", sum(float(s.get("points", 0)) for s in (payload.get("steps") or []))))
@@ -265,11 +406,12 @@ def api_finish_attempt(request, attempt_id: int):
             "steps": steps_state
         })
 
+    pct = 0 if max_total == 0 else round(100.0 * total / max_total, 2)
     attempt.finished_at = timezone.now()
-    attempt.score = total
-    attempt.save(update_fields=["finished_at", "score", "answers_json"])
+    attempt.total_score = total
+    attempt.total_percent = pct
+    attempt.save(update_fields=["finished_at", "total_score", "total_percent"])
 
-    pct = 0 if max_total == 0 else round(100.0 * total / max_total, 2)
     return JsonResponse({
         "ok": True,
         "total_points": total,
@@ -375,7 +517,8 @@ def api_test_attempts(request, test_id: int):
             "student": a.student.username if a.student_id else None,
             "started_at": getattr(a, "created_at", None) or getattr(a, "started_at", None),
             "finished_at": getattr(a, "finished_at", None),
-            "score": getattr(a, "score", None),
+            "score": a.total_score if a.finished_at else None,
+            "percent": a.total_percent if a.finished_at else None,
         })
     return JsonResponse({
         "test": {"id": test.id, "title": test.title},
@@ -394,11 +537,10 @@ def review_attempt_page(request, attempt_id: int):
     elif att.student_id != request.user.id:
         return HttpResponseForbidden("Нет доступа к этой попытке.")
 
-    answers = getattr(att, "answers_json", None)
     ctx = {
         "attempt": att,
-        "answers": answers,
-        "score": getattr(att, "score", None),
+        "answers": answers.attempt_state(att),
+        "score": att.total_score if att.finished_at else None,
         "started_at": getattr(att, "created_at", None) or getattr(att, "started_at", None),
         "finished_at": getattr(att, "finished_at", None),
     }
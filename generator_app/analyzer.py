@@ -1,34 +1,40 @@
 # generator_app/analyzer.py
 import random
-from typing import Any, Dict, List, Optional
-
-import sympy
-from sympy import symbols, summation, oo, limit
-from sympy.parsing.sympy_parser import parse_expr
+from fractions import Fraction
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from .task_template import BaseTask, AnalyzedTask
-from .generators.series_generator_1 import SeriesTaskClass1
-from .generators.series_generator_2 import SeriesTaskClass2
-from .generators.series_generator_3 import SeriesTaskClass3
-from .generators.series_generator_4 import SeriesTaskClass4
-
-# Выпадающие варианты (по ТЗ)
-JUSTIFY_OPTIONS = [
-    "по определению",
-    "по необходимому условию сходимости",
-    "по признаку Коши",
-    "по признаку Даламбера",
-    "по признаку Лейбница",
-    "по интегральному признаку",
-]
-CONVERGENCE_OPTIONS = ["сходится", "расходится", "неизвестно", "неопределено"]
+from . import identity
+from .answer_parser import fast_path_stats, parse_exact, sympy_input_ok
+from .answer_cache import get_cache
+from .grading_pool import VERDICT_BUSY, VERDICT_MEMORY, VERDICT_OK, VERDICT_TIMEOUT, VERDICT_TOO_BIG, get_pool
+from .registry import controller
+from .seeding import DEFAULT_STEP_SEED
+from .strategies.base import CONVERGENCE_OPTIONS, JUSTIFY_OPTIONS, GenericStrategy  # noqa: F401 (реэкспорт)
+
+if TYPE_CHECKING:
+    import sympy
+
+# sympy здесь импортируется лениво — только когда ответ не разобрал быстрый путь
+
+_generic = GenericStrategy()
+
+VERDICT_EXPLAIN = {
+    VERDICT_TIMEOUT: "Проверка ответа заняла слишком много времени. Упростите выражение.",
+    VERDICT_MEMORY: "Выражение слишком большое для проверки. Упростите его.",
+    VERDICT_BUSY: "Сервер проверки перегружен, попробуйте ещё раз.",
+    VERDICT_TOO_BIG: "Выражение слишком большое для проверки. Упростите его.",
+}
 
 
 def _norm_text(s: Any) -> str:
     return str(s or "").strip().lower().replace("ё", "е")
 
 
-def _symp(s: Any) -> Optional[sympy.Expr]:
+def _symp(s: Any) -> Optional["sympy.Expr"]:
+    import sympy
+    from sympy.parsing.sympy_parser import convert_xor, parse_expr, standard_transformations
+
     if s is None:
         return None
     txt = str(s).strip()
@@ -36,7 +42,9 @@ def _symp(s: Any) -> Optional[sympy.Expr]:
         return None
     try:
         locals_ = {"oo": sympy.oo, "e": sympy.E, "pi": sympy.pi}
-        return parse_expr(txt, local_dict=locals_, evaluate=True)
+        # '^' — степень, как и в быстром пути (answer_parser), а не XOR
+        return parse_expr(txt, local_dict=locals_, transformations=standard_transformations + (convert_xor,),
+                          evaluate=True)
     except Exception:
         try:
             return sympy.nsimplify(txt)
@@ -44,10 +52,84 @@ def _symp(s: Any) -> Optional[sympy.Expr]:
             return None
 
 
+def _step_rng(task: BaseTask, seed: Optional[int] = None, rng: Optional[random.Random] = None) -> random.Random:
+    """ГСЧ для параметров шагов: явный rng > явный seed > task.seed > DEFAULT_STEP_SEED."""
+    if rng is not None:
+        return rng
+    if seed is None:
+        seed = getattr(task, "seed", None)
+    return random.Random(DEFAULT_STEP_SEED if seed is None else seed)
+
+
 def _sympy_equal(a: Any, b: Any, *, tol: float = 1e-6) -> bool:
+    return _equal_verdict(a, b, tol=tol)[0]
+
+
+def _equal_verdict(a: Any, b: Any, *, tol: float = 1e-6) -> Tuple[bool, str]:
+    """-> (совпадает ли, вердикт проверки: "ok" или "timeout"/"memory"/... из пула)."""
+    # Быстрый путь: числа, дроби, десятичные, простые степени — точно и без sympy
+    fa, fb = parse_exact(a), parse_exact(b)
+    if fa is not None and fb is not None:
+        fast_path_stats.record(True)
+        return abs(fa - fb) <= tol, VERDICT_OK
+    fast_path_stats.record(False)
+    return _slow_equal(a, b, tol=tol)
+
+
+def _slow_equal(a: Any, b: Any, *, tol: float = 1e-6) -> Tuple[bool, str]:
+    """
+    sympy-путь: в пуле процессов-проверяющих (если включён) или прямо здесь.
+    b — ожидаемый ответ; результат запоминается в answer_cache по (b, a).
+    """
+    cache = get_cache()
+    cached = cache.get(b, a, tol)
+    if cached is not None:
+        return cached, VERDICT_OK
+
+    pool = get_pool()
+    if pool is not None:
+        ok, verdict = pool.equal(a, b, tol=tol)
+    elif not sympy_input_ok(a):
+        return False, VERDICT_TOO_BIG       # без пула sympy считал бы это прямо в веб-воркере
+    else:
+        ok, verdict = _sympy_equal_local(a, b, tol=tol), VERDICT_OK
+    if verdict == VERDICT_OK:
+        cache.set(b, a, tol, ok)
+    return ok, verdict
+
+
+def _formula_verdict(user_value: Any, step: Dict[str, Any]) -> Tuple[bool, str]:
+    """formula-шаг: сравнение формул случайными точками (identity.py), с кэшем и пулом."""
+    options = identity.step_options(step)
+    # в ключ кэша входит и область проверки: одна и та же формула на разных областях — разные вопросы
+    expected = f"formula:{','.join(options['variables'])}:{options['domain']}:{step.get('answer_expr')}"
+    cache = get_cache()
+    cached = cache.get(expected, user_value, 0.0)
+    if cached is not None:
+        return cached, VERDICT_OK
+
+    pool = get_pool()
+    if pool is not None:
+        ok, verdict = pool.formula_equal(user_value, step.get("answer_expr"), **options)
+    elif not sympy_input_ok(user_value):
+        return False, VERDICT_TOO_BIG
+    else:
+        ok, verdict = identity.formulas_equal(user_value, step.get("answer_expr"), **options), VERDICT_OK
+    if verdict == VERDICT_OK:
+        cache.set(expected, user_value, 0.0, ok)
+    return ok, verdict
+
+
+def _sympy_equal_local(a: Any, b: Any, *, tol: float = 1e-6) -> bool:
     ea, eb = _symp(a), _symp(b)
     if ea is None or eb is None:
         return False
+    return _exprs_equal(ea, eb, tol=tol)
+
+
+def _exprs_equal(ea: "sympy.Expr", eb: "sympy.Expr", *, tol: float = 1e-6) -> bool:
+    import sympy
+
     try:
         diff = sympy.simplify(ea - eb)
         if diff == 0:
@@ -67,196 +149,102 @@ def _sympy_equal(a: Any, b: Any, *, tol: float = 1e-6) -> bool:
             return False
 
 
+def compile_answer(expr: Any) -> Optional[Dict[str, Any]]:
+    """
+    Канонический вид ожидаемого ответа (кладётся в шаг рядом с answer_expr):
+      {"kind": "rational", "value": "p/q"}            — точная дробь
+      {"kind": "float", "value": 3.14..., "tol": 1e-6} — вещественное число
+    None — ответ не число (oo, zoo, формула): check_step пойдёт обычным путём.
+    """
+    value = parse_exact(expr)
+    if value is not None:
+        return {"kind": "rational", "value": str(value)}
+    e = _symp(expr)
+    if e is None:
+        return None
+    try:
+        if e.is_number and e.is_real and e.is_finite:
+            return {"kind": "float", "value": float(e.evalf()), "tol": 1e-6}
+    except Exception:
+        pass
+    return None
+
+
+def _canon_equal(user_value: Any, canon: Dict[str, Any], *, tol: float = 1e-6) -> Optional[Tuple[bool, str]]:
+    """Сравнение с предкомпилированным ответом: разбираем только сторону студента."""
+    kind = canon.get("kind")
+    try:
+        if kind == "rational":
+            expected = Fraction(canon["value"])
+        elif kind == "float":
+            expected = float(canon["value"])
+            tol = max(tol, float(canon.get("tol", tol)))
+        else:
+            return None
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+
+    got = parse_exact(user_value)
+    if got is not None:
+        fast_path_stats.record(True)
+        return abs(got - expected) <= tol, VERDICT_OK
+    fast_path_stats.record(False)
+    # канон тривиально разбирается ('p/q' или float), так что сюда уходит только ввод студента
+    return _slow_equal(user_value, repr(expected) if kind == "float" else str(expected), tol=tol)
+
+
 class TaskAnalyzer:
     """
     Новый интерфейс:
-      - build_steps(topic_id, task) -> список шагов (подвопросов)
+      - build_steps(topic_id, task, seed=None, rng=None) -> список шагов (подвопросов)
       - check_step(topic_id, step_key, user_value, payload) -> {ok, score, correct?}
       - grade_attempt(topic_id, payload, answers_for_question) -> итог по вопросу
     Старый метод analyze(task) оставлен для совместимости.
+    Логика конкретных тем — в стратегиях (generator_app/strategies), которые
+    TaskController отдаёт по task_type; анализатор сам генераторы не импортирует.
+
+    use_exact=True — ответы считаются точным ядром (exact.py) на Fraction,
+    sympy остаётся фоллбеком. use_exact=False — «эталонный» путь только через sympy.
+    use_tables=True — для тем с собранной таблицей ответов (answer_tables.py)
+    значения читаются из mmap без вычислений.
+    formula_steps=True — добавлять шаги типа "formula" (ответ — формула от n,
+    проверка в identity.py). По умолчанию выключено: баллы старых тестов не меняются.
     """
 
+    def __init__(self, use_exact: bool = True, use_tables: bool = True, formula_steps: bool = False):
+        self.use_exact = use_exact
+        self.use_tables = use_tables and use_exact
+        self.formula_steps = formula_steps
+
     # ---------- построение шагов ----------
-    def build_steps(self, topic_id: str, task: BaseTask) -> List[Dict[str, Any]]:
-        if isinstance(task, (SeriesTaskClass1, SeriesTaskClass2)):
-            return self._steps_geometric(task)
-        if isinstance(task, SeriesTaskClass3):
-            return self._steps_general_series_3(task)
-        if isinstance(task, SeriesTaskClass4):
-            return self._steps_general_series_4(task)
-
-        return [{
-            "key": "answer",
-            "type": "input",
-            "label": "Ваш ответ",
-            "hint": None,
-            "points": 10,
-            "answer_expr": None,
-        }]
-
-    # Геометрический ряд: классы 1 и 2
-    def _steps_geometric(self, task: BaseTask) -> List[Dict[str, Any]]:
-        k = symbols('k')
-        if isinstance(task, SeriesTaskClass1):
-            r = sympy.S(task.b) / task.c
-        else:
-            r = sympy.S(1) / (1 + task.c)
-
-        term_k = r**k
-        rng = random.Random(getattr(task, "seed", 123456))
-        n_for_an = rng.randint(3, 8)
-        n_for_sn = rng.randint(3, 8)
-
-        n_sym = symbols('n')
-        an_value = term_k.subs(k, n_for_an)
-        sn_formula = summation(term_k, (k, 0, n_sym))
-        sn_value = sn_formula.subs(n_sym, n_for_sn)
-
-        converges = abs(r) < 1
-        conv_text = "сходится" if converges else "расходится"
-
-        steps: List[Dict[str, Any]] = [
-            {
-                "key": "an",
-                "type": "input",
-                "label": f"Значение a_n при n={n_for_an}",
-                "hint": "Подставьте n в общий член геометрического ряда.",
-                "points": 20,
-                "answer_expr": sympy.sstr(an_value),
-            },
-            {
-                "key": "sn",
-                "type": "input",
-                "label": f"Значение S_n при n={n_for_sn}",
-                "hint": "Формула суммы первых n+1 членов геометрической прогрессии.",
-                "points": 20,
-                "answer_expr": sympy.sstr(sn_value),
-            },
-            {
-                "key": "conv",
-                "type": "select",
-                "label": "Сходимость ряда",
-                "hint": "Для ∑ r^k ряд сходится при |r|<1.",
-                "points": 20,
-                "options": CONVERGENCE_OPTIONS,
-                "answer_text": conv_text,
-            },
-        ]
-
-        if converges:
-            s_inf = summation(term_k, (k, 0, oo))
-            steps.append({
-                "key": "s_inf",
-                "type": "input",
-                "label": "Сумма ряда (бесконечная)",
-                "hint": "Для геометрического ряда S=1/(1-r), если |r|<1.",
-                "points": 30,
-                "answer_expr": sympy.sstr(s_inf),
-            })
-
-        steps.append({
-            "key": "justify",
-            "type": "select",
-            "label": "Обоснуйте ваш ответ",
-            "hint": "Выберите подходящий признак/основание.",
-            "points": 10,
-            "options": JUSTIFY_OPTIONS,
-            "answer_text": "по необходимому условию сходимости",
-        })
+    def build_steps(
+        self,
+        topic_id: str,
+        task: BaseTask,
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+    ) -> List[Dict[str, Any]]:
+        rng = _step_rng(task, seed, rng)
+        return self._compile_steps(self.strategy_for(topic_id, task).build_steps(self, task, rng))
+
+    @staticmethod
+    def strategy_for(topic_id: str, task: Optional[BaseTask] = None):
+        """Стратегия темы из TaskController (по task.task_type, затем по topic_id)."""
+        task_type = getattr(task, "task_type", None) or topic_id
+        strategy = controller.get_strategy(task_type) or controller.get_strategy(topic_id)
+        if strategy is None:
+            print(f"⚠️ Анализатор: для темы '{task_type}' нет стратегии — отдаю общий шаг.")
+            return _generic
+        return strategy
+
+    @staticmethod
+    def _compile_steps(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Ожидаемые ответы input-шагов один раз приводим к канону (answer_canon)."""
+        for st in steps:
+            if st.get("type") == "input" and st.get("answer_expr") is not None and "answer_canon" not in st:
+                st["answer_canon"] = compile_answer(st["answer_expr"])
         return steps
 
-    # Класс 3
-    def _steps_general_series_3(self, task: SeriesTaskClass3) -> List[Dict[str, Any]]:
-        n = symbols('n')
-        a_n = (task.b + task.p * n**2) / (task.c * n**2 + task.d * n)
-        lim = limit(a_n, n, sympy.oo)
-        rng = random.Random(getattr(task, "seed", 123456))
-        n_for_an = rng.randint(5, 15)
-        conv_text = "расходится" if lim != 0 else "неизвестно"
-
-        return [
-            {
-                "key": "an",
-                "type": "input",
-                "label": f"Значение a_n при n={n_for_an}",
-                "hint": "Подставьте n в формулу a_n.",
-                "points": 25,
-                "answer_expr": sympy.sstr(a_n.subs(n, n_for_an)),
-            },
-            {
-                "key": "limit",
-                "type": "input",
-                "label": "Значение предела a_n",
-                "hint": "Найдите lim_{n→∞} a_n.",
-                "points": 35,
-                "answer_expr": sympy.sstr(lim),
-            },
-            {
-                "key": "conv",
-                "type": "select",
-                "label": "Сходимость ряда ∑ a_n",
-                "hint": "Если lim a_n ≠ 0 — ряд расходится; если = 0 — вывод сделать нельзя.",
-                "points": 30,
-                "options": CONVERGENCE_OPTIONS,
-                "answer_text": conv_text,
-            },
-            {
-                "key": "justify",
-                "type": "select",
-                "label": "Обоснуйте ваш ответ",
-                "hint": "Выберите подходящее основание.",
-                "points": 10,
-                "options": JUSTIFY_OPTIONS,
-                "answer_text": "по необходимому условию сходимости",
-            },
-        ]
-
-    # Класс 4
-    def _steps_general_series_4(self, task: SeriesTaskClass4) -> List[Dict[str, Any]]:
-        n = symbols('n')
-        a_n = (task.b + task.p * n) / (task.c * n - task.d)
-        lim = limit(a_n, n, sympy.oo)
-        rng = random.Random(getattr(task, "seed", 123456))
-        n_for_an = rng.randint(5, 15)
-        conv_text = "расходится" if lim != 0 else "неизвестно"
-
-        return [
-            {
-                "key": "an",
-                "type": "input",
-                "label": f"Значение a_n при n={n_for_an}",
-                "hint": "Подставьте n в формулу a_n.",
-                "points": 25,
-                "answer_expr": sympy.sstr(a_n.subs(n, n_for_an)),
-            },
-            {
-                "key": "limit",
-                "type": "input",
-                "label": "Значение предела a_n",
-                "hint": "Найдите lim_{n→∞} a_n.",
-                "points": 35,
-                "answer_expr": sympy.sstr(lim),
-            },
-            {
-                "key": "conv",
-                "type": "select",
-                "label": "Сходимость ряда ∑ a_n",
-                "hint": "Если lim a_n ≠ 0 — ряд расходится; если = 0 — вывод сделать нельзя.",
-                "points": 30,
-                "options": CONVERGENCE_OPTIONS,
-                "answer_text": conv_text,
-            },
-            {
-                "key": "justify",
-                "type": "select",
-                "label": "Обоснуйте ваш ответ",
-                "hint": "Выберите подходящее основание.",
-                "points": 10,
-                "options": JUSTIFY_OPTIONS,
-                "answer_text": "по необходимому условию сходимости",
-            },
-        ]
-
     # ---------- проверка одного шага ----------
     def check_step(
         self,
@@ -272,6 +260,13 @@ class TaskAnalyzer:
 
         points = float(step.get("points", 0))
 
+        # своя проверка темы (если есть) — раньше общей
+        strategy = controller.get_strategy(topic_id)
+        if strategy is not None:
+            custom = strategy.check_step(self, step, user_value)
+            if custom is not None:
+                return custom
+
         if step.get("type") == "select":
             expect = _norm_text(step.get("answer_text"))
             got = _norm_text(user_value)
@@ -282,8 +277,19 @@ class TaskAnalyzer:
         if expect_expr is None:
             return {"ok": True, "score": points}
 
-        ok = _sympy_equal(user_value, expect_expr)
-        return {"ok": ok, "score": points if ok else 0.0, "correct": expect_expr}
+        if step.get("type") == "formula":
+            ok, verdict = _formula_verdict(user_value, step)
+        else:
+            canon = step.get("answer_canon")
+            res = _canon_equal(user_value, canon) if canon else None
+            if res is None:
+                res = _equal_verdict(user_value, expect_expr)
+            ok, verdict = res
+        out = {"ok": ok, "score": points if ok else 0.0, "correct": expect_expr}
+        if verdict != VERDICT_OK:
+            out["verdict"] = verdict
+            out["explain"] = VERDICT_EXPLAIN.get(verdict, "Не удалось проверить ответ.")
+        return out
 
     # ---------- суммарная оценка по вопросу ----------
     def grade_attempt(
@@ -315,58 +321,11 @@ class TaskAnalyzer:
         return {"score": acc, "total": total, "details": details}
 
     # ---------- старая совместимость ----------
-    def analyze(self, task: BaseTask) -> Optional[AnalyzedTask]:
-        solutions: Dict[str, str] = {}
-
-        if isinstance(task, (SeriesTaskClass1, SeriesTaskClass2)):
-            k = sympy.symbols('k')
-            if isinstance(task, SeriesTaskClass1):
-                r = sympy.S(task.b) / task.c
-            else:
-                r = sympy.S(1) / (1 + task.c)
-
-            series_term = r**k
-            n_for_an = random.randint(3, 8)
-            n_for_sn = random.randint(3, 8)
-
-            an_value = series_term.subs(k, n_for_an)
-            solutions[f"Значение a_n при n={n_for_an}"] = f"\\(a_{{{n_for_an}}} = {sympy.latex(an_value)}\\)"
-            sn_formula = sympy.summation(series_term, (k, 0, sympy.symbols('n')))
-            sn_value = sn_formula.subs(sympy.symbols('n'), n_for_sn)
-            solutions[f"Значение S_n при n={n_for_sn}"] = f"\\(S_{{{n_for_sn}}} = {sympy.latex(sn_value.evalf(4))}\\)"
-            total_sum = sympy.summation(series_term, (k, 0, sympy.oo))
-            solutions["Сумма ряда"] = f"\\(S = {sympy.latex(total_sum)}\\)"
-            sum_from_2 = sympy.summation(series_term, (k, 2, sympy.oo))
-            solutions["Сумма ряда с k=2"] = f"\\(S_2 = {sympy.latex(sum_from_2)}\\)"
-            solutions["Сходимость"] = "Сходится" if (abs(r) < 1) else "Расходится"
-            solutions["Обоснование"] = "по необходимому условию сходимости"
-
-        elif isinstance(task, SeriesTaskClass3):
-            n = sympy.symbols('n')
-            a_n_formula = (task.b + task.p * n**2) / (task.c * n**2 + task.d * n)
-            limit_val = sympy.limit(a_n_formula, n, sympy.oo)
-            convergence = "расходится" if limit_val != 0 else "неизвестно"
-            n_for_an = random.randint(5, 15)
-            solutions = {
-                f"Значение a_n при n={n_for_an}": f"\\(a_{{{n_for_an}}} = {sympy.latex(a_n_formula.subs(n, n_for_an))}\\)",
-                "Значение предела": f"\\(\\lim_{{n \\to \\infty}} a_n = {sympy.latex(limit_val)}\\)",
-                "Сходимость": convergence,
-                "Обоснование": "по необходимому условию сходимости",
-            }
-
-        elif isinstance(task, SeriesTaskClass4):
-            n = sympy.symbols('n')
-            a_n_formula = (task.b + task.p * n) / (task.c * n - task.d)
-            limit_val = sympy.limit(a_n_formula, n, sympy.oo)
-            convergence = "расходится" if limit_val != 0 else "неизвестно"
-            n_for_an = random.randint(5, 15)
-            solutions = {
-                f"Значение a_n при n={n_for_an}": f"\\(a_{{{n_for_an}}} = {sympy.latex(a_n_formula.subs(n, n_for_an))}\\)",
-                "Значение предела": f"\\(\\lim_{{n \\to \\infty}} a_n = {sympy.latex(limit_val)}\\)",
-                "Сходимость": convergence,
-                "Обоснование": "по необходимому условию сходимости",
-            }
-        else:
+    def analyze(self, task: BaseTask, seed: Optional[int] = None, rng: Optional[random.Random] = None) -> Optional[AnalyzedTask]:
+        rng = _step_rng(task, seed, rng)
+        strategy = controller.get_strategy(getattr(task, "task_type", None))
+        solutions = strategy.analyze(self, task, rng) if strategy is not None else None
+        if solutions is None:
             return None
 
         print(f"✅ Анализатор: Задача '{getattr(task,'task_type','?')}' успешно решена.")
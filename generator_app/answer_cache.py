@@ -0,0 +1,146 @@
+# generator_app/answer_cache.py
+"""
+Мемо-кэш результатов медленной (sympy) проверки ответов между запросами.
+
+На одном экзамене сотни студентов присылают одни и те же верные/неверные ответы
+к одному и тому же шагу, поэтому (ожидаемый ответ, ввод) -> совпадает ли
+достаточно посчитать один раз.
+
+Два уровня:
+  - локальный LRU в процессе (всегда), размер — SIZE;
+  - общий бэкенд через Django cache framework (BACKEND="django"), чтобы
+    результатом пользовались все воркеры.
+
+settings.ANSWER_CACHE = {"SIZE": 4096, "BACKEND": "local", "ALIAS": "default", "TIMEOUT": 3600}
+Кэшируются только состоявшиеся проверки (вердикт "ok"), таймауты — нет.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULTS = {"SIZE": 4096, "BACKEND": "local", "ALIAS": "default", "TIMEOUT": 3600}
+KEY_PREFIX = "anscache:v1:"
+
+
+def normalize(value: Any) -> str:
+    """Пробелы по краям и повторные пробелы не меняют смысла ввода."""
+    if value is None:
+        return ""
+    return " ".join(str(value).split())
+
+
+def _settings() -> Dict[str, Any]:
+    try:
+        from django.conf import settings
+        user = getattr(settings, "ANSWER_CACHE", {}) if settings.configured else {}
+    except Exception:
+        user = {}
+    return {**DEFAULTS, **(user or {})}
+
+
+class AnswerCache:
+    def __init__(self, size: int = 4096, backend: str = "local", alias: str = "default", timeout: int = 3600):
+        self.size = max(0, int(size))
+        self.backend = backend
+        self.alias = alias
+        self.timeout = timeout
+        self._data: "OrderedDict[Tuple[str, str, float], bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(expected: Any, user_value: Any, tol: float) -> Tuple[str, str, float]:
+        return normalize(expected), normalize(user_value), float(tol)
+
+    def _shared(self):
+        if self.backend != "django":
+            return None
+        try:
+            from django.core.cache import caches
+            return caches[self.alias]
+        except Exception:
+            return None
+
+    @staticmethod
+    def _shared_key(key: Tuple[str, str, float]) -> str:
+        raw = "\x1f".join((key[0], key[1], repr(key[2]))).encode("utf-8")
+        return KEY_PREFIX + hashlib.sha1(raw).hexdigest()
+
+    def get(self, expected: Any, user_value: Any, tol: float) -> Optional[bool]:
+        key = self.make_key(expected, user_value, tol)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+
+        shared = self._shared()
+        if shared is not None:
+            try:
+                found = shared.get(self._shared_key(key))
+            except Exception:
+                found = None
+            if found is not None:
+                self._remember(key, bool(found))
+                with self._lock:
+                    self.shared_hits += 1
+                return bool(found)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, expected: Any, user_value: Any, tol: float, ok: bool) -> None:
+        key = self.make_key(expected, user_value, tol)
+        self._remember(key, ok)
+        shared = self._shared()
+        if shared is not None:
+            try:
+                # bool False в кэше неотличим от «нет записи» у некоторых бэкендов — храним 0/1
+                shared.set(self._shared_key(key), 1 if ok else 0, self.timeout)
+            except Exception:
+                pass
+
+    def _remember(self, key, ok: bool) -> None:
+        if not self.size:
+            return
+        with self._lock:
+            self._data[key] = ok
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "backend": self.backend,
+                "size": len(self._data),
+                "max_size": self.size,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+            }
+
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> AnswerCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = _settings()
+                _cache = AnswerCache(conf["SIZE"], conf["BACKEND"], conf["ALIAS"], conf["TIMEOUT"])
+    return _cache
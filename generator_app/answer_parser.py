@@ -0,0 +1,238 @@
+# generator_app/answer_parser.py
+"""
+Быстрый разбор ответов без sympy.
+
+Ограниченная грамматика — то, что студенты вводят в 95% случаев:
+  целые, десятичные (в т.ч. 1e-3), дроби a/b, скобки, + - * /, степени ^ и **
+  с целым показателем. Результат — точная fractions.Fraction.
+
+Всё, что сюда не укладывается (символы, pi, корни, огромные степени), даёт None,
+и вызывающий код уходит в медленный путь через sympy.
+
+sympy_input_ok — те же пределы (MAX_EXPONENT, MAX_LENGTH) для медленного пути, когда
+он идёт прямо в веб-воркере (пул проверяющих выключен): 9**9**9 или 10^(10^10)
+sympy честно попробует посчитать и займёт воркер надолго, поэтому такой ввод
+отклоняется до parse_expr. Символьные показатели (2^n, (1/2)^(n+1)) пропускаются.
+
+'^' здесь — всегда степень (как у sympify/nsimplify), а не XOR из parse_expr.
+"""
+import re
+import threading
+from fractions import Fraction
+from typing import Any, Dict, List, Optional
+
+MAX_EXPONENT = 64          # |показатель степени|
+MAX_BITS = 4096            # ограничение на размер числителя/знаменателя результата
+MAX_LENGTH = 200           # длинные строки не разбираем вовсе
+
+_TOKEN_RE = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|(\*\*|[-+*/^()]))")
+
+
+class _GiveUp(Exception):
+    """Ввод вне грамматики быстрого пути."""
+
+
+def _tokenize(text: str) -> List[str]:
+    pos, out = 0, []
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            raise _GiveUp
+        out.append(m.group(1) or m.group(2))
+        pos = m.end()
+    return out
+
+
+def _number(tok: str) -> Fraction:
+    mantissa, _, exp = tok.lower().partition("e")
+    if exp and abs(int(exp)) > MAX_EXPONENT:
+        raise _GiveUp
+    # Fraction('0.125') точна; '5.' Fraction не понимает
+    value = Fraction(mantissa.rstrip(".") or "0")
+    return value * (Fraction(10) ** int(exp)) if exp else value
+
+
+def _check_size(x: Fraction) -> Fraction:
+    if x.numerator.bit_length() > MAX_BITS or x.denominator.bit_length() > MAX_BITS:
+        raise _GiveUp
+    return x
+
+
+class _Parser:
+    def __init__(self, tokens: List[str]):
+        self.toks = tokens
+        self.i = 0
+
+    def peek(self) -> Optional[str]:
+        return self.toks[self.i] if self.i < len(self.toks) else None
+
+    def take(self) -> str:
+        tok = self.peek()
+        if tok is None:
+            raise _GiveUp
+        self.i += 1
+        return tok
+
+    # expr := term (('+'|'-') term)*
+    def expr(self) -> Fraction:
+        acc = self.term()
+        while self.peek() in ("+", "-"):
+            op = self.take()
+            rhs = self.term()
+            acc = acc + rhs if op == "+" else acc - rhs
+        return _check_size(acc)
+
+    # term := unary (('*'|'/') unary)*
+    def term(self) -> Fraction:
+        acc = self.unary()
+        while self.peek() in ("*", "/"):
+            op = self.take()
+            rhs = self.unary()
+            if op == "*":
+                acc = acc * rhs
+            elif rhs == 0:
+                raise _GiveUp          # 1/0 -> zoo: пусть решает sympy
+            else:
+                acc = acc / rhs
+            _check_size(acc)
+        return acc
+
+    # unary := ('+'|'-') unary | power      (-2**2 == -4, как в Python/sympy)
+    def unary(self) -> Fraction:
+        if self.peek() in ("+", "-"):
+            op = self.take()
+            val = self.unary()
+            return -val if op == "-" else val
+        return self.power()
+
+    # power := atom (('^'|'**') unary)?     (правоассоциативно)
+    def power(self) -> Fraction:
+        base = self.atom()
+        if self.peek() in ("^", "**"):
+            self.take()
+            exp = self.unary()
+            if exp.denominator != 1 or abs(exp.numerator) > MAX_EXPONENT:
+                raise _GiveUp
+            if base == 0 and exp < 0:
+                raise _GiveUp
+            bits = max(base.numerator.bit_length(), base.denominator.bit_length())
+            if bits * abs(exp.numerator) > MAX_BITS:
+                raise _GiveUp
+            return base ** exp.numerator
+        return base
+
+    # atom := number | '(' expr ')'
+    def atom(self) -> Fraction:
+        tok = self.take()
+        if tok == "(":
+            val = self.expr()
+            if self.take() != ")":
+                raise _GiveUp
+            return val
+        if tok[0].isdigit() or tok[0] == ".":
+            return _number(tok)
+        raise _GiveUp
+
+
+def parse_exact(value: Any) -> Optional[Fraction]:
+    """Строка/число -> Fraction, либо None, если ввод вне быстрой грамматики."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, Fraction)):
+        return Fraction(value)
+    text = str(value)
+    if not text.strip() or len(text) > MAX_LENGTH:
+        return None
+    try:
+        parser = _Parser(_tokenize(text))
+        result = parser.expr()
+        if parser.peek() is not None:
+            return None
+        return result
+    except (_GiveUp, ValueError, ZeroDivisionError, OverflowError):
+        return None
+
+
+# ---------- предохранитель медленного пути ----------
+_GUARD_TOKEN_RE = re.compile(
+    r"\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|([A-Za-z_]\w*)|(\*\*|\S))"
+)
+# функции, которые от небольшого целого аргумента считают огромное число
+_HEAVY_NAMES = {"factorial", "factorial2", "subfactorial", "binomial", "gamma", "fibonacci", "prime", "primorial"}
+
+
+def _operand_end(toks: List[str], i: int) -> int:
+    """Конец операнда, начинающегося с toks[i] (показатель степени, с учётом правой ассоциативности)."""
+    while i < len(toks) and toks[i] in ("+", "-"):
+        i += 1
+    if i < len(toks) and toks[i][0].isalpha() and i + 1 < len(toks) and toks[i + 1] == "(":
+        i += 1      # вызов функции: имя + скобки
+    if i < len(toks) and toks[i] == "(":
+        depth = 0
+        while i < len(toks):
+            depth += {"(": 1, ")": -1}.get(toks[i], 0)
+            i += 1
+            if depth == 0:
+                break
+    else:
+        i += 1
+    if i < len(toks) and toks[i] in ("^", "**"):
+        return _operand_end(toks, i + 1)
+    return i
+
+
+def sympy_input_ok(value: Any) -> bool:
+    """Можно ли разбирать ввод sympy прямо в процессе: без огромных числовых показателей и факториалов."""
+    if value is None:
+        return True
+    text = str(value).strip()
+    if len(text) > MAX_LENGTH:
+        return False
+    toks = [m.group(1) or m.group(2) or m.group(3) for m in _GUARD_TOKEN_RE.finditer(text)]
+    for i, tok in enumerate(toks):
+        if tok == "!" or tok.lower() in _HEAVY_NAMES:
+            return False
+        if tok[0].isdigit() or tok[0] == ".":
+            _, _, exp = tok.lower().partition("e")
+            if exp and abs(int(exp)) > MAX_EXPONENT:
+                return False
+        if tok in ("^", "**"):
+            operand = toks[i + 1:_operand_end(toks, i + 1)]
+            if any(t[0].isalpha() or t[0] == "_" for t in operand):
+                continue        # символьный показатель: его числовые степени проверятся на своих операторах
+            exp = parse_exact("".join(operand))
+            if exp is None or abs(exp) > MAX_EXPONENT:
+                return False
+    return True
+
+
+# ---------- статистика попаданий ----------
+class FastPathStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+fast_path_stats = FastPathStats()
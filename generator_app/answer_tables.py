@@ -0,0 +1,182 @@
+# generator_app/answer_tables.py
+"""
+Предвычисленные таблицы ответов для тем с маленьким пространством параметров
+(series_class_3, series_class_4).
+
+Предел, вердикт сходимости и значения a_n — чистые функции параметров, поэтому
+они считаются один раз командой `manage.py build_answer_tables` и пишутся в
+компактный бинарный файл <ANSWER_TABLES_DIR>/<topic_id>.bin.
+На пути запроса файл читается через mmap: все воркеры делят одну копию
+из page cache, sympy не вызывается вовсе.
+
+Формат (little-endian):
+  заголовок  "<4sHH32sHHH": MAGIC, VERSION, ndims, topic_id, an_min, an_max, record_size
+  измерения  ndims × "<8sii": имя параметра, start, stop (шаг всегда 1)
+  записи     по одной на каждый кортеж полного декартова произведения,
+             номер записи — смешанная система счисления по измерениям:
+             "<iiB3x" (lim_num, lim_den, flags) + (an_max-an_min+1) × "<ii" (num, den)
+flags: бит 0 — кортеж допустим и посчитан, бит 1 — предел равен нулю.
+den == 0 означает «точного ответа нет» — анализатор уйдёт в обычный путь.
+"""
+import itertools
+import mmap
+import os
+import struct
+from fractions import Fraction
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from . import exact
+
+MAGIC = b"MCAT"
+VERSION = 1
+AN_MIN, AN_MAX = 5, 15            # диапазон n_for_an в strategies/rational.py
+
+_HEADER = struct.Struct("<4sHH32sHHH")
+_DIM = struct.Struct("<8sii")
+_REC_HEAD = struct.Struct("<iiB3x")
+_PAIR = struct.Struct("<ii")
+
+FLAG_VALID = 1
+FLAG_LIM_ZERO = 2
+
+# темы, для которых строим таблицы
+TABLE_TOPICS = ("series_class_3", "series_class_4")
+
+
+def tables_dir() -> Path:
+    from django.conf import settings
+    return Path(getattr(settings, "ANSWER_TABLES_DIR", Path(settings.BASE_DIR) / "answer_tables"))
+
+
+def table_path(topic_id: str, directory: Optional[Path] = None) -> Path:
+    return Path(directory or tables_dir()) / f"{topic_id}.bin"
+
+
+# ---------- сборка ----------
+def build_table(topic_id: str, generator_class, task_class, path: Path) -> int:
+    """
+    Перебирает полное пространство параметров генератора и пишет таблицу.
+    Возвращает число посчитанных (допустимых) кортежей.
+    """
+    space = generator_class.param_space()
+    names = tuple(space.keys())
+    for r in space.values():
+        if r.step != 1:
+            raise ValueError(f"{topic_id}: поддерживаются только диапазоны с шагом 1")
+
+    n_an = AN_MAX - AN_MIN + 1
+    record = struct.Struct(_REC_HEAD.format + "ii" * n_an)
+    out = bytearray(_HEADER.pack(
+        MAGIC, VERSION, len(names), topic_id.encode("ascii")[:32], AN_MIN, AN_MAX, record.size,
+    ))
+    for name, r in space.items():
+        out += _DIM.pack(name.encode("ascii")[:8], r.start, r.stop)
+
+    valid = 0
+    for combo in itertools.product(*space.values()):
+        params = dict(zip(names, combo))
+        values = [0, 0, 0] + [0, 0] * n_an
+        if generator_class.accepts(params):
+            num, den = task_class(**params).rational_term()
+            lim = exact.rational_limit(num, den)
+            if lim is not None:
+                values[0:3] = [lim.numerator, lim.denominator, FLAG_VALID | (FLAG_LIM_ZERO if lim == 0 else 0)]
+                for i, n in enumerate(range(AN_MIN, AN_MAX + 1)):
+                    an = exact.rational_value(num, den, n)
+                    if an is not None:
+                        values[3 + 2 * i:5 + 2 * i] = [an.numerator, an.denominator]
+                valid += 1
+        out += record.pack(*values)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(out)
+    os.replace(tmp, path)          # атомарно: читатели видят либо старую, либо новую таблицу
+    return valid
+
+
+# ---------- чтение ----------
+class AnswerTable:
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, ndims, topic, self.an_min, self.an_max, self.record_size = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: неизвестный формат таблицы")
+        self.topic_id = topic.rstrip(b"\0").decode("ascii")
+        self.dims = []
+        pos = _HEADER.size
+        for _ in range(ndims):
+            name, start, stop = _DIM.unpack_from(self._mm, pos)
+            self.dims.append((name.rstrip(b"\0").decode("ascii"), start, stop))
+            pos += _DIM.size
+        self._data_offset = pos
+
+    def matches(self, space: Dict[str, range]) -> bool:
+        """Таблица построена для того же пространства, что объявляет генератор сейчас?"""
+        return [(n, r.start, r.stop) for n, r in space.items()] == self.dims
+
+    def _offset(self, task) -> Optional[int]:
+        idx = 0
+        for name, start, stop in self.dims:
+            v = getattr(task, name)
+            if not (start <= v < stop):
+                return None
+            idx = idx * (stop - start) + (v - start)
+        return self._data_offset + idx * self.record_size
+
+    def lookup(self, task, n_for_an: int) -> Optional[Tuple[str, str, bool]]:
+        """-> (a_n при n_for_an, предел, предел == 0) или None, если в таблице ответа нет."""
+        if not (self.an_min <= n_for_an <= self.an_max):
+            return None
+        off = self._offset(task)
+        if off is None:
+            return None
+        lim_num, lim_den, flags = _REC_HEAD.unpack_from(self._mm, off)
+        if not flags & FLAG_VALID:
+            return None
+        an_num, an_den = _PAIR.unpack_from(self._mm, off + _REC_HEAD.size + _PAIR.size * (n_for_an - self.an_min))
+        if an_den == 0:
+            return None
+        return (
+            exact.fraction_str(Fraction(an_num, an_den)),
+            exact.fraction_str(Fraction(lim_num, lim_den)),
+            bool(flags & FLAG_LIM_ZERO),
+        )
+
+
+_loaded: Dict[str, Optional[AnswerTable]] = {}
+
+
+def get_table(topic_id: str) -> Optional[AnswerTable]:
+    """Таблица темы (открывается один раз на процесс); None — если не собрана или устарела."""
+    if topic_id in _loaded:
+        return _loaded[topic_id]
+    table = None
+    try:
+        from django.conf import settings
+        from .registry import controller
+        if not settings.configured:       # анализатор вне Django (скрипты) — таблиц нет
+            return None
+        path = table_path(topic_id)
+        generator_class = controller.get_generator(topic_id)
+        if path.exists() and generator_class is not None:
+            table = AnswerTable(path)
+            if not table.matches(generator_class.param_space()):
+                print(f"⚠️ Таблица ответов {path} не совпадает с пространством генератора — пропускаю.")
+                table = None
+    except Exception as e:
+        print(f"⚠️ Не удалось открыть таблицу ответов для '{topic_id}': {e}")
+        table = None
+    _loaded[topic_id] = table
+    return table
+
+
+def lookup(task, n_for_an: int) -> Optional[Tuple[str, str, bool]]:
+    table = get_table(getattr(task, "task_type", ""))
+    if table is None:
+        return None
+    return table.lookup(task, n_for_an)
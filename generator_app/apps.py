@@ -6,6 +6,22 @@ class GeneratorAppConfig(AppConfig):
     name = "generator_app"
 
     def ready(self):
-        # при старте проекта пробегаем папку generators и регистрируем всё
-        from .registry import controller
-        controller.autodiscover_generators()
+        # лимит кэша sympy должен попасть в окружение до первого импорта sympy
+        from .memory import configure_sympy_cache, get_watchdog
+        configure_sympy_cache()
+
+        from django.core.signals import request_finished
+        request_finished.connect(lambda **kwargs: get_watchdog().recycle_now(), weak=False,
+                                 dispatch_uid="generator_app.memory.recycle")
+
+        # темы регистрируются из topics.py (строками, без импорта генераторов);
+        # пробег папки generators — только если его явно включили
+        from django.conf import settings
+        if getattr(settings, "GENERATOR_AUTODISCOVER", False):
+            from .registry import controller
+            controller.autodiscover_generators()
+
+        # прогрев до fork'а воркеров (gunicorn --preload): settings.WARMUP["ON_READY"] / GENERATOR_WARMUP=1
+        from .warmup import enabled_on_ready, print_report, warm_up
+        if enabled_on_ready():
+            print_report(warm_up())
@@ -0,0 +1,32 @@
+# generator_app/batch.py
+"""
+Помощники для пакетной генерации (generate_batch у генераторов).
+
+NumPy — необязательная зависимость: если его нет, генераторы откатываются
+на обычный цикл по generate(), и TaskController.create_tasks работает так же.
+Импортируется лениво (get_numpy()), при первой пакетной генерации: на старте
+воркера это ~0.2 s, а большинству запросов numpy не нужен вовсе.
+"""
+_np = None
+_np_loaded = False
+
+
+def get_numpy():
+    """Модуль numpy или None, если он не установлен."""
+    global _np, _np_loaded
+    if not _np_loaded:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - numpy не обязателен
+            numpy = None
+        _np, _np_loaded = numpy, True
+    return _np
+
+
+def has_numpy() -> bool:
+    return get_numpy() is not None
+
+
+def make_np_rng(seed=None):
+    return get_numpy().random.default_rng(seed)
+
@@ -0,0 +1,276 @@
+# generator_app/budget.py
+"""
+Бюджет генерации: сколько попыток и секунд может потратить генератор на одну задачу.
+
+Генератор с циклом «сгенерировать -> проверить -> повторить» (отбраковка) при
+неудачных ограничениях может крутиться вечно и повесить воркер. Поэтому
+TaskController запускает generate() внутри бюджета:
+  - кооперативно: генератор на каждой итерации своего цикла зовёт budget.attempt()
+    (генераторы без индекса параметров — хотя бы раз на задачу). Бюджет лежит в
+    contextvar, поэтому attempt() работает в любом потоке: превысили попытки или
+    срок MAX_SECONDS — GenerationBudgetExceeded прямо из цикла;
+  - принудительно в главном потоке (UNIX): SIGALRM на MAX_SECONDS, так что
+    остановится и генератор, который attempt() не зовёт;
+  - принудительно вне главного потока (пул offload, фоновые доливки, потоки runserver):
+    сигналы туда не доставляются, поэтому недоверенные генераторы — найденные
+    автопоиском в папке generators или с атрибутом класса ISOLATE = True — запускаются
+    в отдельном spawn-процессе (run_isolated), который убивается по истечении срока.
+    Темы из topics.py считаются проверенными и работают в самом потоке.
+
+Счётчики по темам (generation_stats): вызовы, задачи, попытки и доля отбраковки
+(попытки сверх одной на задачу), провалы бюджета, задержка.
+
+settings.GENERATION_BUDGET = {"MAX_ATTEMPTS": 1000, "MAX_SECONDS": 2.0, "IMPORT_SECONDS": 10.0,
+                              "ISOLATE_DISCOVERED": True}
+Генератор может переопределить лимиты атрибутами класса MAX_ATTEMPTS / MAX_SECONDS.
+"""
+import contextvars
+import importlib
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULTS = {"MAX_ATTEMPTS": 1000, "MAX_SECONDS": 2.0, "IMPORT_SECONDS": 10.0, "ISOLATE_DISCOVERED": True}
+
+
+class GenerationBudgetExceeded(RuntimeError):
+    """Генератор не уложился в бюджет попыток/времени."""
+
+    def __init__(self, task_type: str, reason: str, attempts: int, elapsed: float):
+        self.task_type = task_type
+        self.reason = reason
+        self.attempts = attempts
+        self.elapsed = elapsed
+        super().__init__(
+            f"Генератор '{task_type}' превысил бюджет ({reason}): "
+            f"{attempts} попыток за {elapsed:.2f} s"
+        )
+
+
+def budget_settings() -> Dict[str, Any]:
+    try:
+        from django.conf import settings
+        user = getattr(settings, "GENERATION_BUDGET", {}) if settings.configured else {}
+    except Exception:
+        user = {}
+    return {**DEFAULTS, **(user or {})}
+
+
+class GenerationBudget:
+    def __init__(self, task_type: str, max_attempts: Optional[int], max_seconds: Optional[float]):
+        self.task_type = task_type
+        self.max_attempts = max_attempts
+        self.max_seconds = max_seconds
+        self.attempts = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def exceeded(self, reason: str) -> GenerationBudgetExceeded:
+        return GenerationBudgetExceeded(self.task_type, reason, self.attempts, self.elapsed)
+
+    def tick(self) -> None:
+        self.attempts += 1
+        if self.max_attempts and self.attempts > self.max_attempts:
+            raise self.exceeded("попытки")
+        if self.max_seconds and self.elapsed > self.max_seconds:
+            raise self.exceeded("время")
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("generation_budget", default=None)
+
+
+def attempt() -> None:
+    """Зовётся генератором на каждой попытке (итерации цикла отбраковки); вне бюджета — ничего не делает."""
+    budget = _current.get()
+    if budget is not None:
+        budget.tick()
+
+
+@contextmanager
+def time_limit(seconds: Optional[float], on_timeout):
+    """SIGALRM через seconds -> raise on_timeout(). Только главный поток UNIX, иначе без лимита."""
+    usable = (
+        seconds and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if not usable:
+        yield
+        return
+
+    def _handler(signum, frame):
+        raise on_timeout()
+
+    previous = signal.signal(signal.SIGALRM, _handler)
+    prev_delay, _ = signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        if prev_delay:
+            signal.setitimer(signal.ITIMER_REAL, prev_delay)   # чужой таймер возвращаем (примерно)
+
+
+def limits(generator_class=None, scale: int = 1) -> Tuple[Optional[int], Optional[float]]:
+    """(max_attempts, max_seconds) на вызов из scale задач."""
+    conf = budget_settings()
+    max_attempts = getattr(generator_class, "MAX_ATTEMPTS", None) or conf["MAX_ATTEMPTS"]
+    max_seconds = getattr(generator_class, "MAX_SECONDS", None) or conf["MAX_SECONDS"]
+    return (max_attempts * scale if max_attempts else None,
+            max_seconds * scale if max_seconds else None)
+
+
+@contextmanager
+def _budget(task_type: str, max_attempts: Optional[int], max_seconds: Optional[float]):
+    budget = GenerationBudget(task_type, max_attempts, max_seconds)
+    token = _current.set(budget)
+    try:
+        with time_limit(budget.max_seconds, lambda: budget.exceeded("время")):
+            yield budget
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def enforce(task_type: str, generator_class=None, scale: int = 1):
+    """Бюджет на один вызов generate() (scale — на пакет из scale задач)."""
+    with _budget(task_type, *limits(generator_class, scale)) as budget:
+        yield budget
+
+
+def call_generator(generator_class, method: str, args: tuple = (), kwargs: Optional[Dict[str, Any]] = None,
+                   repeat: Optional[int] = None):
+    """generator_class().method(*args, **kwargs); repeat — столько раз, списком."""
+    fn = getattr(generator_class(), method)
+    if repeat is None:
+        return fn(*args, **(kwargs or {}))
+    return [fn(*args, **(kwargs or {})) for _ in range(repeat)]
+
+
+# ---------- изоляция в процессе ----------
+def should_isolate(generator_class, discovered: bool = False) -> bool:
+    """Вне главного потока недоверенный генератор идёт в отдельный процесс (его можно убить)."""
+    if threading.current_thread() is threading.main_thread():
+        return False                # здесь хватает SIGALRM
+    explicit = getattr(generator_class, "ISOLATE", None)
+    if explicit is not None:
+        return bool(explicit)
+    return discovered and bool(budget_settings()["ISOLATE_DISCOVERED"])
+
+
+def _isolated_main(conn, settings_module: Optional[str], task_type: str, class_path: str,
+                   max_attempts: Optional[int], max_seconds: Optional[float], call: tuple) -> None:
+    """spawn-процесс: загрузить генератор, сообщить о готовности, выполнить вызов в бюджете."""
+    try:
+        if settings_module:
+            os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+            import django
+            django.setup()
+        module_name, _, class_name = class_path.rpartition(".")
+        generator_class = getattr(importlib.import_module(module_name), class_name)
+    except Exception as e:
+        conn.send(("error", f"не удалось загрузить генератор: {e}", 0))
+        return
+    conn.send(("ready", None, 0))
+    with _budget(task_type, max_attempts, max_seconds) as budget:
+        try:
+            conn.send(("ok", call_generator(generator_class, *call), budget.attempts))
+        except GenerationBudgetExceeded as e:
+            conn.send(("budget", e.reason, e.attempts))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", budget.attempts))
+
+
+def run_isolated(task_type: str, generator_class, scale: int, method: str, args: tuple = (),
+                 kwargs: Optional[Dict[str, Any]] = None, repeat: Optional[int] = None) -> Tuple[Any, int]:
+    """
+    call_generator(...) в отдельном spawn-процессе; -> (результат, попыток).
+    Срок считается после загрузки генератора в процессе (импорт — в пределах IMPORT_SECONDS);
+    не уложился — процесс убивается, GenerationBudgetExceeded.
+    """
+    conf = budget_settings()
+    max_attempts, max_seconds = limits(generator_class, scale)
+    ctx = multiprocessing.get_context("spawn")      # не форкаем воркер с его потоками
+    parent, child = ctx.Pipe()
+    proc = ctx.Process(
+        target=_isolated_main,
+        args=(child, os.environ.get("DJANGO_SETTINGS_MODULE"), task_type,
+              f"{generator_class.__module__}.{generator_class.__qualname__}",
+              max_attempts, max_seconds, (method, args, kwargs, repeat)),
+        daemon=True,
+    )
+    t0 = time.perf_counter()
+    proc.start()
+    child.close()
+    try:
+        if not parent.poll(conf["IMPORT_SECONDS"]):
+            raise GenerationBudgetExceeded(task_type, "запуск процесса", 0, time.perf_counter() - t0)
+        status, payload, attempts = parent.recv()
+        if status == "ready":
+            t0 = time.perf_counter()
+            # SIGALRM внутри процесса стоит на тот же срок; тут — страховка, если генератор его глушит
+            if not parent.poll(max_seconds + 1.0 if max_seconds else None):
+                raise GenerationBudgetExceeded(task_type, "время", 0, time.perf_counter() - t0)
+            status, payload, attempts = parent.recv()
+    except EOFError:
+        raise RuntimeError(f"Процесс генератора '{task_type}' завершился без ответа")
+    finally:
+        parent.close()
+        if proc.is_alive():
+            proc.kill()
+        proc.join(timeout=1)
+
+    if status == "ok":
+        return payload, attempts
+    if status == "budget":
+        raise GenerationBudgetExceeded(task_type, payload, attempts, time.perf_counter() - t0)
+    raise RuntimeError(f"Генератор '{task_type}': {payload}")
+
+
+# ---------- счётчики по темам ----------
+class GenerationStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Dict[str, float]] = {}
+
+    def record(self, task_type: str, attempts: int, tasks: int, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            t = self._topics.setdefault(task_type, {
+                "calls": 0, "tasks": 0, "attempts": 0, "failures": 0, "seconds": 0.0, "max_ms": 0.0,
+            })
+            t["calls"] += 1
+            t["tasks"] += tasks
+            t["attempts"] += max(attempts, tasks)      # генератор без attempt(): одна попытка на задачу
+            t["failures"] += 1 if failed else 0
+            t["seconds"] += seconds
+            t["max_ms"] = max(t["max_ms"], seconds * 1000)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {}
+            for task_type, t in self._topics.items():
+                rejected = t["attempts"] - t["tasks"]
+                out[task_type] = {
+                    "calls": t["calls"],
+                    "tasks": t["tasks"],
+                    "attempts": t["attempts"],
+                    "rejection_rate": round(rejected / t["attempts"], 4) if t["attempts"] else None,
+                    "failures": t["failures"],
+                    "avg_ms": round(1000 * t["seconds"] / t["calls"], 2) if t["calls"] else None,
+                    "max_ms": round(t["max_ms"], 2),
+                }
+            return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._topics.clear()
+
+
+generation_stats = GenerationStats()
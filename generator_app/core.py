@@ -1,43 +1,199 @@
 # generator_app/core.py
-import pkgutil, importlib, inspect
+import pkgutil, importlib, inspect, random, time
+
+from . import budget
+from .param_index import get_index
+
+# границы сложности по умолчанию, если генератор не объявил MIN_COMPLEXITY/MAX_COMPLEXITY
+DEFAULT_MIN_COMPLEXITY, DEFAULT_MAX_COMPLEXITY = 1, 100
 
 class TaskController:
     """
     Ядро-диспетчер. Управляет регистрацией и вызовом генераторов.
-    Умеет автоподхватывать генераторы из пакета generator_app.generators.
+    Темы регистрируются по метаданным (topics.py) строками "пакет.модуль.Класс":
+    модуль генератора импортируется при первом get_generator, а не на старте.
+    Умеет (по желанию) автоподхватывать генераторы из пакета generator_app.generators.
     """
     def __init__(self):
+        # task_type -> класс генератора или "пакет.модуль.Класс" (грузится при первом обращении)
         self._generators = {}
+        self._labels = {}
+        # темы, найденные автопоиском (недоверенный код: вне главного потока — в отдельном процессе)
+        self._discovered = set()
+        # стратегии анализатора: task_type -> экземпляр или "пакет.модуль.Класс" (грузится при первом обращении)
+        self._strategies = {}
         print("✅ Ядро (TaskController) инициализировано.")
 
-    def register_generator(self, task_type: str, generator_class):
-        """Регистрирует генератор."""
+    def register_generator(self, task_type: str, generator_class, label=None):
+        """Регистрирует генератор: класс или строка "пакет.модуль.Класс" (импорт — лениво)."""
         self._generators[task_type] = generator_class
-        label = getattr(generator_class, "LABEL", task_type)
+        if isinstance(generator_class, str):
+            label = label or task_type
+        else:
+            label = label or getattr(generator_class, "LABEL", task_type)
+            self._mark_task_type(task_type, generator_class)
+        self._labels[task_type] = label
+        print(f"  -> Генератор для '{task_type}' зарегистрирован (label='{label}').")
+
+    @staticmethod
+    def _mark_task_type(task_type: str, generator_class):
         # на всякий случай проставим TASK_TYPE в класс, если не задан
         if not getattr(generator_class, "TASK_TYPE", None):
             setattr(generator_class, "TASK_TYPE", task_type)
-        print(f"  -> Генератор для '{task_type}' зарегистрирован (label='{label}').")
+
+    def get_generator(self, task_type: str):
+        """Класс генератора темы (импортируется при первом обращении) или None."""
+        generator_class = self._generators.get(task_type)
+        if not isinstance(generator_class, str):
+            return generator_class
+        try:
+            module_name, _, class_name = generator_class.rpartition(".")
+            generator_class = getattr(importlib.import_module(module_name), class_name)
+        except Exception as e:
+            print(f"⚠️ Не удалось загрузить генератор для '{task_type}': {e}")
+            return None
+        self._mark_task_type(task_type, generator_class)
+        self._generators[task_type] = generator_class
+        return generator_class
+
+    def register_strategy(self, task_type: str, strategy):
+        """
+        Регистрирует стратегию анализатора для темы (см. generator_app/strategies).
+        strategy — экземпляр, класс или строка "generator_app.strategies.geometric.SeriesClass1Strategy";
+        класс/строка превращаются в экземпляр лениво, при первом get_strategy.
+        """
+        self._strategies[task_type] = strategy
+
+    def get_strategy(self, task_type: str):
+        """Стратегия темы или None, если её не зарегистрировали."""
+        strategy = self._strategies.get(task_type)
+        if strategy is None or not isinstance(strategy, (str, type)):
+            return strategy
+        try:
+            if isinstance(strategy, str):
+                module_name, _, class_name = strategy.rpartition(".")
+                strategy = getattr(importlib.import_module(module_name), class_name)
+            instance = strategy()
+        except Exception as e:
+            print(f"⚠️ Не удалось загрузить стратегию для '{task_type}': {e}")
+            return None
+        self._strategies[task_type] = instance
+        return instance
+
+    def complexity_range(self, task_type: str):
+        """(min, max) допустимой сложности темы — MIN_COMPLEXITY/MAX_COMPLEXITY генератора."""
+        generator_class = self.get_generator(task_type)
+        return (getattr(generator_class, "MIN_COMPLEXITY", DEFAULT_MIN_COMPLEXITY),
+                getattr(generator_class, "MAX_COMPLEXITY", DEFAULT_MAX_COMPLEXITY))
+
+    def complexity_error(self, task_type: str, complexity):
+        """Текст ошибки, если тема неизвестна или сложность вне допустимого; None — всё в порядке."""
+        if self.get_generator(task_type) is None:
+            return f"Генератор '{task_type}' не найден"
+        if complexity is None:
+            return None
+        lo, hi = self.complexity_range(task_type)
+        if not lo <= complexity <= hi:
+            return f"'complexity' для '{task_type}' должна быть от {lo} до {hi}"
+        return None
 
     def topics(self):
-        """Список тем для UI: [{'id': 'series_class_1', 'label': '...'}, ...]"""
-        items = [{"id": k, "label": getattr(v, "LABEL", k)} for k, v in self._generators.items()]
+        """Список тем для UI: [{'id': 'series_class_1', 'label': '...'}, ...] (без импорта генераторов)"""
+        items = [{"id": k, "label": self._labels.get(k, k)} for k in self._generators]
         # можно отсортировать по label
         return sorted(items, key=lambda x: x["label"])
 
-    def create_task(self, task_type: str, complexity: int):
-        generator_class = self._generators.get(task_type)
+    def create_task(self, task_type: str, complexity: int, seed=None, rng=None):
+        """
+        Одна задача. С явным seed результат детерминирован:
+        (task_type, complexity, seed) -> та же задача (и task.seed == seed).
+        """
+        generator_class = self.get_generator(task_type)
         if not generator_class:
             print(f"⚠️ Ошибка: Генератор для типа '{task_type}' не найден.")
             return None
-        generator_instance = generator_class()
         print(f"⚙️ Ядро: Запрашиваю новую задачу у генератора '{task_type}'...")
-        return generator_instance.generate()
+        kwargs = {} if complexity is None else {"complexity": complexity}
+        # сид передаём только если он задан — старые генераторы без seed/rng тоже работают
+        if seed is not None:
+            kwargs["seed"] = seed
+        if rng is not None:
+            kwargs["rng"] = rng
+        return self._run_budgeted(task_type, generator_class, 1, "generate", kwargs=kwargs)
+
+    def _run_budgeted(self, task_type: str, generator_class, n: int, method: str,
+                      args=(), kwargs=None, repeat=None):
+        """
+        generator_class().method(*args, **kwargs) (repeat раз) в рамках бюджета (budget.py) + счётчики по теме.
+        Недоверенный генератор вне главного потока идёт в отдельный процесс (budget.run_isolated).
+        Не уложился — GenerationBudgetExceeded (сообщение с темой, попытками и временем).
+        """
+        t0 = time.perf_counter()
+        try:
+            if budget.should_isolate(generator_class, task_type in self._discovered):
+                result, attempts = budget.run_isolated(task_type, generator_class, n, method, args, kwargs, repeat)
+            else:
+                with budget.enforce(task_type, generator_class, scale=n) as b:
+                    result = budget.call_generator(generator_class, method, args, kwargs, repeat)
+                attempts = b.attempts
+        except budget.GenerationBudgetExceeded as e:
+            budget.generation_stats.record(task_type, e.attempts, 0, time.perf_counter() - t0, failed=True)
+            print(f"⛔ {e}")
+            raise
+        budget.generation_stats.record(task_type, attempts, n, time.perf_counter() - t0)
+        return result
+
+    def generation_stats(self):
+        """{тема: {calls, tasks, attempts, rejection_rate, failures, avg_ms, max_ms}} этого процесса."""
+        return budget.generation_stats.snapshot()
+
+    def create_tasks(self, task_type: str, n: int, complexity=None, seed=None):
+        """
+        Пакетная генерация n задач одного типа (листы, банки вариантов на группу).
+        Если у генератора есть generate_batch(n, complexity, seed) — зовём его один раз
+        (векторная выборка параметров), иначе — обычный цикл по generate().
+        Батч воспроизводим целиком по (task_type, n, complexity, seed); у каждой задачи
+        свой task.seed, по которому детерминированно строятся её шаги.
+        """
+        generator_class = self.get_generator(task_type)
+        if not generator_class:
+            print(f"⚠️ Ошибка: Генератор для типа '{task_type}' не найден.")
+            return None
+        kwargs = {} if complexity is None else {"complexity": complexity}
+
+        if callable(getattr(generator_class, "generate_batch", None)):
+            return self._run_budgeted(task_type, generator_class, n, "generate_batch",
+                                      (n,), {"seed": seed, **kwargs})
+        return self._run_budgeted(task_type, generator_class, n, "generate",
+                                  kwargs={"rng": random.Random(seed), **kwargs}, repeat=n)
+
+    # === ЁМКОСТЬ ТЕМ ===
+    def variant_count(self, task_type: str, complexity=None):
+        """Сколько различных наборов параметров у темы на данной сложности (None — неизвестно)."""
+        generator_class = self.get_generator(task_type)
+        if not generator_class:
+            return None
+        index = get_index(generator_class, complexity)
+        return len(index) if index is not None else None
+
+    def capacity_report(self, complexities=(None,)):
+        """[{'id', 'label', 'complexity', 'variants'}, ...] — для планирования больших групп."""
+        rows = []
+        for topic in self.topics():
+            for complexity in complexities:
+                rows.append({
+                    **topic,
+                    "complexity": complexity,
+                    "variants": self.variant_count(topic["id"], complexity),
+                })
+        return rows
 
     # === АВТОПОИСК ГЕНЕРАТОРОВ ===
     def autodiscover_generators(self):
         """
-        Загружает все модули из generator_app.generators и регистрирует генераторы.
+        Загружает все модули из generator_app.generators и регистрирует генераторы,
+        которых нет в topics.py (темы из метаданных не перетираются).
+        Включается settings.GENERATOR_AUTODISCOVER = True; по умолчанию хватает topics.py.
         Поддерживаются два паттерна:
         1) В модуле есть классы с методом generate() и атрибутом TASK_TYPE (и опц. LABEL)
         2) В модуле определён список __all_generators__ = [(task_type, Class), ...]
@@ -48,8 +204,11 @@ class TaskController:
 
         for m in pkgutil.iter_modules(gens_pkg.__path__):
             mod_name = f"{base_pkg_name}.{m.name}"
+            import_seconds = budget.budget_settings()["IMPORT_SECONDS"]
             try:
-                module = importlib.import_module(mod_name)
+                # зависший на импорте модуль не должен вешать старт воркера
+                with budget.time_limit(import_seconds, lambda: TimeoutError(f"импорт дольше {import_seconds} s")):
+                    module = importlib.import_module(mod_name)
             except Exception as e:
                 print(f"⚠️ Не удалось импортировать {mod_name}: {e}")
                 continue
@@ -58,8 +217,11 @@ class TaskController:
             pairs = getattr(module, "__all_generators__", None)
             if pairs:
                 for task_type, cls in pairs:
+                    if task_type in self._generators:
+                        continue
                     try:
                         self.register_generator(task_type, cls)
+                        self._discovered.add(task_type)
                     except Exception as e:
                         print(f"⚠️ Ошибка регистрации {task_type} из {mod_name}: {e}")
                 continue
@@ -70,7 +232,10 @@ class TaskController:
                     continue
                 task_type = getattr(obj, "TASK_TYPE", None)
                 if task_type and callable(getattr(obj, "generate", None)):
+                    if task_type in self._generators:
+                        continue
                     try:
                         self.register_generator(task_type, obj)
+                        self._discovered.add(task_type)
                     except Exception as e:
                         print(f"⚠️ Ошибка регистрации {task_type} из {mod_name}: {e}")
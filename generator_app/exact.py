@@ -0,0 +1,85 @@
+# generator_app/exact.py
+"""
+Точное ядро на fractions.Fraction для рядов из генераторов.
+
+У всех наших тем ответы имеют замкнутую форму, поэтому sympy.summation/limit
+здесь не нужны:
+  - геометрический ряд ∑ r^k:  a_n = r^n,  S_n = (1 - r^(n+1)) / (1 - r),  S = 1 / (1 - r)
+  - рациональный общий член P(n)/Q(n): предел = отношение старших коэффициентов
+    (или 0, если степень числителя меньше).
+
+Строки ответов совпадают с sympy.sstr для Rational ('3', '-3/4').
+Если ответ не выражается точной дробью (деление на 0, бесконечный предел),
+функции возвращают None — вызывающий код уходит в sympy.
+"""
+from fractions import Fraction
+from typing import Optional, Sequence, Union
+
+Number = Union[int, Fraction]
+
+
+def fraction_str(x: Optional[Number]) -> Optional[str]:
+    """Точная дробь -> строка в формате sympy.sstr; None пропускаем как есть."""
+    if x is None:
+        return None
+    return str(Fraction(x))
+
+
+# ---------- геометрический ряд ∑_{k>=0} r^k ----------
+def geometric_an(r: Fraction, n: int) -> Fraction:
+    return Fraction(r) ** n
+
+
+def geometric_sn(r: Fraction, n: int) -> Optional[Fraction]:
+    """Сумма членов с k=0..n."""
+    r = Fraction(r)
+    if r == 1:
+        return None
+    return (1 - r ** (n + 1)) / (1 - r)
+
+
+def geometric_sum(r: Fraction) -> Optional[Fraction]:
+    """Сумма бесконечного ряда; None, если ряд расходится."""
+    r = Fraction(r)
+    if abs(r) >= 1:
+        return None
+    return 1 / (1 - r)
+
+
+# ---------- рациональный общий член P(n)/Q(n) ----------
+# Многочлены задаём коэффициентами от младшего к старшему: (b, 0, p) == b + p*n^2.
+def poly_degree(coeffs: Sequence[Number]) -> int:
+    for i in range(len(coeffs) - 1, -1, -1):
+        if coeffs[i] != 0:
+            return i
+    return -1
+
+
+def poly_eval(coeffs: Sequence[Number], x: Number) -> Fraction:
+    acc = Fraction(0)
+    for c in reversed(coeffs):
+        acc = acc * x + c
+    return acc
+
+
+def rational_value(num: Sequence[Number], den: Sequence[Number], x: Number) -> Optional[Fraction]:
+    """P(x)/Q(x); None, если знаменатель обращается в ноль."""
+    q = poly_eval(den, x)
+    if q == 0:
+        return None
+    return poly_eval(num, x) / q
+
+
+def rational_limit(num: Sequence[Number], den: Sequence[Number]) -> Optional[Fraction]:
+    """
+    lim_{n→∞} P(n)/Q(n).
+    None — если предел бесконечен (deg P > deg Q) или Q тождественно ноль.
+    """
+    dp, dq = poly_degree(num), poly_degree(den)
+    if dq < 0:
+        return None
+    if dp < dq:
+        return Fraction(0)
+    if dp > dq:
+        return None
+    return Fraction(num[dp]) / Fraction(den[dq])
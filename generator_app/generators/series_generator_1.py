@@ -1,9 +1,13 @@
 # series_generator.py (финальная гибкая версия)
 
+import math
 import random
 from fractions import Fraction
 from dataclasses import dataclass, field
 from ..task_template import BaseTask 
+from .. import budget
+from ..batch import get_numpy, make_np_rng
+from ..seeding import SEED_MAX, resolve_seed
 
 @dataclass
 class SeriesTaskClass1(BaseTask):
@@ -21,15 +25,59 @@ class SeriesGeneratorClass1:
     """
     Генерирует задачи, напрямую следуя фундаментальному правилу сходимости.
     """
-    def generate(self, complexity: int = 10) -> SeriesTaskClass1:
+    # Допустимая сложность (знаменатель c от 2 до complexity); проверяется в api_set_questions
+    MIN_COMPLEXITY, MAX_COMPLEXITY = 2, 100
+
+    # Пространство параметров — только для подсчёта вариантов (param_index);
+    # сама выборка ниже не равномерна по кортежам: сначала c, потом b.
+    # Условие показывает дробь b/c сокращённой, поэтому различные варианты —
+    # только несократимые пары (2/4 и 1/2 — одна и та же задача).
+    @staticmethod
+    def param_space(complexity: int = 10) -> dict:
+        return {"c": range(2, complexity + 1), "b": range(-complexity + 1, complexity)}
+
+    @staticmethod
+    def accepts(params: dict) -> bool:
+        b, c = params["b"], params["c"]
+        return b != 0 and abs(b) < c and math.gcd(abs(b), c) == 1
+
+    def generate(self, complexity: int = 10, seed=None, rng=None) -> SeriesTaskClass1:
+        seed = resolve_seed(seed, rng)
+        rng = random.Random(seed)
+        budget.attempt()  # параметры без индекса: одна попытка на задачу (см. budget.py)
+
         # 1. Генерируем знаменатель. 'complexity' - это максимальный размер знаменателя.
         # Это единственный "рычаг" управления.
-        c = random.randint(2, complexity)
+        c = rng.randint(2, complexity)
 
         # 2. Создаём список ВСЕХ возможных числителей, удовлетворяющих |b| < c и b != 0
         possible_b = [i for i in range(-c + 1, c) if i != 0]
         
         # 3. Выбираем случайный 'b' из этого списка
-        b = random.choice(possible_b)
-        
-        return SeriesTaskClass1(b=b, c=c)
\ No newline at end of file
+        b = rng.choice(possible_b)
+
+        # 4. Сокращаем: параметры задачи совпадают с тем, что видно в условии (и с кортежем индекса)
+        r = Fraction(b, c)
+        return SeriesTaskClass1(b=r.numerator, c=r.denominator, seed=seed)
+
+    def generate_batch(self, n: int, complexity: int = 10, seed=None) -> list:
+        """n задач разом: все c и b тянутся одним векторным вызовом NumPy."""
+        if n <= 0:
+            return []
+        np = get_numpy()
+        if np is None:
+            rng = random.Random(seed)
+            return [self.generate(complexity, rng=rng) for _ in range(n)]
+        rng = make_np_rng(seed)
+        seeds = rng.integers(0, SEED_MAX, size=n)
+        c = rng.integers(2, complexity + 1, size=n)
+        # b равномерно из {-(c-1)..-1, 1..c-1}: берём k из [0, 2(c-1)) и выкидываем ноль
+        k = rng.integers(0, 2 * (c - 1))
+        b = k - (c - 1)
+        b = np.where(b >= 0, b + 1, b)
+        g = np.gcd(np.abs(b), c)
+        b, c = b // g, c // g
+        return [
+            SeriesTaskClass1(b=bi, c=ci, seed=si)
+            for bi, ci, si in zip(b.tolist(), c.tolist(), seeds.tolist())
+        ]
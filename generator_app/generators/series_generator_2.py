@@ -3,6 +3,9 @@
 import random
 from dataclasses import dataclass, field
 from ..task_template import BaseTask
+from .. import budget
+from ..batch import get_numpy, make_np_rng
+from ..seeding import SEED_MAX, resolve_seed
 
 @dataclass
 class SeriesTaskClass2(BaseTask):
@@ -17,7 +20,24 @@ class SeriesGeneratorClass2:
     """
     Генерирует задачи, напрямую следуя фундаментальному правилу сходимости.
     """
-    def generate(self, complexity: int = 12) -> SeriesTaskClass2:
+    # Допустимая сложность (|c| до complexity, меньше 3 поднимается до 3)
+    MIN_COMPLEXITY, MAX_COMPLEXITY = 1, 100
+
+    # Пространство параметров — для подсчёта вариантов (param_index)
+    @staticmethod
+    def param_space(complexity: int = 12) -> dict:
+        complexity = max(complexity, 3)
+        return {"c": range(-complexity, complexity + 1)}
+
+    @staticmethod
+    def accepts(params: dict) -> bool:
+        return params["c"] > 0 or params["c"] < -2
+
+    def generate(self, complexity: int = 12, seed=None, rng=None) -> SeriesTaskClass2:
+        seed = resolve_seed(seed, rng)
+        rng = random.Random(seed)
+        budget.attempt()  # параметры без индекса: одна попытка на задачу (см. budget.py)
+
         # 1. 'complexity' - это максимальное абсолютное значение 'c'.
         # Убедимся, что оно не меньше 3, чтобы обеспечить наличие отрицательных вариантов.
         if complexity < 3:
@@ -30,6 +50,22 @@ class SeriesGeneratorClass2:
         all_possible_cs = positive_cs + negative_cs
         
         # 3. Выбираем случайный 'c' из этого полного списка
-        c = random.choice(all_possible_cs)
+        c = rng.choice(all_possible_cs)
         
-        return SeriesTaskClass2(c=c)
\ No newline at end of file
+        return SeriesTaskClass2(c=c, seed=seed)
+
+    def generate_batch(self, n: int, complexity: int = 12, seed=None) -> list:
+        """n задач разом: выбор c из того же множества, одним вызовом NumPy."""
+        if n <= 0:
+            return []
+        np = get_numpy()
+        if np is None:
+            rng = random.Random(seed)
+            return [self.generate(complexity, rng=rng) for _ in range(n)]
+        if complexity < 3:
+            complexity = 3
+        all_possible_cs = np.concatenate([np.arange(1, complexity + 1), np.arange(-complexity, -2)])
+        rng = make_np_rng(seed)
+        cs = rng.choice(all_possible_cs, size=n)
+        seeds = rng.integers(0, SEED_MAX, size=n)
+        return [SeriesTaskClass2(c=c, seed=s) for c, s in zip(cs.tolist(), seeds.tolist())]
@@ -3,6 +3,9 @@
 import random
 from dataclasses import dataclass, field
 from ..task_template import BaseTask
+from ..batch import get_numpy, make_np_rng
+from ..param_index import get_index
+from ..seeding import SEED_MAX, resolve_seed
 
 @dataclass
 class SeriesTaskClass3(BaseTask):
@@ -18,22 +21,56 @@ class SeriesTaskClass3(BaseTask):
         d_sign = "+" if self.d >= 0 else ""
         return f"$$\\sum_{{k=1}}^{{\\infty}}\\frac{{{self.b}+{self.p}k^2}}{{{self.c}k^2{d_sign}{self.d}k}}$$"
 
+    def rational_term(self):
+        """a_n = (b + p n^2) / (c n^2 + d n): коэффициенты числителя и знаменателя от младшего к старшему."""
+        return (self.b, 0, self.p), (0, self.d, self.c)
+
 class SeriesGeneratorClass3:
     """
     Генерирует задачи по необходимому условию, гибко следуя ТЗ.
     Формула: (b+pk^2)/(ck^2+dk)
     """
-    def generate(self, complexity: int = 10) -> SeriesTaskClass3:
-        # Генерируем параметры, соблюдая все условия из ТЗ
-        while True:
-            c = random.randint(1, 9)
-            d = random.randint(0, 9)
-            b = random.randint(-9, -1)
-            p = random.randint(-9, 9)
-
-            # Проверяем условия, чтобы избежать неопределенностей
-            if c == -d: continue
-            if p == c and b == d: continue
-            break
-        
-        return SeriesTaskClass3(b=b, c=c, d=d, p=p)
\ No newline at end of file
+    # сложность на пространство не влияет — границы только общие
+    MIN_COMPLEXITY, MAX_COMPLEXITY = 1, 100
+
+    @staticmethod
+    def param_space(complexity: int = 10) -> dict:
+        """Дискретное пространство параметров (от complexity не зависит)."""
+        return {"c": range(1, 10), "d": range(0, 10), "b": range(-9, 0), "p": range(-9, 10)}
+
+    @staticmethod
+    def accepts(params: dict) -> bool:
+        c, d, b, p = params["c"], params["d"], params["b"], params["p"]
+        # Проверяем условия, чтобы избежать неопределенностей
+        if c == -d:
+            return False
+        if p == c and b == d:
+            return False
+        return True
+
+    def generate(self, complexity: int = 10, seed=None, rng=None) -> SeriesTaskClass3:
+        seed = resolve_seed(seed, rng)
+        rng = random.Random(seed)
+
+        # Параметры берём из заранее перечисленных допустимых кортежей:
+        # то же равномерное распределение, что и у цикла с отбраковкой, но за O(1)
+        params = get_index(type(self), complexity).sample(rng)
+        return SeriesTaskClass3(**params, seed=seed)
+
+    def generate_batch(self, n: int, complexity: int = 10, seed=None) -> list:
+        """n задач разом: случайные номера строк индекса одним вызовом NumPy."""
+        if n <= 0:
+            return []
+        np = get_numpy()
+        if np is None:
+            rng = random.Random(seed)
+            return [self.generate(complexity, rng=rng) for _ in range(n)]
+        rng = make_np_rng(seed)
+        arr = get_index(type(self), complexity).sample_many(rng, n)
+        seeds = rng.integers(0, SEED_MAX, size=n)
+        return [
+            SeriesTaskClass3(b=b, c=c, d=d, p=p, seed=s)
+            for b, c, d, p, s in zip(
+                arr["b"].tolist(), arr["c"].tolist(), arr["d"].tolist(), arr["p"].tolist(), seeds.tolist()
+            )
+        ]
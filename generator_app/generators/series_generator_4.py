@@ -3,6 +3,9 @@
 import random
 from dataclasses import dataclass, field
 from ..task_template import BaseTask
+from ..batch import get_numpy, make_np_rng
+from ..param_index import get_index
+from ..seeding import SEED_MAX, resolve_seed
 
 @dataclass
 class SeriesTaskClass4(BaseTask):
@@ -19,22 +22,56 @@ class SeriesTaskClass4(BaseTask):
         d_val = abs(self.d)
         return f"$$\\sum_{{k=0}}^{{\\infty}}\\frac{{{self.b}+{self.p}k}}{{{self.c}k {d_sign} {d_val}}}$$"
 
+    def rational_term(self):
+        """a_n = (b + p n) / (c n - d): коэффициенты числителя и знаменателя от младшего к старшему."""
+        return (self.b, self.p), (-self.d, self.c)
+
 class SeriesGeneratorClass4:
     """
     Генерирует задачи по необходимому условию, гибко следуя ТЗ.
     Формула: (b+pk)/(ck-d)
     """
-    def generate(self, complexity: int = 10) -> SeriesTaskClass4:
-        # Генерируем параметры, соблюдая все условия из ТЗ
-        while True:
-            c = random.randint(1, 9)
-            d = random.randint(0, 9)
-            b = random.randint(1, 9)
-            p = random.randint(-9, 9)
-
-            # Проверяем условия
-            if c == d: continue
-            if p == c and d == -b: continue
-            break
-            
-        return SeriesTaskClass4(b=b, c=c, d=d, p=p)
\ No newline at end of file
+    # сложность на пространство не влияет — границы только общие
+    MIN_COMPLEXITY, MAX_COMPLEXITY = 1, 100
+
+    @staticmethod
+    def param_space(complexity: int = 10) -> dict:
+        """Дискретное пространство параметров (от complexity не зависит)."""
+        return {"c": range(1, 10), "d": range(0, 10), "b": range(1, 10), "p": range(-9, 10)}
+
+    @staticmethod
+    def accepts(params: dict) -> bool:
+        c, d, b, p = params["c"], params["d"], params["b"], params["p"]
+        # Проверяем условия
+        if c == d:
+            return False
+        if p == c and d == -b:
+            return False
+        return True
+
+    def generate(self, complexity: int = 10, seed=None, rng=None) -> SeriesTaskClass4:
+        seed = resolve_seed(seed, rng)
+        rng = random.Random(seed)
+
+        # Параметры берём из заранее перечисленных допустимых кортежей:
+        # то же равномерное распределение, что и у цикла с отбраковкой, но за O(1)
+        params = get_index(type(self), complexity).sample(rng)
+        return SeriesTaskClass4(**params, seed=seed)
+
+    def generate_batch(self, n: int, complexity: int = 10, seed=None) -> list:
+        """n задач разом: случайные номера строк индекса одним вызовом NumPy."""
+        if n <= 0:
+            return []
+        np = get_numpy()
+        if np is None:
+            rng = random.Random(seed)
+            return [self.generate(complexity, rng=rng) for _ in range(n)]
+        rng = make_np_rng(seed)
+        arr = get_index(type(self), complexity).sample_many(rng, n)
+        seeds = rng.integers(0, SEED_MAX, size=n)
+        return [
+            SeriesTaskClass4(b=b, c=c, d=d, p=p, seed=s)
+            for b, c, d, p, s in zip(
+                arr["b"].tolist(), arr["c"].tolist(), arr["d"].tolist(), arr["p"].tolist(), seeds.tolist()
+            )
+        ]
@@ -0,0 +1,208 @@
+# generator_app/grading_pool.py
+"""
+Пул процессов-проверяющих для медленного (sympy) пути сравнения ответов.
+
+Зачем: ввод вроде 9**9**9 или огромное вложенное выражение может надолго занять
+CPU/память веб-воркера. Здесь каждая проверка уходит в отдельный долгоживущий
+процесс по Pipe, с ограничениями:
+  - TIMEOUT   — лимит по времени на одну проверку; по истечении процесс убивается,
+                вместо него в фоне поднимается новый, ответ — вердикт "timeout";
+  - MAX_RSS_MB — лимит памяти: RLIMIT_AS внутри процесса (MemoryError -> "memory")
+                 плюс перезапуск процесса, если его пиковый RSS превысил лимит.
+sympy импортируется один раз на процесс-проверяющий, а не в каждом веб-воркере.
+
+Включается в settings:
+    GRADING_POOL = {"ENABLED": True, "WORKERS": 2, "TIMEOUT": 2.0, "MAX_RSS_MB": 1024}
+Быстрый путь (answer_parser) по-прежнему выполняется прямо в веб-воркере.
+По умолчанию пул выключен (ENABLED=False): тогда sympy работает в самом веб-воркере,
+а ввод, который sympy будет считать бесконечно (9**9**9, 100!), отклоняется заранее
+(answer_parser.sympy_input_ok, вердикт "too_big").
+"""
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - не-UNIX
+    resource = None
+
+VERDICT_OK = "ok"
+VERDICT_TIMEOUT = "timeout"
+VERDICT_MEMORY = "memory"
+VERDICT_BUSY = "busy"
+VERDICT_ERROR = "error"
+VERDICT_TOO_BIG = "too_big"     # пул выключен, а ввод слишком тяжёл для sympy в веб-воркере
+
+DEFAULTS = {"ENABLED": False, "WORKERS": 2, "TIMEOUT": 2.0, "MAX_RSS_MB": 1024}
+
+
+# ---------- процесс-проверяющий ----------
+def _worker_main(conn, max_rss_mb: int) -> None:
+    limit = max_rss_mb * 1024 * 1024
+    if resource is not None and max_rss_mb:
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+
+    # sympy грузится здесь, один раз
+    from .analyzer import _sympy_equal_local
+    from .identity import formulas_equal
+
+    ops = {"equal": _sympy_equal_local, "formula": formulas_equal}
+
+    while True:
+        try:
+            op, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            status, ok = VERDICT_OK, bool(ops[op](*args, **kwargs))
+        except MemoryError:
+            status, ok = VERDICT_MEMORY, False
+        except Exception:
+            status, ok = VERDICT_ERROR, False
+
+        recycle = status == VERDICT_MEMORY
+        if resource is not None and max_rss_mb:
+            # ru_maxrss в Linux — в килобайтах
+            recycle = recycle or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 > limit
+        try:
+            conn.send((status, ok, recycle))
+        except (EOFError, OSError):
+            return
+        if recycle:
+            return
+
+
+class _Worker:
+    def __init__(self, proc, conn):
+        self.proc = proc
+        self.conn = conn
+
+    def kill(self) -> None:
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.proc.is_alive():
+            self.proc.kill()
+        self.proc.join(timeout=1)
+
+
+def _as_text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+# ---------- пул ----------
+class GradingPool:
+    def __init__(self, workers: int = 2, timeout: float = 2.0, max_rss_mb: int = 1024):
+        self.timeout = float(timeout)
+        self.max_rss_mb = int(max_rss_mb)
+        self._ctx = multiprocessing.get_context("spawn")   # не форкаем веб-воркер с его потоками
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self._closed = False
+        for _ in range(max(1, int(workers))):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child, self.max_rss_mb), daemon=True)
+        proc.start()
+        child.close()
+        return _Worker(proc, parent)
+
+    def _replace(self, worker: _Worker) -> None:
+        """Убиваем процесс и поднимаем новый в фоне, чтобы не держать запрос на импорте sympy."""
+        worker.kill()
+        if self._closed:
+            return
+
+        def _respawn():
+            self._idle.put(self._spawn())
+
+        threading.Thread(target=_respawn, name="grading-respawn", daemon=True).start()
+
+    def _count(self, verdict: str) -> None:
+        with self._stats_lock:
+            self._stats[verdict] = self._stats.get(verdict, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def equal(self, a: Any, b: Any, *, tol: float = 1e-6) -> Tuple[bool, str]:
+        """-> (совпадает ли, вердикт). При любом вердикте, кроме "ok", ответ не засчитывается."""
+        return self._call("equal", (_as_text(a), _as_text(b)), {"tol": tol})
+
+    def formula_equal(self, user_value: Any, expected: Any, **options) -> Tuple[bool, str]:
+        """То же для formula-шагов (identity.formulas_equal)."""
+        return self._call("formula", (_as_text(user_value), _as_text(expected)), options)
+
+    def _call(self, op: str, args: tuple, kwargs: Dict[str, Any]) -> Tuple[bool, str]:
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            self._count(VERDICT_BUSY)
+            return False, VERDICT_BUSY
+
+        keep = False
+        try:
+            worker.conn.send((op, args, kwargs))
+            if not worker.conn.poll(self.timeout):
+                self._count(VERDICT_TIMEOUT)
+                return False, VERDICT_TIMEOUT
+            status, ok, recycle = worker.conn.recv()
+            keep = not recycle
+            self._count(status)
+            return bool(ok), status
+        except (EOFError, OSError):
+            # процесс умер посреди проверки (обычно — OOM-killer)
+            self._count(VERDICT_MEMORY)
+            return False, VERDICT_MEMORY
+        finally:
+            if keep and worker.proc.is_alive():
+                self._idle.put(worker)
+            else:
+                self._replace(worker)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+
+_pool: Optional[GradingPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def pool_settings() -> Dict[str, Any]:
+    try:
+        from django.conf import settings
+        user = getattr(settings, "GRADING_POOL", {}) if settings.configured else {}
+    except Exception:
+        user = {}
+    return {**DEFAULTS, **(user or {})}
+
+
+def get_pool() -> Optional[GradingPool]:
+    """Пул текущего процесса (создаётся лениво); None, если пул выключен."""
+    global _pool, _pool_pid
+    conf = pool_settings()
+    if not conf["ENABLED"]:
+        return None
+    with _pool_lock:
+        # после fork пул родителя нам не принадлежит — создаём свой
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = GradingPool(conf["WORKERS"], conf["TIMEOUT"], conf["MAX_RSS_MB"])
+            _pool_pid = os.getpid()
+        return _pool
@@ -1,4 +1,6 @@
 # html_renderer.py
+from django.utils.html import escape
+
 from .task_template import AnalyzedTask
 
 class HTMLRenderer:
@@ -52,4 +54,14 @@ class HTMLRenderer:
         final_html = self.template.format(task_blocks=all_task_html)
         with open(filename, 'w', encoding='utf-8') as f:
             f.write(final_html)
-        print(f"✅ HTML-файл '{filename}' успешно создан. Откройте его в браузере.")
\ No newline at end of file
+        print(f"✅ HTML-файл '{filename}' успешно создан. Откройте его в браузере.")
+
+
+def task_html(task, renderer=None) -> str:
+    """HTML одной задачи для AJAX-ответа конструктора. Если у рендерера нет render() — простой фоллбек."""
+    try:
+        if renderer is not None and hasattr(renderer, "render"):
+            return renderer.render(task)
+    except Exception:
+        pass
+    return f"<div class='task-container'><pre>{escape(str(task))}</pre></div>"
@@ -0,0 +1,142 @@
+# generator_app/identity.py
+"""
+Проверка равенства формул (ответ — выражение от n и т.п.) без simplify.
+
+simplify(ea - eb) для замкнутых форм вроде S_n = (1 - r^(n+1))/(1 - r) бывает
+очень медленным, а иногда так и не сводит разность к нулю. Вместо этого:
+  1) обе формулы lambdify-им (numpy, если он есть, иначе math);
+  2) считаем их в SAMPLES случайных точках области одним векторным вызовом;
+  3) точки, где значения явно разные, сразу дают «не равно»;
+  4) пограничные точки (почти совпали / inf / nan / ошибка вычисления)
+     перепроверяем точно: подставляем рациональные значения в sympy.
+Две разные формулы (рациональные функции, степени с целым n) совпадают лишь
+в конечном числе точек, поэтому случайная выборка их различает.
+
+Точки берутся из детерминированного ГСЧ (seed), чтобы повторная проверка
+того же ответа давала тот же вердикт.
+"""
+import random
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .answer_parser import MAX_LENGTH
+from .batch import get_numpy
+
+SAMPLES = 24
+RTOL = 1e-9
+ATOL = 1e-12
+BORDER_RTOL = 1e-6          # расхождение меньше этого — ещё не «явно разные», перепроверяем точно
+DEFAULT_DOMAIN = (0, 30)
+
+
+def _parse(text: Any, names: Sequence[str]):
+    import sympy
+    from sympy.parsing.sympy_parser import (
+        convert_xor, implicit_multiplication, parse_expr, standard_transformations,
+    )
+
+    if text is None:
+        return None
+    txt = str(text).strip()
+    if not txt or len(txt) > MAX_LENGTH:
+        return None
+    local = {name: sympy.Symbol(name) for name in names}
+    local.update({"e": sympy.E, "pi": sympy.pi})
+    try:
+        # '^' — степень, '2n' — 2*n: так пишут студенты
+        return parse_expr(txt, local_dict=local, transformations=standard_transformations + (convert_xor, implicit_multiplication))
+    except Exception:
+        return None
+
+
+def sample_points(domain: Tuple[int, int], names: Sequence[str], samples: int, seed: int) -> List[Tuple[int, ...]]:
+    """Целые точки области [lo, hi] по каждой переменной; если точек мало — берём все."""
+    lo, hi = int(domain[0]), int(domain[1])
+    rng = random.Random(seed)
+    values = list(range(lo, hi + 1))
+    if len(names) == 1 and len(values) <= samples:
+        return [(v,) for v in values]
+    return [tuple(rng.choice(values) for _ in names) for _ in range(samples)]
+
+
+def _evaluate(expr, symbols, points: List[Tuple[int, ...]]) -> List[Optional[float]]:
+    """Значения выражения во всех точках; None — не удалось посчитать (комплексное, ошибка)."""
+    import sympy
+
+    np = get_numpy()
+    if np is not None:
+        try:
+            f = sympy.lambdify(symbols, expr, modules="numpy")
+            cols = [np.array([p[i] for p in points], dtype=float) for i in range(len(symbols))]
+            with np.errstate(all="ignore"):
+                vals = np.broadcast_to(np.asarray(f(*cols)), (len(points),))
+            if not np.iscomplexobj(vals):
+                return [float(v) for v in vals.astype(float)]
+        except Exception:
+            pass        # падаем на поточечный путь ниже
+
+    f = sympy.lambdify(symbols, expr, modules="math")
+    out: List[Optional[float]] = []
+    for p in points:
+        try:
+            out.append(float(f(*[float(v) for v in p])))
+        except Exception:
+            out.append(None)
+    return out
+
+
+def _exact_equal_at(eu, ee, symbols, point: Tuple[int, ...]) -> bool:
+    import sympy
+
+    subs = {s: sympy.Rational(Fraction(v)) for s, v in zip(symbols, point)}
+    try:
+        diff = eu.subs(subs) - ee.subs(subs)
+        return diff == 0 or sympy.simplify(diff) == 0
+    except Exception:
+        return False
+
+
+def formulas_equal(
+    user_value: Any,
+    expected: Any,
+    *,
+    variables: Sequence[str] = ("n",),
+    domain: Tuple[int, int] = DEFAULT_DOMAIN,
+    samples: int = SAMPLES,
+    seed: int = 0,
+) -> bool:
+    """Совпадает ли формула студента с ожидаемой на области domain (целые значения переменных)."""
+    import sympy
+
+    names = tuple(variables)
+    eu, ee = _parse(user_value, names), _parse(expected, names)
+    if eu is None or ee is None:
+        return False
+    symbols = [sympy.Symbol(name) for name in names]
+    if not (eu.free_symbols | ee.free_symbols) <= set(symbols):
+        return False        # посторонние буквы в ответе
+    if eu == ee:
+        return True
+
+    points = sample_points(domain, names, samples, seed)
+    vu, ve = _evaluate(eu, symbols, points), _evaluate(ee, symbols, points)
+
+    border = []
+    for p, a, b in zip(points, vu, ve):
+        finite = a is not None and b is not None and a == a and b == b and abs(a) != float("inf") and abs(b) != float("inf")
+        if finite:
+            if abs(a - b) <= ATOL + RTOL * abs(b):
+                continue
+            if abs(a - b) > BORDER_RTOL * (1 + abs(b)):
+                return False
+        border.append(p)
+
+    return all(_exact_equal_at(eu, ee, symbols, p) for p in border)
+
+
+def step_options(step: Dict[str, Any]) -> Dict[str, Any]:
+    """Параметры проверки из formula-шага (с умолчаниями)."""
+    return {
+        "variables": tuple(step.get("variables") or ("n",)),
+        "domain": tuple(step.get("domain") or DEFAULT_DOMAIN),
+    }
@@ -0,0 +1,37 @@
+# generator_app/management/commands/build_answer_tables.py
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from generator_app import answer_tables
+from generator_app.registry import controller
+
+
+class Command(BaseCommand):
+    help = "Предвычисляет таблицы ответов (mmap) для тем с малым пространством параметров."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--topic", action="append", dest="topics",
+                            help=f"Тема (можно несколько раз). По умолчанию: {', '.join(answer_tables.TABLE_TOPICS)}")
+        parser.add_argument("--dir", dest="directory", default=None,
+                            help="Куда писать таблицы (по умолчанию settings.ANSWER_TABLES_DIR).")
+
+    def handle(self, *args, **opts):
+        directory = Path(opts["directory"]) if opts.get("directory") else answer_tables.tables_dir()
+        for topic_id in opts.get("topics") or answer_tables.TABLE_TOPICS:
+            generator_class = controller.get_generator(topic_id)
+            if generator_class is None:
+                raise CommandError(f"Генератор для '{topic_id}' не найден.")
+            task = controller.create_task(topic_id, complexity=None, seed=0)
+            if not callable(getattr(task, "rational_term", None)):
+                raise CommandError(f"Тема '{topic_id}' не поддерживает таблицы ответов (нет rational_term()).")
+
+            path = answer_tables.table_path(topic_id, directory)
+            t0 = time.perf_counter()
+            valid = answer_tables.build_table(topic_id, generator_class, type(task), path)
+            dt = time.perf_counter() - t0
+            size_kb = path.stat().st_size / 1024
+            self.stdout.write(self.style.SUCCESS(
+                f"{topic_id}: {valid} вариантов -> {path} ({size_kb:.0f} KiB, {dt:.2f} s)"
+            ))
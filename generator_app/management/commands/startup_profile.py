@@ -0,0 +1,102 @@
+# generator_app/management/commands/startup_profile.py
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# код холодного процесса: только django.setup() (+ urls, как у первого запроса воркера)
+CHILD = r"""
+import importlib, json, sys, time
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+if {urls}:
+    from django.conf import settings
+    importlib.import_module(settings.ROOT_URLCONF)
+t2 = time.perf_counter()
+print(json.dumps({{
+    "setup_ms": (t1 - t0) * 1000,
+    "urls_ms": (t2 - t1) * 1000,
+    "modules": sorted(m for m in sys.modules if m.split(".")[0] in ("sympy", "numpy", "generator_app")),
+}}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """Строки `-X importtime` -> [(модуль, self_us, cumulative_us)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "| imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Замеряет холодный старт: сколько идёт django.setup() (+ urls) и какие импорты его съедают."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15, help="Сколько самых тяжёлых импортов печатать.")
+        parser.add_argument("--repeat", type=int, default=3, help="Запусков (берётся самый быстрый).")
+        parser.add_argument("--no-urls", action="store_true", help="Только django.setup(), без ROOT_URLCONF.")
+        parser.add_argument("--budget-ms", type=float, default=None,
+                            help="Упасть, если старт дольше (по умолчанию settings.STARTUP_BUDGET_MS; 0 — не проверять).")
+
+    def run_child(self, urls: bool):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "task_project.settings")}
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD.format(urls=urls)],
+            capture_output=True, text=True, env=env, cwd=str(settings.BASE_DIR),
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Холодный процесс упал:\n{proc.stderr[-2000:]}")
+        # наши print'ы (✅ Ядро ...) тоже идут в stdout — JSON последней строкой
+        return json.loads(proc.stdout.strip().splitlines()[-1]), parse_importtime(proc.stderr)
+
+    def handle(self, *args, **opts):
+        urls = not opts["no_urls"]
+        runs = [self.run_child(urls) for _ in range(max(1, opts["repeat"]))]
+        result, rows = min(runs, key=lambda r: r[0]["setup_ms"] + r[0]["urls_ms"])
+        total_ms = result["setup_ms"] + result["urls_ms"]
+
+        self.stdout.write(f"django.setup(): {result['setup_ms']:.0f} ms")
+        if urls:
+            self.stdout.write(f"ROOT_URLCONF:   {result['urls_ms']:.0f} ms")
+        self.stdout.write(f"итого:          {total_ms:.0f} ms (лучший из {len(runs)})")
+
+        by_package = defaultdict(int)
+        for name, self_us, _ in rows:
+            by_package[name.split(".")[0]] += self_us
+        self.stdout.write("\nПо пакетам (собственное время импорта):")
+        for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:opts["top"]]:
+            self.stdout.write(f"  {us / 1000:8.1f} ms  {package}")
+
+        self.stdout.write("\nСамые тяжёлые импорты (с вложенными):")
+        for name, _, cumulative_us in sorted(rows, key=lambda r: -r[2])[:opts["top"]]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+        loaded = result["modules"]
+        heavy = [p for p in ("sympy", "numpy") if p in loaded]
+        generators = [m for m in loaded if m.startswith("generator_app.generators.")]
+        self.stdout.write("")
+        if heavy or generators:
+            self.stdout.write(self.style.WARNING(
+                f"На старте загружены: {', '.join(heavy + generators)} — их стоит импортировать лениво."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("sympy, numpy и модули генераторов на старте не грузятся."))
+
+        budget_ms = opts["budget_ms"]
+        if budget_ms is None:
+            budget_ms = getattr(settings, "STARTUP_BUDGET_MS", 0)
+        if budget_ms and total_ms > budget_ms:
+            raise CommandError(f"Старт {total_ms:.0f} ms превышает бюджет {budget_ms:.0f} ms")
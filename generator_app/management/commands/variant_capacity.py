@@ -0,0 +1,21 @@
+# generator_app/management/commands/variant_capacity.py
+from django.core.management.base import BaseCommand
+
+from generator_app.registry import controller
+
+
+class Command(BaseCommand):
+    help = "Сколько различных вариантов у каждой темы на каждом уровне сложности."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--complexity", type=int, action="append", dest="complexities",
+            help="Уровень сложности (можно несколько раз). По умолчанию — дефолт генератора.",
+        )
+
+    def handle(self, *args, **opts):
+        complexities = opts.get("complexities") or [None]
+        for row in controller.capacity_report(complexities):
+            variants = row["variants"] if row["variants"] is not None else "?"
+            complexity = row["complexity"] if row["complexity"] is not None else "default"
+            self.stdout.write(f"{row['id']:<20} complexity={complexity:<8} variants={variants}")
@@ -0,0 +1,44 @@
+# generator_app/management/commands/verify_answers.py
+from django.core.management.base import BaseCommand, CommandError
+
+from generator_app.registry import controller
+from generator_app.verify import verify_topic
+
+
+class Command(BaseCommand):
+    help = "Сверяет быстрые пути ответа (точное ядро, таблицы) с sympy на всём пространстве параметров."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--topic", action="append", dest="topics",
+                            help="Тема (можно несколько раз). По умолчанию — все зарегистрированные.")
+        parser.add_argument("--complexity", type=int, default=None)
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Процессов в пуле (0 — без пула). По умолчанию — по числу CPU.")
+        parser.add_argument("--stride", type=int, default=1, help="Брать каждый N-й кортеж (1 — все).")
+        parser.add_argument("--seeds", type=int, default=1, help="Сидов шагов на кортеж (разные n для a_n/S_n).")
+        parser.add_argument("--show", type=int, default=20, help="Сколько расхождений печатать на тему.")
+
+    def handle(self, *args, **opts):
+        topics = opts.get("topics") or [t["id"] for t in controller.topics()]
+        failed = 0
+        for topic_id in topics:
+            if topic_id not in controller._generators:
+                raise CommandError(f"Генератор для '{topic_id}' не найден.")
+            report = verify_topic(
+                topic_id, complexity=opts["complexity"], stride=opts["stride"],
+                seeds=opts["seeds"], workers=opts["workers"],
+            )
+            line = (f"{topic_id}: {report['cases']} кортежей, {report['steps']} шагов, "
+                    f"быстрый {report['fast_seconds']} s, sympy {report['ref_seconds']} s "
+                    f"(x{report['speedup']}), всего {report['wall_seconds']} s")
+            if not report["cases"]:
+                self.stdout.write(self.style.WARNING(f"{topic_id}: нет param_space — пропущено"))
+            elif report["mismatches"]:
+                failed += len(report["mismatches"])
+                self.stdout.write(self.style.ERROR(f"{line}, расхождений: {len(report['mismatches'])}"))
+                for m in report["mismatches"][:opts["show"]]:
+                    self.stdout.write(f"   {m['params']} seed={m['seed']}: {'; '.join(m['diffs'])}")
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+        if failed:
+            raise CommandError(f"Найдено расхождений: {failed}")
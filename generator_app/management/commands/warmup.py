@@ -0,0 +1,42 @@
+# generator_app/management/commands/warmup.py
+import json
+
+from django.core.management.base import BaseCommand
+
+from generator_app.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ("Прогревает анализатор (sympy, индексы параметров, таблицы ответов, шаги, пул вариантов) "
+            "и печатает, что и за сколько прогрето. Общую память воркерам даёт только прогрев "
+            "в мастере до fork'а (settings.WARMUP['ON_READY'] / GENERATOR_WARMUP=1 + gunicorn --preload); "
+            "команда — для замера.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--complexity", action="append", type=int, dest="complexities",
+                            help="Сложность (можно несколько раз). По умолчанию — settings.WARMUP['COMPLEXITIES'].")
+        parser.add_argument("--samples", type=int, default=None, help="Вариантов на (тема, сложность).")
+        parser.add_argument("--no-pool", action="store_true", help="Не заполнять пул вариантов.")
+        parser.add_argument("--json", action="store_true", help="Отчёт одним JSON.")
+
+    def handle(self, *args, **opts):
+        report = warm_up(
+            complexities=opts.get("complexities"),
+            samples=opts["samples"],
+            variant_pool=False if opts["no_pool"] else None,
+            freeze_gc=False,      # процесс команды ни с кем память не делит
+        )
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        for p in report["phases"]:
+            details = ", ".join(f"{k}={v}" for k, v in p.items() if k not in ("name", "ms", "error"))
+            line = f"{p['name']:<14} {p['ms']:>8.1f} ms  {details}"
+            if "error" in p:
+                self.stdout.write(self.style.ERROR(f"{line}  ошибка: {p['error']}"))
+            else:
+                self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f"Прогрев: {report['total_ms']:.0f} ms, RSS {report['rss_mb']} МБ (pid={report['pid']})"
+        ))
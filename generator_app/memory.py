@@ -0,0 +1,187 @@
+# generator_app/memory.py
+"""
+Память долгоживущего веб-воркера: кэш sympy и RSS.
+
+sympy кэширует результаты (@cacheit) в lru_cache на каждую функцию; размер
+задаётся переменной окружения SYMPY_CACHE_SIZE и читается один раз при импорте
+sympy. За экзаменационный день через _symp/TaskAnalyzer проходят тысячи разных
+выражений, и RSS воркера растёт. Здесь:
+  - configure_sympy_cache() — выставляет SYMPY_CACHE_SIZE до импорта sympy;
+  - MemoryWatchdog — раз в TRIM_EVERY запросов чистит кэш sympy, если он больше
+    TRIM_ABOVE записей, и, если RSS выше RSS_LIMIT_MB, просит воркер перезапуститься
+    (SIGTERM себе после ответа: gunicorn штатно доработает запрос и поднимет новый).
+
+settings.MEMORY_WATCHDOG = {
+    "SYMPY_CACHE_SIZE": 500, "TRIM_EVERY": 200, "TRIM_ABOVE": 20000,
+    "RSS_LIMIT_MB": 0, "RECYCLE": False,
+}
+RSS_LIMIT_MB=0 — порог выключен. RECYCLE=False — только отмечаем в статистике
+(под runserver SIGTERM убил бы весь сервер).
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - не-UNIX
+    resource = None
+
+DEFAULTS = {
+    "SYMPY_CACHE_SIZE": 500,
+    "TRIM_EVERY": 200,
+    "TRIM_ABOVE": 20000,
+    "RSS_LIMIT_MB": 0,
+    "RECYCLE": False,
+}
+
+
+def watchdog_settings() -> Dict[str, Any]:
+    try:
+        from django.conf import settings
+        user = getattr(settings, "MEMORY_WATCHDOG", {}) if settings.configured else {}
+    except Exception:
+        user = {}
+    return {**DEFAULTS, **(user or {})}
+
+
+def configure_sympy_cache() -> None:
+    """Выставляет SYMPY_CACHE_SIZE из настроек; работает, только если sympy ещё не импортирован."""
+    size = watchdog_settings()["SYMPY_CACHE_SIZE"]
+    if size is None:
+        return
+    if "sympy" in sys.modules:
+        print("⚠️ sympy уже импортирован — SYMPY_CACHE_SIZE из настроек не применится.")
+        return
+    # явная переменная окружения важнее настроек
+    os.environ.setdefault("SYMPY_CACHE_SIZE", str(size))
+
+
+# ---------- замеры ----------
+def current_rss_mb() -> Optional[float]:
+    """Текущий RSS процесса в МБ (/proc), иначе пиковый из getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # ru_maxrss в Linux — в килобайтах
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return None
+
+
+def _cache_infos():
+    """cache_info() всех @cacheit-функций sympy (если sympy загружен)."""
+    cache_mod = sys.modules.get("sympy.core.cache")
+    if cache_mod is None:
+        return []
+    infos = []
+    for func in cache_mod.CACHE:
+        f = func
+        while hasattr(f, "__wrapped__"):
+            if hasattr(f, "cache_info"):
+                infos.append(f.cache_info())
+                break
+            f = f.__wrapped__
+    return infos
+
+
+def sympy_cache_stats() -> Dict[str, Any]:
+    infos = _cache_infos()
+    return {
+        "loaded": "sympy" in sys.modules,
+        "functions": len(infos),
+        "entries": sum(i.currsize for i in infos),
+        "maxsize_per_function": infos[0].maxsize if infos else None,
+        "hits": sum(i.hits for i in infos),
+        "misses": sum(i.misses for i in infos),
+    }
+
+
+def clear_sympy_cache() -> int:
+    """Чистит кэш sympy; возвращает число выброшенных записей."""
+    cache_mod = sys.modules.get("sympy.core.cache")
+    if cache_mod is None:
+        return 0
+    entries = sum(i.currsize for i in _cache_infos())
+    cache_mod.clear_cache()
+    return entries
+
+
+# ---------- сторож ----------
+class MemoryWatchdog:
+    def __init__(self, trim_every: int = 200, trim_above: int = 20000, rss_limit_mb: float = 0, recycle: bool = False):
+        self.trim_every = max(1, int(trim_every))
+        self.trim_above = int(trim_above)
+        self.rss_limit_mb = float(rss_limit_mb or 0)
+        self.recycle = bool(recycle)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.trims = 0
+        self.trimmed_entries = 0
+        self.last_check: Optional[float] = None
+        self.over_limit = False
+        self.recycle_requested = False
+
+    def tick(self) -> None:
+        """Вызывается после каждого запроса; раз в trim_every запросов — проверка."""
+        with self._lock:
+            self.requests += 1
+            due = self.requests % self.trim_every == 0
+        if due:
+            self.check()
+
+    def check(self) -> None:
+        self.last_check = time.time()
+        if sympy_cache_stats()["entries"] > self.trim_above:
+            dropped = clear_sympy_cache()
+            with self._lock:
+                self.trims += 1
+                self.trimmed_entries += dropped
+
+        rss = current_rss_mb()
+        self.over_limit = bool(self.rss_limit_mb and rss is not None and rss > self.rss_limit_mb)
+        if self.over_limit and self.recycle and not self.recycle_requested:
+            print(f"♻️ RSS воркера {rss} МБ > {self.rss_limit_mb} МБ — перезапуск после текущего ответа (pid={os.getpid()}).")
+            self.recycle_requested = True
+
+    def recycle_now(self) -> None:
+        """SIGTERM себе: gunicorn завершит воркер штатно, мастер поднимет новый."""
+        if self.recycle_requested:
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "rss_mb": current_rss_mb(),
+            "rss_limit_mb": self.rss_limit_mb or None,
+            "over_limit": self.over_limit,
+            "recycle_enabled": self.recycle,
+            "recycle_requested": self.recycle_requested,
+            "requests": self.requests,
+            "trim_every": self.trim_every,
+            "trim_above": self.trim_above,
+            "trims": self.trims,
+            "trimmed_entries": self.trimmed_entries,
+            "last_check": self.last_check,
+            "sympy_cache": sympy_cache_stats(),
+        }
+
+
+_watchdog: Optional[MemoryWatchdog] = None
+_watchdog_lock = threading.Lock()
+
+
+def get_watchdog() -> MemoryWatchdog:
+    global _watchdog
+    if _watchdog is None:
+        with _watchdog_lock:
+            if _watchdog is None:
+                conf = watchdog_settings()
+                _watchdog = MemoryWatchdog(conf["TRIM_EVERY"], conf["TRIM_ABOVE"], conf["RSS_LIMIT_MB"], conf["RECYCLE"])
+    return _watchdog
@@ -0,0 +1,42 @@
+# generator_app/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .memory import get_watchdog
+
+
+class MemoryWatchdogMiddleware:
+    """
+    После каждого ответа отмечает запрос в MemoryWatchdog: раз в TRIM_EVERY
+    запросов чистится кэш sympy и проверяется RSS (см. generator_app/memory.py).
+    Сам перезапуск делается по сигналу request_finished — когда ответ уже отдан.
+
+    Умеет и sync, и async: под ASGI Django иначе заворачивал бы каждый запрос
+    (включая async-view) в отдельный sync-поток. tick() — счётчик под локом и
+    изредка чистка кэша, без БД, так что звать его прямо из корутины можно.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.watchdog = get_watchdog()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self._tick()
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self._tick()
+        return response
+
+    def _tick(self) -> None:
+        try:
+            self.watchdog.tick()
+        except Exception as e:
+            print(f"⚠️ MemoryWatchdog: {e}")
@@ -0,0 +1,184 @@
+# generator_app/offload.py
+"""
+Вынос CPU-тяжёлой работы анализатора (генерация вариантов, проверка ответов)
+из event loop'а ASGI-воркера в ограниченный пул.
+
+Под ASGI sync-view с sympy внутри занимает поток, а async-view, который ждёт
+run_cpu(...), отпускает event loop: тот же воркер продолжает отдавать дешёвые
+запросы (api_get_question, topics_api), пока идёт долгая проверка.
+
+settings.ANALYZER_EXECUTOR = {"KIND": "thread", "WORKERS": 4, "MAX_PENDING": 64}
+  KIND="thread"  — ThreadPoolExecutor: просто и без копирования данных, но sympy держит GIL;
+  KIND="process" — ProcessPoolExecutor (spawn, в каждом процессе django.setup()):
+                   настоящий параллелизм по ядрам;
+  MAX_PENDING    — сколько задач может ждать/выполняться одновременно; сверх — ExecutorBusy
+                   (view отвечает 503, а не копит бесконечную очередь).
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+DEFAULTS = {"KIND": "thread", "WORKERS": 4, "MAX_PENDING": 64}
+
+
+class ExecutorBusy(Exception):
+    """Пул анализатора забит: лучше быстро ответить 503, чем держать запрос в очереди."""
+
+
+def executor_settings() -> Dict[str, Any]:
+    try:
+        from django.conf import settings
+        user = getattr(settings, "ANALYZER_EXECUTOR", {}) if settings.configured else {}
+    except Exception:
+        user = {}
+    return {**DEFAULTS, **(user or {})}
+
+
+# ---------- задания (модульные функции — их можно отдать и в процесс) ----------
+_analyzer = None
+
+
+def _get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        from .analyzer import TaskAnalyzer
+        _analyzer = TaskAnalyzer()
+    return _analyzer
+
+
+def check_step_job(topic_id: str, step_key: str, value: Any, steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return _get_analyzer().check_step(topic_id, step_key, value, {"steps": steps})
+
+
+def preview_job(task_type: str, complexity: Optional[int]) -> Optional[str]:
+    """HTML варианта для конструктора (из пула вариантов, если он включён)."""
+    from .variant_pool import get_variant_pool, make_variant
+
+    pool = get_variant_pool()
+    variant = pool.get(task_type, complexity) if pool is not None else make_variant(task_type, complexity)
+    return None if variant is None else variant[2]
+
+
+def compile_question_job(
+    topic_id: str, complexity: Optional[int], seed: int, params: Optional[Dict[str, Any]] = None,
+    formula_steps: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    Вопрос попытки целиком (для материализации на старте попытки, exams/materialize.py):
+    {topic_id, complexity, seed, params, statement_html, steps}; None — темы нет.
+    params — готовые параметры задачи (от распределителя exams/allocator.py), иначе их выбирает генератор по seed.
+    formula_steps — добавить шаги-формулы (флаг вопроса, см. api_set_questions).
+    Шаги уже с каноном ответов (answer_canon), так что плееру sympy для них не нужен.
+    """
+    from .html_renderer import task_html
+    from .variant_pool import make_variant, renderer
+    from .variants import build_variant_from_params, task_params
+
+    if params is None:
+        variant = make_variant(topic_id, complexity, seed, formula_steps)
+        if variant is None:
+            return None
+        task, steps, html = variant
+    else:
+        built = build_variant_from_params(topic_id, complexity, params, seed, formula_steps)
+        if built is None:
+            return None
+        task, steps = built
+        html = task_html(task, renderer)
+    return {"topic_id": topic_id, "complexity": complexity, "seed": seed, "params": task_params(task),
+            "statement_html": html, "steps": steps}
+
+
+def _init_process_worker(settings_module: str) -> None:
+    """spawn-процесс пула: поднимаем Django (темы регистрируются в registry по topics.py)."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+
+    django.setup()
+    from . import registry  # noqa: F401
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Пул процессов, который можно поднимать из веб-воркера: spawn (не форкаем процесс
+    с его потоками и соединениями), в каждом процессе django.setup().
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_process_worker,
+        initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "task_project.settings"),),
+    )
+
+
+# ---------- пул ----------
+_executor: Optional[Executor] = None
+_executor_pid: Optional[int] = None
+_lock = threading.Lock()
+_pending = 0
+_stats = {"submitted": 0, "rejected": 0}
+
+
+def get_executor() -> Executor:
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            conf = executor_settings()
+            workers = max(1, int(conf["WORKERS"]))
+            if conf["KIND"] == "process":
+                _executor = process_pool(workers)
+            else:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analyzer")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """await run_cpu(check_step_job, ...) — выполнить fn в пуле, не блокируя event loop."""
+    global _pending
+    limit = int(executor_settings()["MAX_PENDING"])
+    with _lock:
+        if limit and _pending >= limit:
+            _stats["rejected"] += 1
+            raise ExecutorBusy()
+        _pending += 1
+        _stats["submitted"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def map_cpu(fn, jobs: List[tuple]) -> List[Any]:
+    """
+    Синхронный вариант для sync-view: fn(*args) для всех jobs в том же пуле,
+    результаты — в порядке jobs. Места в пуле считаются так же, как в run_cpu.
+    """
+    global _pending
+    limit = int(executor_settings()["MAX_PENDING"])
+    with _lock:
+        if limit and _pending + len(jobs) > limit:
+            _stats["rejected"] += 1
+            raise ExecutorBusy()
+        _pending += len(jobs)
+        _stats["submitted"] += len(jobs)
+    try:
+        executor = get_executor()
+        futures = [executor.submit(fn, *args) for args in jobs]
+        return [f.result() for f in futures]
+    finally:
+        with _lock:
+            _pending -= len(jobs)
+
+
+def stats() -> Dict[str, Any]:
+    conf = executor_settings()
+    with _lock:
+        return {"kind": conf["KIND"], "workers": conf["WORKERS"], "max_pending": conf["MAX_PENDING"],
+                "pending": _pending, **_stats}
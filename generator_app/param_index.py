@@ -0,0 +1,103 @@
+# generator_app/param_index.py
+"""
+Индекс пространства параметров генератора.
+
+Генератор объявляет:
+  - param_space(complexity) -> {"c": range(1, 10), ...}  (порядок ключей = порядок колонок)
+  - accepts(params: dict) -> bool                         (те же условия, что и в ТЗ)
+
+Все допустимые кортежи перебираются один раз и складываются в плоский array('i').
+Дальше равномерная выборка — это один randrange по индексу, без циклов отбраковки,
+а len(index) — число различных вариантов темы на данной сложности.
+"""
+import itertools
+import math
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+
+from .batch import get_numpy
+
+
+class ParamSpaceIndex:
+    def __init__(self, names: Tuple[str, ...], rows: array, space_size: int):
+        self.names = names
+        self._rows = rows                # плоско: [c0, d0, b0, p0, c1, d1, ...]
+        self._width = len(names)
+        self.space_size = space_size     # размер полного декартова произведения
+        self._np_rows = None
+
+    @classmethod
+    def build(cls, space: Dict[str, range], accepts) -> "ParamSpaceIndex":
+        names = tuple(space.keys())
+        rows = array("i")
+        total = 0
+        for combo in itertools.product(*space.values()):
+            total += 1
+            if accepts(dict(zip(names, combo))):
+                rows.extend(combo)
+        return cls(names, rows, total)
+
+    def __len__(self) -> int:
+        return len(self._rows) // self._width if self._width else 0
+
+    def at(self, i: int) -> Dict[str, int]:
+        start = i * self._width
+        return dict(zip(self.names, self._rows[start:start + self._width]))
+
+    def __iter__(self) -> Iterator[Dict[str, int]]:
+        for i in range(len(self)):
+            yield self.at(i)
+
+    def sample(self, rng) -> Dict[str, int]:
+        """Равномерно по допустимым кортежам; rng — random.Random."""
+        return self.at(rng.randrange(len(self)))
+
+    def as_numpy(self):
+        """Матрица (len, width) поверх того же буфера — для пакетной выборки."""
+        if self._np_rows is None:
+            np = get_numpy()
+            self._np_rows = np.frombuffer(self._rows, dtype=np.intc).reshape(-1, self._width)
+        return self._np_rows
+
+    def sample_many(self, np_rng, n: int) -> Dict[str, "np.ndarray"]:
+        """n равномерных кортежей за одну операцию: {имя: массив}."""
+        rows = self.as_numpy()[np_rng.integers(0, len(self), size=n)]
+        return {name: rows[:, j] for j, name in enumerate(self.names)}
+
+
+def _space_key(space: Dict[str, range]) -> tuple:
+    return tuple((k, r.start, r.stop, r.step) for k, r in space.items())
+
+
+# Индексов в процессе немного (тема x сложность), но сложность приходит из запроса —
+# без предела кэш рос бы на каждую новую сложность.
+@lru_cache(maxsize=32)
+def _build_cached(generator_class, key: tuple) -> ParamSpaceIndex:
+    space = {name: range(start, stop, step) for name, start, stop, step in key}
+    return ParamSpaceIndex.build(space, generator_class.accepts)
+
+
+def declared_space(generator_class, complexity: Optional[int] = None) -> Optional[Dict[str, range]]:
+    """param_space генератора на сложности; None — если генератор не объявляет param_space/accepts."""
+    param_space = getattr(generator_class, "param_space", None)
+    if not callable(param_space) or not callable(getattr(generator_class, "accepts", None)):
+        return None
+    return param_space(complexity) if complexity is not None else param_space()
+
+
+def space_size(generator_class, complexity: Optional[int] = None) -> Optional[int]:
+    """Размер полного декартова произведения — сколько кортежей переберёт build(), без самого перебора."""
+    space = declared_space(generator_class, complexity)
+    return math.prod(len(r) for r in space.values()) if space is not None else None
+
+
+def get_index(generator_class, complexity: Optional[int] = None) -> Optional[ParamSpaceIndex]:
+    """
+    Индекс для генератора (строится один раз на процесс и на пространство).
+    None — если генератор не объявляет param_space/accepts.
+    """
+    space = declared_space(generator_class, complexity)
+    if space is None:
+        return None
+    return _build_cached(generator_class, _space_key(space))
@@ -1,5 +1,11 @@
 # generator_app/registry.py
 from .core import TaskController
+from .topics import TOPICS
 
 # единый инстанс на весь проект
 controller = TaskController()
+
+# генераторы и стратегии по темам — строки из topics.py, модули грузятся при первом обращении
+for _topic in TOPICS:
+    controller.register_generator(_topic["id"], _topic["generator"], label=_topic.get("label"))
+    controller.register_strategy(_topic["id"], _topic["strategy"])
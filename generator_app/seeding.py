@@ -0,0 +1,40 @@
+# generator_app/seeding.py
+"""
+Детерминированные сиды для генераторов и анализатора.
+
+Правило: (topic_id, complexity, seed) -> всегда одна и та же задача и те же шаги.
+Сид умещается в IntegerField (TestAttempt.variant_seed), поэтому берём [0, 2^31).
+"""
+import hashlib
+import random
+from typing import Optional
+
+SEED_MAX = 2**31
+# Сид шагов для задач без собственного сида (старое поведение анализатора)
+DEFAULT_STEP_SEED = 123456
+
+
+def resolve_seed(seed: Optional[int] = None, rng: Optional[random.Random] = None) -> int:
+    """
+    Явный seed важнее всего; иначе берём его из переданного rng;
+    иначе — случайный, но он всё равно попадёт в задачу и её можно будет пересобрать.
+    """
+    if seed is not None:
+        return int(seed) % SEED_MAX
+    if rng is not None:
+        return rng.randrange(SEED_MAX)
+    return random.randrange(SEED_MAX)
+
+
+def derive_seed(*parts) -> int:
+    """
+    Стабильный (не зависящий от PYTHONHASHSEED) сид из набора частей,
+    например derive_seed(attempt.variant_seed, question.order).
+    """
+    raw = "|".join(str(p) for p in parts).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(raw).digest()[:8], "big") % SEED_MAX
+
+
+def variant_key(topic_id: str, complexity, seed: int) -> str:
+    """Ключ варианта для кэшей: по нему вариант пересобирается целиком."""
+    return f"{topic_id}:{complexity if complexity is not None else '-'}:{seed}"
@@ -0,0 +1,9 @@
+# generator_app/strategies/__init__.py
+"""
+Стратегии анализатора по темам: как строить шаги, (опционально) как их проверять
+и что отдавать в старый analyze(). Регистрируются в TaskController рядом с
+генераторами (controller.register_strategy) и грузятся лениво по task_type.
+"""
+from .base import TopicStrategy, GenericStrategy
+
+__all__ = ["TopicStrategy", "GenericStrategy"]
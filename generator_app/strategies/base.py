@@ -0,0 +1,48 @@
+# generator_app/strategies/base.py
+import random
+from typing import Any, Dict, List, Optional
+
+# Выпадающие варианты (по ТЗ)
+JUSTIFY_OPTIONS = [
+    "по определению",
+    "по необходимому условию сходимости",
+    "по признаку Коши",
+    "по признаку Даламбера",
+    "по признаку Лейбница",
+    "по интегральному признаку",
+]
+CONVERGENCE_OPTIONS = ["сходится", "расходится", "неизвестно", "неопределено"]
+
+
+class TopicStrategy:
+    """
+    Логика анализатора для одной темы. Первым аргументом методы получают
+    TaskAnalyzer — у него флаги use_exact / use_tables / formula_steps.
+
+      build_steps(analyzer, task, rng) -> список шагов
+      check_step(analyzer, step, user_value) -> результат или None (общая проверка)
+      analyze(analyzer, task, rng) -> {вопрос: ответ} для старого analyze() или None
+    """
+
+    def build_steps(self, analyzer, task, rng: random.Random) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def check_step(self, analyzer, step: Dict[str, Any], user_value: Any) -> Optional[Dict[str, Any]]:
+        return None
+
+    def analyze(self, analyzer, task, rng: random.Random) -> Optional[Dict[str, str]]:
+        return None
+
+
+class GenericStrategy(TopicStrategy):
+    """Тема без своей стратегии: один шаг «Ваш ответ», засчитывается любой ввод."""
+
+    def build_steps(self, analyzer, task, rng: random.Random) -> List[Dict[str, Any]]:
+        return [{
+            "key": "answer",
+            "type": "input",
+            "label": "Ваш ответ",
+            "hint": None,
+            "points": 10,
+            "answer_expr": None,
+        }]
@@ -0,0 +1,159 @@
+# generator_app/strategies/geometric.py
+"""Геометрический ряд ∑ r^k: темы series_class_1 (r = b/c) и series_class_2 (r = 1/(1+c))."""
+import random
+from fractions import Fraction
+from typing import Any, Dict, List, Optional
+
+from .. import exact
+from .base import CONVERGENCE_OPTIONS, JUSTIFY_OPTIONS, TopicStrategy
+
+# sympy — только в эталонном пути (use_exact=False / фоллбек) и в старом analyze()
+
+
+class GeometricSeriesStrategy(TopicStrategy):
+    def ratio(self, task) -> Fraction:
+        raise NotImplementedError
+
+    def build_steps(self, analyzer, task, rng: random.Random) -> List[Dict[str, Any]]:
+        r = self.ratio(task)
+        n_for_an = rng.randint(3, 8)
+        n_for_sn = rng.randint(3, 8)
+
+        an_expr = sn_expr = s_inf_expr = None
+        if analyzer.use_exact:
+            an_expr = exact.fraction_str(exact.geometric_an(r, n_for_an))
+            sn_expr = exact.fraction_str(exact.geometric_sn(r, n_for_sn))
+            s_inf_expr = exact.fraction_str(exact.geometric_sum(r))
+        if an_expr is None or sn_expr is None:
+            an_expr, sn_expr = self._sympy_an_sn(r, n_for_an, n_for_sn, an_expr, sn_expr)
+
+        converges = abs(r) < 1
+        conv_text = "сходится" if converges else "расходится"
+
+        sn_formula_step = None
+        if analyzer.formula_steps and r != 1:
+            r_str = f"({exact.fraction_str(r)})"
+            sn_formula_step = {
+                "key": "sn_formula",
+                "type": "formula",
+                "label": "Формула S_n (сумма членов с k=0 по k=n)",
+                "hint": "S_n = (1 - r^(n+1)) / (1 - r). Ответ — выражение от n.",
+                "points": 20,
+                "variables": ["n"],
+                "domain": [0, 30],
+                "answer_expr": f"(1 - {r_str}**(n + 1))/(1 - {r_str})",
+            }
+
+        steps: List[Dict[str, Any]] = [
+            {
+                "key": "an",
+                "type": "input",
+                "label": f"Значение a_n при n={n_for_an}",
+                "hint": "Подставьте n в общий член геометрического ряда.",
+                "points": 20,
+                "answer_expr": an_expr,
+            },
+            {
+                "key": "sn",
+                "type": "input",
+                "label": f"Значение S_n при n={n_for_sn}",
+                "hint": "Формула суммы первых n+1 членов геометрической прогрессии.",
+                "points": 20,
+                "answer_expr": sn_expr,
+            },
+            *([sn_formula_step] if sn_formula_step else []),
+            {
+                "key": "conv",
+                "type": "select",
+                "label": "Сходимость ряда",
+                "hint": "Для ∑ r^k ряд сходится при |r|<1.",
+                "points": 20,
+                "options": CONVERGENCE_OPTIONS,
+                "answer_text": conv_text,
+            },
+        ]
+
+        if converges:
+            if s_inf_expr is None:
+                s_inf_expr = self._sympy_s_inf(r)
+            steps.append({
+                "key": "s_inf",
+                "type": "input",
+                "label": "Сумма ряда (бесконечная)",
+                "hint": "Для геометрического ряда S=1/(1-r), если |r|<1.",
+                "points": 30,
+                "answer_expr": s_inf_expr,
+            })
+
+        steps.append({
+            "key": "justify",
+            "type": "select",
+            "label": "Обоснуйте ваш ответ",
+            "hint": "Выберите подходящий признак/основание.",
+            "points": 10,
+            "options": JUSTIFY_OPTIONS,
+            "answer_text": "по необходимому условию сходимости",
+        })
+        return steps
+
+    @staticmethod
+    def _sympy_an_sn(r: Fraction, n_for_an: int, n_for_sn: int, an_expr, sn_expr):
+        import sympy
+        from sympy import symbols, summation
+
+        k = symbols('k')
+        term_k = sympy.Rational(r.numerator, r.denominator)**k
+        if an_expr is None:
+            an_expr = sympy.sstr(term_k.subs(k, n_for_an))
+        if sn_expr is None:
+            n_sym = symbols('n')
+            sn_formula = summation(term_k, (k, 0, n_sym))
+            sn_expr = sympy.sstr(sn_formula.subs(n_sym, n_for_sn))
+        return an_expr, sn_expr
+
+    @staticmethod
+    def _sympy_s_inf(r: Fraction) -> str:
+        import sympy
+        from sympy import oo, symbols, summation
+
+        k = symbols('k')
+        return sympy.sstr(summation(sympy.Rational(r.numerator, r.denominator)**k, (k, 0, oo)))
+
+    def analyze(self, analyzer, task, rng: random.Random) -> Optional[Dict[str, str]]:
+        import sympy
+
+        solutions: Dict[str, str] = {}
+        k = sympy.symbols('k')
+        r = self.ratio(task)
+        r = sympy.Rational(r.numerator, r.denominator)
+
+        series_term = r**k
+        n_for_an = rng.randint(3, 8)
+        n_for_sn = rng.randint(3, 8)
+
+        an_value = series_term.subs(k, n_for_an)
+        solutions[f"Значение a_n при n={n_for_an}"] = f"\\(a_{{{n_for_an}}} = {sympy.latex(an_value)}\\)"
+        sn_formula = sympy.summation(series_term, (k, 0, sympy.symbols('n')))
+        sn_value = sn_formula.subs(sympy.symbols('n'), n_for_sn)
+        solutions[f"Значение S_n при n={n_for_sn}"] = f"\\(S_{{{n_for_sn}}} = {sympy.latex(sn_value.evalf(4))}\\)"
+        total_sum = sympy.summation(series_term, (k, 0, sympy.oo))
+        solutions["Сумма ряда"] = f"\\(S = {sympy.latex(total_sum)}\\)"
+        sum_from_2 = sympy.summation(series_term, (k, 2, sympy.oo))
+        solutions["Сумма ряда с k=2"] = f"\\(S_2 = {sympy.latex(sum_from_2)}\\)"
+        solutions["Сходимость"] = "Сходится" if (abs(r) < 1) else "Расходится"
+        solutions["Обоснование"] = "по необходимому условию сходимости"
+        return solutions
+
+
+class SeriesClass1Strategy(GeometricSeriesStrategy):
+    """∑ (b/c)^k"""
+
+    def ratio(self, task) -> Fraction:
+        return Fraction(task.b, task.c)
+
+
+class SeriesClass2Strategy(GeometricSeriesStrategy):
+    """∑ 1/(1+c)^k"""
+
+    def ratio(self, task) -> Fraction:
+        return Fraction(1, 1 + task.c)
@@ -0,0 +1,98 @@
+# generator_app/strategies/rational.py
+"""
+Ряды с общим членом a_n = P(n)/Q(n) и необходимым условием сходимости:
+series_class_3 ((b + p n^2) / (c n^2 + d n)) и series_class_4 ((b + p n) / (c n - d)).
+Задача отдаёт коэффициенты через task.rational_term() — от младшего к старшему.
+"""
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from .. import answer_tables, exact
+from .base import CONVERGENCE_OPTIONS, JUSTIFY_OPTIONS, TopicStrategy
+
+# sympy — только в эталонном пути (use_exact=False / фоллбек) и в старом analyze()
+
+
+def _a_n_formula(task, n):
+    num, den = task.rational_term()
+    return sum(c * n**i for i, c in enumerate(num)) / sum(c * n**i for i, c in enumerate(den))
+
+
+class RationalTermStrategy(TopicStrategy):
+    def answers(self, analyzer, task, n_for_an: int) -> Tuple[str, str, bool]:
+        """-> (строка a_n при n=n_for_an, строка предела, предел == 0)"""
+        if analyzer.use_tables:
+            found = answer_tables.lookup(task, n_for_an)
+            if found is not None:
+                return found
+
+        num, den = task.rational_term()
+        if analyzer.use_exact:
+            an_value = exact.rational_value(num, den, n_for_an)
+            lim_value = exact.rational_limit(num, den)
+            if an_value is not None and lim_value is not None:
+                return exact.fraction_str(an_value), exact.fraction_str(lim_value), lim_value == 0
+
+        import sympy
+
+        n = sympy.symbols('n')
+        a_n = _a_n_formula(task, n)
+        lim = sympy.limit(a_n, n, sympy.oo)
+        return sympy.sstr(a_n.subs(n, n_for_an)), sympy.sstr(lim), lim == 0
+
+    def build_steps(self, analyzer, task, rng: random.Random) -> List[Dict[str, Any]]:
+        n_for_an = rng.randint(5, 15)
+        an_expr, lim_expr, lim_is_zero = self.answers(analyzer, task, n_for_an)
+        conv_text = "расходится" if not lim_is_zero else "неизвестно"
+
+        return [
+            {
+                "key": "an",
+                "type": "input",
+                "label": f"Значение a_n при n={n_for_an}",
+                "hint": "Подставьте n в формулу a_n.",
+                "points": 25,
+                "answer_expr": an_expr,
+            },
+            {
+                "key": "limit",
+                "type": "input",
+                "label": "Значение предела a_n",
+                "hint": "Найдите lim_{n→∞} a_n.",
+                "points": 35,
+                "answer_expr": lim_expr,
+            },
+            {
+                "key": "conv",
+                "type": "select",
+                "label": "Сходимость ряда ∑ a_n",
+                "hint": "Если lim a_n ≠ 0 — ряд расходится; если = 0 — вывод сделать нельзя.",
+                "points": 30,
+                "options": CONVERGENCE_OPTIONS,
+                "answer_text": conv_text,
+            },
+            {
+                "key": "justify",
+                "type": "select",
+                "label": "Обоснуйте ваш ответ",
+                "hint": "Выберите подходящее основание.",
+                "points": 10,
+                "options": JUSTIFY_OPTIONS,
+                "answer_text": "по необходимому условию сходимости",
+            },
+        ]
+
+    def analyze(self, analyzer, task, rng: random.Random) -> Optional[Dict[str, str]]:
+        import sympy
+
+        n = sympy.symbols('n')
+        a_n_formula = _a_n_formula(task, n)
+        limit_val = sympy.limit(a_n_formula, n, sympy.oo)
+        convergence = "расходится" if limit_val != 0 else "неизвестно"
+        n_for_an = rng.randint(5, 15)
+        return {
+            f"Значение a_n при n={n_for_an}": f"\\(a_{{{n_for_an}}} = {sympy.latex(a_n_formula.subs(n, n_for_an))}\\)",
+            "Значение предела": f"\\(\\lim_{{n \\to \\infty}} a_n = {sympy.latex(limit_val)}\\)",
+            "Сходимость": convergence,
+            "Обоснование": "по необходимому условию сходимости",
+        }
@@ -1,9 +1,12 @@
 # task_contracts.py
 from dataclasses import dataclass, field
+from typing import Optional
 
 @dataclass
 class BaseTask:
     task_type: str
+    # сид варианта: generate(seed=...) и build_steps по нему воспроизводятся
+    seed: Optional[int] = field(default=None, kw_only=True)
     def get_latex_formula(self) -> str:
         raise NotImplementedError
 
@@ -1,3 +1,218 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from . import answer_tables, budget
+from .analyzer import _equal_verdict, _formula_verdict
+from .answer_parser import sympy_input_ok
+from .grading_pool import VERDICT_OK, VERDICT_TOO_BIG
+from .registry import controller
+from .variants import task_class, topic_index
+from .verify import answers_agree, compare_steps, verify_topic
+
+# генераторы-нарушители для BudgetTests (модульный уровень: run_isolated импортирует их по пути)
+class RejectingGenerator:
+    """Цикл отбраковки, который никогда не находит подходящих параметров."""
+    def generate(self, **kwargs):
+        while True:
+            budget.attempt()
+
+
+class RunawayGenerator:
+    """Зависает и budget.attempt() не зовёт — остановить можно только снаружи."""
+    ISOLATE = True
+    MAX_SECONDS = 0.5
+
+    def generate(self, **kwargs):
+        while True:
+            pass
+
+
+# каждый STRIDE-й кортеж пространства параметров: полный перебор — manage.py verify_answers
+STRIDE = 37
+
+
+class VerifyMixin:
+    def assertAgreesWithSympy(self, topic_id, **kwargs):
+        report = verify_topic(topic_id, workers=0, **kwargs)
+        self.assertGreater(report["cases"], 0, f"{topic_id}: пустое пространство параметров")
+        self.assertEqual(report["mismatches"], [], f"{topic_id}: расхождения с sympy")
+
+
+class DifferentialVerificationTests(VerifyMixin, SimpleTestCase):
+    """Быстрые пути ответа (точное ядро, таблицы) должны совпадать с sympy."""
+
+    def test_series_class_1(self):
+        # пространство маленькое — перебираем целиком, с несколькими n для a_n/S_n
+        self.assertAgreesWithSympy("series_class_1", seeds=3)
+        self.assertAgreesWithSympy("series_class_1", complexity=15)
+
+    def test_series_class_2(self):
+        self.assertAgreesWithSympy("series_class_2", seeds=3)
+
+    def test_series_class_3(self):
+        self.assertAgreesWithSympy("series_class_3", stride=STRIDE)
+
+    def test_series_class_4(self):
+        self.assertAgreesWithSympy("series_class_4", stride=STRIDE)
+
+    def test_all_registered_topics_have_param_space(self):
+        for topic in controller.topics():
+            report = verify_topic(topic["id"], stride=10**6, workers=0)
+            self.assertEqual(report["cases"], 1, topic["id"])
+
+
+class VariantIndexTests(SimpleTestCase):
+    """Кортеж индекса = отдельный вариант: разные кортежи дают разные условия."""
+
+    def test_index_rows_render_distinct_formulas(self):
+        for topic in controller.topics():
+            generator_class = controller.get_generator(topic["id"])
+            for complexity in (None, generator_class.MAX_COMPLEXITY):
+                with self.subTest(topic["id"], complexity=complexity):
+                    cls = task_class(topic["id"], complexity)
+                    formulas = [cls(**params, seed=0).get_latex_formula() for params in topic_index(topic["id"], complexity)]
+                    self.assertEqual(len(formulas), len(set(formulas)))
+
+    def test_generated_params_are_index_rows(self):
+        # и поштучная, и пакетная выборка попадают в индекс (series_class_1 — сокращённые дроби)
+        for topic in controller.topics():
+            with self.subTest(topic["id"]):
+                index = topic_index(topic["id"], None)
+                rows = set(map(tuple, (p.values() for p in index)))
+                generator = controller.get_generator(topic["id"])()
+                tasks = [generator.generate(seed=s) for s in range(50)]
+                tasks += controller.create_tasks(topic["id"], n=50, seed=1)
+                for task in tasks:
+                    self.assertIn(tuple(getattr(task, name) for name in index.names), rows)
+
+
+class AnswerTableVerificationTests(VerifyMixin, SimpleTestCase):
+    """Путь через таблицы ответов (mmap): таблицы собираются во временный каталог."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tables = tempfile.mkdtemp(prefix="answer_tables_")
+        call_command("build_answer_tables", directory=cls.tables, stdout=StringIO())
+        cls.override = override_settings(ANSWER_TABLES_DIR=Path(cls.tables))
+        cls.override.enable()
+        answer_tables._loaded.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.override.disable()
+        answer_tables._loaded.clear()
+        shutil.rmtree(cls.tables, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_tables_agree_with_sympy(self):
+        for topic_id in answer_tables.TABLE_TOPICS:
+            with self.subTest(topic_id):
+                self.assertIsNotNone(answer_tables.get_table(topic_id), f"{topic_id}: таблица не открылась")
+                self.assertAgreesWithSympy(topic_id, stride=STRIDE)
+
+
+class CompareStepsTests(SimpleTestCase):
+    def test_answers_compared_by_value(self):
+        self.assertTrue(answers_agree("1/2", "0.5"))
+        self.assertTrue(answers_agree("2/4", "1/2"))
+        self.assertTrue(answers_agree("oo", "oo"))
+        self.assertFalse(answers_agree("1/3", "0.333"))
+        self.assertFalse(answers_agree(None, "0"))
+
+    def test_mismatch_reported(self):
+        ref = [
+            {"key": "an", "type": "input", "label": "a", "answer_expr": "1/8"},
+            {"key": "conv", "type": "select", "label": "c", "answer_text": "сходится"},
+        ]
+        self.assertEqual(compare_steps(ref, ref), [])
+
+        wrong_value = [dict(ref[0], answer_expr="1/16"), ref[1]]
+        self.assertEqual(len(compare_steps(wrong_value, ref)), 1)
+
+        wrong_text = [ref[0], dict(ref[1], answer_text="расходится")]
+        self.assertEqual(len(compare_steps(wrong_text, ref)), 1)
+
+        self.assertEqual(len(compare_steps(ref[:1], ref)), 1)
+
+        # то же значение, другая запись — студент увидит другую строку
+        other_string = [dict(ref[0], answer_expr="2/16"), ref[1]]
+        diffs = compare_steps(other_string, ref)
+        self.assertEqual(len(diffs), 1)
+        self.assertIn("запись ответа", diffs[0])
+
+
+@override_settings(GRADING_POOL={"ENABLED": False})
+class SlowPathGuardTests(SimpleTestCase):
+    """Без пула проверяющих тяжёлый ввод не доходит до sympy в веб-воркере."""
+
+    def test_guard(self):
+        for text in ("9**9**9", "9^9^9", "10^(10^10)", "2^(n*9**9**9)", "1e999", "100!", "factorial(10**6)"):
+            self.assertFalse(sympy_input_ok(text), text)
+        for text in ("2^n", "(1/2)^(n+1)", "2**64", "sqrt(2)/2", "n^2+3n", "2^-3", "pi/4"):
+            self.assertTrue(sympy_input_ok(text), text)
+
+    def test_power_tower_rejected_fast(self):
+        t0 = time.perf_counter()
+        self.assertEqual(_equal_verdict("9**9**9", "1/2"), (False, VERDICT_TOO_BIG))
+        step = {"type": "formula", "answer_expr": "2^n"}
+        self.assertEqual(_formula_verdict("2^(9**9**9)", step), (False, VERDICT_TOO_BIG))
+        self.assertLess(time.perf_counter() - t0, 1.0)
+
+    def test_symbolic_input_still_checked(self):
+        self.assertEqual(_equal_verdict("sqrt(4)/4", "1/2"), (True, VERDICT_OK))
+        self.assertEqual(_formula_verdict("2*2^(n-1)", {"type": "formula", "answer_expr": "2^n"}), (True, VERDICT_OK))
+
+
+@override_settings(GENERATION_BUDGET={"MAX_ATTEMPTS": 50, "MAX_SECONDS": 1.0})
+class BudgetTests(SimpleTestCase):
+    """Бюджет генерации срабатывает и вне главного потока (пул offload, фоновые доливки)."""
+
+    def setUp(self):
+        budget.generation_stats.reset()
+        for task_type, cls in (("budget_rejecting", RejectingGenerator), ("budget_runaway", RunawayGenerator)):
+            controller.register_generator(task_type, cls)
+            self.addCleanup(controller._generators.pop, task_type, None)
+            self.addCleanup(controller._labels.pop, task_type, None)
+
+    def create_in_thread(self, task_type):
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(controller.create_task, task_type, None).result(timeout=60)
+
+    def test_attempt_cap_in_worker_thread(self):
+        with self.assertRaises(budget.GenerationBudgetExceeded) as ctx:
+            self.create_in_thread("budget_rejecting")
+        self.assertEqual(ctx.exception.reason, "попытки")
+        stats = controller.generation_stats()["budget_rejecting"]
+        self.assertEqual((stats["attempts"], stats["failures"], stats["rejection_rate"]), (51, 1, 1.0))
+
+    @override_settings(GENERATION_BUDGET={"MAX_ATTEMPTS": 0, "MAX_SECONDS": 0.2})
+    def test_deadline_checked_per_attempt_in_worker_thread(self):
+        t0 = time.perf_counter()
+        with self.assertRaises(budget.GenerationBudgetExceeded) as ctx:
+            self.create_in_thread("budget_rejecting")
+        self.assertEqual(ctx.exception.reason, "время")
+        self.assertLess(time.perf_counter() - t0, 2.0)
+
+    def test_runaway_generator_killed_from_worker_thread(self):
+        t0 = time.perf_counter()
+        with self.assertRaises(budget.GenerationBudgetExceeded) as ctx:
+            self.create_in_thread("budget_runaway")
+        self.assertEqual(ctx.exception.reason, "время")
+        # запуск spawn-процесса + 0.5 s бюджета, а не вечность
+        self.assertLess(time.perf_counter() - t0, 30.0)
+        self.assertEqual(controller.generation_stats()["budget_runaway"]["failures"], 1)
+
+    def test_rejection_rate_of_real_topics(self):
+        controller.create_tasks("series_class_1", n=5, complexity=None, seed=1)
+        controller.create_task("series_class_2", None, seed=1)
+        stats = controller.generation_stats()
+        self.assertEqual((stats["series_class_1"]["attempts"], stats["series_class_1"]["rejection_rate"]), (5, 0.0))
+        self.assertEqual((stats["series_class_2"]["attempts"], stats["series_class_2"]["rejection_rate"]), (1, 0.0))
@@ -0,0 +1,32 @@
+# generator_app/topics.py
+"""
+Метаданные тем — единственное место, где тема связывается со своим генератором
+и стратегией анализатора. Здесь только строки: registry.py регистрирует темы
+по этому списку, а модули генераторов/стратегий (и numpy/sympy за ними)
+грузятся при первом обращении к теме, а не на старте воркера.
+
+Новая тема = новая строка здесь (label необязателен — по умолчанию id).
+"""
+
+TOPICS = (
+    {
+        "id": "series_class_1",
+        "generator": "generator_app.generators.series_generator_1.SeriesGeneratorClass1",
+        "strategy": "generator_app.strategies.geometric.SeriesClass1Strategy",
+    },
+    {
+        "id": "series_class_2",
+        "generator": "generator_app.generators.series_generator_2.SeriesGeneratorClass2",
+        "strategy": "generator_app.strategies.geometric.SeriesClass2Strategy",
+    },
+    {
+        "id": "series_class_3",
+        "generator": "generator_app.generators.series_generator_3.SeriesGeneratorClass3",
+        "strategy": "generator_app.strategies.rational.RationalTermStrategy",
+    },
+    {
+        "id": "series_class_4",
+        "generator": "generator_app.generators.series_generator_4.SeriesGeneratorClass4",
+        "strategy": "generator_app.strategies.rational.RationalTermStrategy",
+    },
+)
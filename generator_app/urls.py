@@ -1,8 +1,16 @@
 from django.urls import path
-from .views import index_view, GenerateTaskView, topics_api
+from .views import (
+    index_view, GenerateTaskView, GenerateTasksStreamView, generate_task_async,
+    topics_api, memory_stats_api, variant_pool_stats_api, generation_stats_api,
+)
 
 urlpatterns = [
     path("", index_view, name="index"),
     path("generate-task/", GenerateTaskView.as_view(), name="generate_task"),
+    path("generate-task/async/", generate_task_async, name="generate_task_async"),
+    path("generate-tasks/", GenerateTasksStreamView.as_view(), name="generate_tasks_stream"),
     path("api/topics/", topics_api, name="topics_api"),
+    path("api/memory/", memory_stats_api, name="memory_stats_api"),
+    path("api/variant-pool/", variant_pool_stats_api, name="variant_pool_stats_api"),
+    path("api/generation-stats/", generation_stats_api, name="generation_stats_api"),
 ]
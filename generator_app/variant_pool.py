@@ -0,0 +1,178 @@
+# generator_app/variant_pool.py
+"""
+Пул готовых вариантов для предпросмотра в конструкторе.
+
+Каждый клик «Сгенерировать» раньше синхронно генерировал задачу, строил шаги
+(sympy) и рендерил её. Здесь на процесс держится по deque готовых
+(task, steps, statement_html) на каждую пару (тема, сложность):
+  - view забирает вариант за O(1) (popleft);
+  - фоновый поток доливает очереди до DEPTH, как только что-то забрали
+    (и раз в REFILL_INTERVAL секунд на всякий случай);
+  - пустая очередь — промах: вариант строится прямо в запросе, а пара
+    (тема, сложность) запоминается, чтобы дальше её тоже доливать.
+Поток стартует лениво, при первом обращении к пулу (не в manage.py-командах).
+
+settings.VARIANT_POOL = {"ENABLED": True, "DEPTH": 4, "REFILL_INTERVAL": 5.0}
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .html_renderer import HTMLRenderer, task_html
+from .registry import controller
+from .seeding import resolve_seed
+from .variants import build_variant
+
+DEFAULTS = {"ENABLED": True, "DEPTH": 4, "REFILL_INTERVAL": 5.0}
+
+renderer = HTMLRenderer()
+
+Variant = Tuple[Any, List[Dict[str, Any]], str]   # (task, steps, statement_html)
+
+
+def pool_settings() -> Dict[str, Any]:
+    try:
+        from django.conf import settings
+        user = getattr(settings, "VARIANT_POOL", {}) if settings.configured else {}
+    except Exception:
+        user = {}
+    return {**DEFAULTS, **(user or {})}
+
+
+def make_variant(
+    topic_id: str, complexity: Optional[int], seed: Optional[int] = None, formula_steps: bool = False,
+) -> Optional[Variant]:
+    """Свежий вариант: задача, шаги и HTML условия. None — темы нет."""
+    built = build_variant(topic_id, complexity, resolve_seed(seed), formula_steps)
+    if built is None:
+        return None
+    task, steps = built
+    return task, steps, task_html(task, renderer)
+
+
+class VariantPool:
+    def __init__(self, depth: int = 4, refill_interval: float = 5.0):
+        self.depth = max(0, int(depth))
+        self.refill_interval = float(refill_interval)
+        self._queues: Dict[Tuple[str, Optional[int]], Deque[Variant]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.refilled = 0
+        self.refill_seconds = 0.0
+
+    # ---------- запрос ----------
+    def get(self, topic_id: str, complexity: Optional[int] = None) -> Optional[Variant]:
+        self._ensure_thread()
+        key = (topic_id, complexity)
+        with self._lock:
+            q = self._queues.get(key)
+            if q is None and controller.complexity_error(topic_id, complexity) is None:
+                # очередь заводим только под допустимую (тема, сложность): иначе клиент плодит очереди и индексы
+                q = self._queues[key] = deque()
+            variant = q.popleft() if q else None
+            if variant is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._wake.set()
+        if variant is None:
+            variant = make_variant(topic_id, complexity)
+        return variant
+
+    def warm(self, complexities=(None,), start: bool = True) -> None:
+        """
+        Заводит очереди для всех тем контроллера (долить их успеет фоновый поток).
+        start=False — без потока (прогрев до fork'а: поток поднимет воркер при первом get).
+        """
+        with self._lock:
+            for topic in controller.topics():
+                for complexity in complexities:
+                    self._queues.setdefault((topic["id"], complexity), deque())
+        if start:
+            self._ensure_thread()
+            self._wake.set()
+
+    # ---------- фоновая доливка ----------
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="variant-pool", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.refill_interval)
+            self._wake.clear()
+            try:
+                self.refill()
+            except Exception as e:
+                print(f"⚠️ Пул вариантов: ошибка доливки: {e}")
+
+    def refill(self) -> int:
+        """Доливает все очереди до depth; возвращает число добавленных вариантов."""
+        added = 0
+        with self._lock:
+            keys = list(self._queues.keys())
+        for key in keys:
+            while True:
+                with self._lock:
+                    if len(self._queues[key]) >= self.depth:
+                        break
+                t0 = time.perf_counter()
+                try:
+                    variant = make_variant(*key)
+                except Exception as e:
+                    # генератор падает на этом ключе — убираем его, чтобы не останавливать доливку остальных
+                    print(f"⚠️ Пул вариантов: {key[0]} (complexity={key[1]}) убран из доливки: {e}")
+                    with self._lock:
+                        self._queues.pop(key, None)
+                    break
+                dt = time.perf_counter() - t0
+                if variant is None:
+                    with self._lock:
+                        self._queues.pop(key, None)     # темы нет — не пытаемся снова
+                    break
+                with self._lock:
+                    self._queues[key].append(variant)
+                    self.refilled += 1
+                    self.refill_seconds += dt
+                added += 1
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "depth": self.depth,
+                "refill_interval": self.refill_interval,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "refilled": self.refilled,
+                "avg_refill_ms": round(1000 * self.refill_seconds / self.refilled, 2) if self.refilled else None,
+                "ready": {f"{t}:{c if c is not None else '-'}": len(q) for (t, c), q in self._queues.items()},
+            }
+
+
+_pool: Optional[VariantPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_variant_pool(start: bool = True) -> Optional[VariantPool]:
+    """Пул текущего процесса; None — выключен в настройках. start=False — см. VariantPool.warm."""
+    global _pool
+    conf = pool_settings()
+    if not conf["ENABLED"] or not conf["DEPTH"]:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = VariantPool(conf["DEPTH"], conf["REFILL_INTERVAL"])
+                _pool.warm(start=start)
+    return _pool
@@ -0,0 +1,74 @@
+# generator_app/variants.py
+"""
+Сборка варианта задачи по ключу (topic_id, complexity, seed).
+
+Вариант полностью определяется ключом, поэтому вместо полного payload'а
+достаточно хранить сид (например, TestAttempt.variant_seed + номер вопроса).
+Второй способ — явные параметры + сид шагов (build_variant_from_params):
+так выдаёт варианты распределитель exams/allocator.py.
+"""
+import dataclasses
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from .analyzer import TaskAnalyzer
+from .param_index import ParamSpaceIndex, get_index, space_size
+from .registry import controller
+from .seeding import derive_seed, variant_key  # noqa: F401  (реэкспорт для удобства)
+
+analyzer = TaskAnalyzer()
+formula_analyzer = TaskAnalyzer(formula_steps=True)    # вопросы с флагом formula_steps (exams: payload_json)
+
+
+def _analyzer(formula_steps: bool) -> TaskAnalyzer:
+    return formula_analyzer if formula_steps else analyzer
+
+
+def question_seed(variant_seed: int, order: int) -> int:
+    """Сид конкретного вопроса попытки из общего variant_seed."""
+    return derive_seed(variant_seed, order)
+
+
+def task_params(task) -> Dict[str, Any]:
+    """Параметры задачи без служебных полей: {"b": 2, "c": 5} — по ним различаются варианты."""
+    return {f.name: getattr(task, f.name) for f in dataclasses.fields(task) if f.name not in ("task_type", "seed")}
+
+
+def build_variant(
+    topic_id: str, complexity: Optional[int], seed: int, formula_steps: bool = False,
+) -> Optional[Tuple[Any, List[Dict[str, Any]]]]:
+    """-> (task, steps); None, если генератор для темы не найден. formula_steps — с шагами-формулами."""
+    task = controller.create_task(topic_id, complexity=complexity, seed=seed)
+    if task is None:
+        return None
+    return task, _analyzer(formula_steps).build_steps(topic_id, task, seed=seed)
+
+
+@lru_cache(maxsize=None)
+def task_class(topic_id: str, complexity: Optional[int]):
+    """Класс задачи темы (по пробной генерации с seed=0)."""
+    generator = controller.get_generator(topic_id)()
+    sample = generator.generate(seed=0) if complexity is None else generator.generate(complexity, seed=0)
+    return type(sample)
+
+
+def topic_index(topic_id: str, complexity: Optional[int]) -> Optional[ParamSpaceIndex]:
+    """Индекс пространства параметров темы; None — темы нет или param_space не объявлен."""
+    generator_class = controller.get_generator(topic_id)
+    return get_index(generator_class, complexity) if generator_class is not None else None
+
+
+def topic_space_size(topic_id: str, complexity: Optional[int]) -> Optional[int]:
+    """Сколько кортежей переберёт постройка индекса темы (без постройки); None — индекса нет."""
+    generator_class = controller.get_generator(topic_id)
+    return space_size(generator_class, complexity) if generator_class is not None else None
+
+
+def build_variant_from_params(
+    topic_id: str, complexity: Optional[int], params: Dict[str, Any], seed: int, formula_steps: bool = False,
+) -> Optional[Tuple[Any, List[Dict[str, Any]]]]:
+    """-> (task, steps) с заданными параметрами; seed — сид шагов (n для a_n и т.п.)."""
+    if controller.get_generator(topic_id) is None:
+        return None
+    task = task_class(topic_id, complexity)(**params, seed=seed)
+    return task, _analyzer(formula_steps).build_steps(topic_id, task, seed=seed)
@@ -0,0 +1,134 @@
+# generator_app/verify.py
+"""
+Дифференциальная проверка быстрых путей ответа против sympy.
+
+Для каждой темы перебирается пространство параметров генератора (param_index),
+по каждому кортежу строятся шаги двумя анализаторами:
+  - быстрый:   TaskAnalyzer()                 — точное ядро + таблицы ответов;
+  - эталонный: TaskAnalyzer(use_exact=False)  — только sympy, как было изначально;
+и сравниваются ключи шагов, answer_expr input-шагов и answer_text select-шагов.
+answer_expr сравнивается дважды: по значению (верен ли ключ) и по строке — студент
+видит именно строку, и "2/4" вместо "1/2" тоже расхождение, пусть и другого рода. Оба анализатора получают один и тот же сид шагов,
+так что n для a_n/S_n совпадают.
+
+Перебор режется на куски и идёт в пуле процессов; в отчёте — расхождения
+и суммарное время каждого пути.
+Запуск: manage.py verify_answers (полный перебор) или generator_app.tests (выборка).
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .answer_parser import parse_exact
+from .seeding import derive_seed
+from .variants import task_class, topic_index
+
+CHUNK_SIZE = 250
+
+
+def answers_agree(fast: Any, ref: Any) -> bool:
+    """Одинаковы ли два ожидаемых ответа по значению."""
+    if fast == ref:
+        return True
+    if fast is None or ref is None:
+        return False
+    fa, fr = parse_exact(fast), parse_exact(ref)
+    if fa is not None and fr is not None:
+        return fa == fr
+    from .analyzer import _sympy_equal_local
+    return _sympy_equal_local(fast, ref, tol=0)
+
+
+def compare_steps(fast: List[Dict[str, Any]], ref: List[Dict[str, Any]]) -> List[str]:
+    """Список расхождений между двумя наборами шагов (пустой — совпадают)."""
+    fast_keys, ref_keys = [s.get("key") for s in fast], [s.get("key") for s in ref]
+    if fast_keys != ref_keys:
+        return [f"шаги {fast_keys} != {ref_keys}"]
+    diffs = []
+    for fs, rs in zip(fast, ref):
+        key = fs.get("key")
+        if fs.get("type") != rs.get("type") or fs.get("label") != rs.get("label"):
+            diffs.append(f"{key}: тип/подпись шага различаются")
+        elif fs.get("type") == "select":
+            if fs.get("answer_text") != rs.get("answer_text"):
+                diffs.append(f"{key}: {fs.get('answer_text')!r} != {rs.get('answer_text')!r}")
+        elif not answers_agree(fs.get("answer_expr"), rs.get("answer_expr")):
+            diffs.append(f"{key}: {fs.get('answer_expr')!r} != {rs.get('answer_expr')!r}")
+        elif fs.get("answer_expr") != rs.get("answer_expr"):
+            diffs.append(f"{key}: запись ответа {fs.get('answer_expr')!r} != {rs.get('answer_expr')!r} "
+                         f"(по значению совпадают)")
+    return diffs
+
+
+def topic_cases(topic_id: str, complexity: Optional[int] = None, stride: int = 1) -> List[Dict[str, int]]:
+    """Кортежи параметров темы (каждый stride-й); пусто, если генератор не объявляет param_space."""
+    index = topic_index(topic_id, complexity)
+    if index is None:
+        return []
+    return [index.at(i) for i in range(0, len(index), max(1, int(stride)))]
+
+
+def _verify_chunk(args: Tuple[str, Optional[int], int, List[Tuple[int, Dict[str, int]]]]) -> Dict[str, Any]:
+    """Выполняется в процессе пула: сверка одного куска кортежей."""
+    from .analyzer import TaskAnalyzer
+
+    topic_id, complexity, seeds, cases = args
+    cls = task_class(topic_id, complexity)
+    fast, ref = TaskAnalyzer(), TaskAnalyzer(use_exact=False)
+    fast_time = ref_time = 0.0
+    steps = 0
+    mismatches = []
+    for i, params in cases:
+        for s in range(seeds):
+            task = cls(**params, seed=derive_seed("verify", topic_id, i, s))
+            t0 = time.perf_counter()
+            fast_steps = fast.build_steps(topic_id, task)
+            t1 = time.perf_counter()
+            ref_steps = ref.build_steps(topic_id, task)
+            t2 = time.perf_counter()
+            fast_time += t1 - t0
+            ref_time += t2 - t1
+            steps += len(ref_steps)
+            diffs = compare_steps(fast_steps, ref_steps)
+            if diffs:
+                mismatches.append({"params": params, "seed": task.seed, "diffs": diffs})
+    return {"cases": len(cases) * seeds, "steps": steps, "fast_seconds": fast_time,
+            "ref_seconds": ref_time, "mismatches": mismatches}
+
+
+def verify_topic(
+    topic_id: str,
+    *,
+    complexity: Optional[int] = None,
+    stride: int = 1,
+    seeds: int = 1,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Сверяет быстрый путь с sympy на пространстве параметров темы.
+    workers=0 — в текущем процессе, иначе ProcessPoolExecutor(max_workers=workers).
+    """
+    t0 = time.perf_counter()
+    cases = list(enumerate(topic_cases(topic_id, complexity, stride)))
+    chunks = [(topic_id, complexity, seeds, cases[i:i + CHUNK_SIZE]) for i in range(0, len(cases), CHUNK_SIZE)]
+
+    parts: List[Dict[str, Any]] = []
+    if workers == 0 or len(chunks) <= 1:
+        parts = [_verify_chunk(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_verify_chunk, chunks))
+
+    fast_time = sum(p["fast_seconds"] for p in parts)
+    ref_time = sum(p["ref_seconds"] for p in parts)
+    return {
+        "topic": topic_id,
+        "complexity": complexity,
+        "cases": sum(p["cases"] for p in parts),
+        "steps": sum(p["steps"] for p in parts),
+        "mismatches": [m for p in parts for m in p["mismatches"]],
+        "fast_seconds": round(fast_time, 3),
+        "ref_seconds": round(ref_time, 3),
+        "speedup": round(ref_time / fast_time, 1) if fast_time > 0 else None,
+        "wall_seconds": round(time.perf_counter() - t0, 3),
+    }
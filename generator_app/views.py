@@ -1,36 +1,27 @@
 # generator_app/views.py
 
 import json
+import time
 import traceback
-from django.http import JsonResponse
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.views import View
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_GET, require_POST
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import ensure_csrf_cookie
-from django.utils.html import escape
 
 from generator_app.registry import controller
-from .analyzer import TaskAnalyzer
-from .html_renderer import HTMLRenderer
-
-# Твои генераторы
-from .generators.series_generator_1 import SeriesGeneratorClass1
-from .generators.series_generator_2 import SeriesGeneratorClass2
-from .generators.series_generator_3 import SeriesGeneratorClass3
-from .generators.series_generator_4 import SeriesGeneratorClass4
-
-
-# --- Инициализация ядра/анализатора/рендерера ---
-analyzer = TaskAnalyzer()
-renderer = HTMLRenderer()
+from .budget import GenerationBudgetExceeded
+from .memory import get_watchdog
+from .seeding import derive_seed, resolve_seed
+from .offload import ExecutorBusy, preview_job, run_cpu
+from .variant_pool import get_variant_pool, make_variant
 
-# Регистрация генераторов (автоматически попадут в селект)
-controller.register_generator("series_class_1", SeriesGeneratorClass1)
-controller.register_generator("series_class_2", SeriesGeneratorClass2)
-controller.register_generator("series_class_3", SeriesGeneratorClass3)
-controller.register_generator("series_class_4", SeriesGeneratorClass4)
+# Генераторы сюда больше не импортируем: темы регистрируются в registry по topics.py,
+# а модули генераторов (и sympy за анализатором) грузятся при первой задаче темы.
 
 
 # ---------- API тем для селекта ----------
@@ -67,6 +58,38 @@ def topics_api(request):
     return JsonResponse({"topics": topics})
 
 
+# ---------- Память воркера (для мониторинга) ----------
+@require_GET
+@login_required
+def memory_stats_api(request):
+    """RSS текущего воркера, размер кэша sympy и состояние сторожа памяти."""
+    role = getattr(getattr(request.user, "userprofile", None), "role", None)
+    if role != "TEACHER" and not request.user.is_staff:
+        return JsonResponse({"error": "Доступ только для преподавателя"}, status=403)
+    return JsonResponse(get_watchdog().stats())
+
+
+@require_GET
+@login_required
+def variant_pool_stats_api(request):
+    """Глубина очередей, hit rate и время доливки пула вариантов этого воркера."""
+    role = getattr(getattr(request.user, "userprofile", None), "role", None)
+    if role != "TEACHER" and not request.user.is_staff:
+        return JsonResponse({"error": "Доступ только для преподавателя"}, status=403)
+    pool = get_variant_pool()
+    return JsonResponse({"enabled": pool is not None, **(pool.stats() if pool is not None else {})})
+
+
+@require_GET
+@login_required
+def generation_stats_api(request):
+    """По темам: попытки, доля отбраковки, провалы бюджета, средняя/макс. задержка генерации."""
+    role = getattr(getattr(request.user, "userprofile", None), "role", None)
+    if role != "TEACHER" and not request.user.is_staff:
+        return JsonResponse({"error": "Доступ только для преподавателя"}, status=403)
+    return JsonResponse({"topics": controller.generation_stats()})
+
+
 # ---------- Главная страница ----------
 @ensure_csrf_cookie
 def index_view(request):
@@ -93,39 +116,198 @@ class GenerateTaskView(View):
         if role != "TEACHER":
             return JsonResponse({"error": "Доступ только для преподавателя"}, status=403)
 
-        # Чтение payload
+        parsed = _parse_generate_body(request)
+        if isinstance(parsed, JsonResponse):
+            return parsed
+        task_type, complexity = parsed
+
+        # Готовый вариант из пула (или свежий, если пул пуст/выключен)
         try:
-            data = json.loads(request.body or "{}")
-        except json.JSONDecodeError:
-            return JsonResponse({"error": "Некорректный JSON"}, status=400)
+            html = preview_job(task_type, complexity)
+        except GenerationBudgetExceeded as e:
+            return JsonResponse({"error": str(e)}, status=503)
+        except Exception:
+            return _generation_error()
+        return _preview_response(task_type, html)
+
+
+def _parse_generate_body(request):
+    """body generate-task -> (task_type, complexity) или JsonResponse с ошибкой."""
+    try:
+        data = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Некорректный JSON"}, status=400)
 
-        task_type = data.get("task_type")
-        complexity = data.get("complexity")
+    task_type = data.get("task_type")
+    complexity = data.get("complexity")
 
-        if not task_type:
-            return JsonResponse({"error": "Не передан 'task_type'"}, status=400)
+    if not task_type:
+        return JsonResponse({"error": "Не передан 'task_type'"}, status=400)
 
-        # Генерация задачи через ядро
+    if complexity in (None, ""):
+        complexity = None
+    else:
         try:
-            task = controller.create_task(task_type, complexity=complexity)
-        except Exception:
-            # Если генератор внутри упал — вернём стек для дебага (можно скрыть в проде)
-            return JsonResponse(
-                {"error": "Ошибка генерации", "traceback": traceback.format_exc()},
-                status=500,
-            )
+            complexity = int(complexity)
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Некорректная 'complexity'"}, status=400)
+    if controller.get_generator(task_type) is None:
+        return JsonResponse({"error": f"Генератор '{task_type}' не найден"}, status=404)
+    error = controller.complexity_error(task_type, complexity)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+    return task_type, complexity
+
+
+def _generation_error():
+    # Если генератор внутри упал — вернём стек для дебага (можно скрыть в проде)
+    return JsonResponse(
+        {"error": "Ошибка генерации", "traceback": traceback.format_exc()},
+        status=500,
+    )
+
+
+def _preview_response(task_type, html):
+    if html is None:
+        return JsonResponse({"error": f"Генератор '{task_type}' не найден"}, status=404)
+    return JsonResponse({"html": html})
+
+
+def _user_role(user):
+    return getattr(getattr(user, "userprofile", None), "role", None)
+
+
+# ---------- То же, асинхронно (ASGI): генерация уходит в пул анализатора ----------
+@login_required
+@require_POST
+async def generate_task_async(request):
+    """
+    POST /generate-task/async/ — тот же контракт, что у /generate-task/.
+    Пока вариант строится в пуле (generator_app/offload.py), event loop свободен.
+    """
+    user = await request.auser()
+    if await sync_to_async(_user_role)(user) != "TEACHER":
+        return JsonResponse({"error": "Доступ только для преподавателя"}, status=403)
 
-        if task is None:
-            return JsonResponse({"error": f"Генератор '{task_type}' не найден"}, status=404)
+    parsed = _parse_generate_body(request)
+    if isinstance(parsed, JsonResponse):
+        return parsed
+    task_type, complexity = parsed
 
-        # Рендерим HTML. Если у HTMLRenderer другой интерфейс — подстрахуемся.
+    try:
+        html = await run_cpu(preview_job, task_type, complexity)
+    except ExecutorBusy:
+        return JsonResponse({"error": "Сервер занят, попробуйте ещё раз"}, status=503)
+    except GenerationBudgetExceeded as e:
+        return JsonResponse({"error": str(e)}, status=503)
+    except Exception:
+        return _generation_error()
+    return _preview_response(task_type, html)
+
+
+# ---------- Пакетная генерация потоком NDJSON (только TEACHER) ----------
+MAX_STREAM_TASKS = 500
+
+
+def _parse_mix(mix):
+    """{"тема": вес, ...} или ["тема", ...] -> [(тема, вес)]; ValueError при мусоре."""
+    if isinstance(mix, str):
+        mix = [mix]
+    if isinstance(mix, list):
+        mix = {t: 1 for t in mix}
+    if not isinstance(mix, dict) or not mix:
+        raise ValueError("Не передан 'mix'")
+    out = []
+    for topic_id, weight in mix.items():
+        weight = int(weight)
+        if weight < 0:
+            raise ValueError("Вес темы не может быть отрицательным")
+        if weight:
+            out.append((str(topic_id), weight))
+    if not out:
+        raise ValueError("Все веса нулевые")
+    return out
+
+
+def _mix_order(mix, count):
+    """
+    Темы по одной на задачу в пропорции весов, равномерно перемешанные
+    (smooth weighted round-robin): 3:1 -> a a b a a a b a ... Память O(числа тем).
+    """
+    total = sum(w for _, w in mix)
+    current = [0] * len(mix)
+    for _ in range(count):
+        for i, (_, w) in enumerate(mix):
+            current[i] += w
+        best = max(range(len(mix)), key=current.__getitem__)
+        current[best] -= total
+        yield mix[best][0]
+
+
+def _stream_tasks(mix, count, complexity, seed):
+    t0 = time.perf_counter()
+    ok = 0
+    for i, topic_id in enumerate(_mix_order(mix, count)):
+        line = {"index": i, "task_type": topic_id}
         try:
-            if hasattr(renderer, "render"):
-                html = renderer.render(task)
+            variant = make_variant(topic_id, complexity, derive_seed(seed, i))
+            if variant is None:
+                line["error"] = f"Генератор '{topic_id}' не найден"
             else:
-                # Совсем уж простой фоллбек
-                html = f"<div class='task-container'><pre>{escape(str(task))}</pre></div>"
-        except Exception:
-            html = f"<div class='task-container'><pre>{escape(str(task))}</pre></div>"
+                task, steps, html = variant
+                line.update({"seed": task.seed, "html": html, "steps": steps})
+                ok += 1
+        except Exception as e:
+            line["error"] = f"Ошибка генерации: {e}"
+        yield json.dumps(line, ensure_ascii=False) + "\n"
+    yield json.dumps({"done": True, "count": ok, "seed": seed,
+                      "seconds": round(time.perf_counter() - t0, 3)}) + "\n"
+
+
+@method_decorator(login_required, name="dispatch")
+class GenerateTasksStreamView(View):
+    """
+    POST /generate-tasks/
+    body: {"mix": {"series_class_1": 3, "series_class_3": 1} | ["series_class_1", ...],
+           "count": 50, "complexity": 10, "seed": 42}
+
+    Ответ — application/x-ndjson: по строке на задачу сразу, как она готова
+    ({"index", "task_type", "seed", "html", "steps"} или {"index", "task_type", "error"}),
+    последняя строка — {"done": true, "count", "seed", "seconds"}.
+    С тем же seed лист воспроизводится целиком. Доступ только для роли TEACHER.
+    """
+
+    def post(self, request, *args, **kwargs):
+        role = getattr(getattr(request.user, "userprofile", None), "role", None)
+        if role != "TEACHER":
+            return JsonResponse({"error": "Доступ только для преподавателя"}, status=403)
+
+        try:
+            data = json.loads(request.body or "{}")
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Некорректный JSON"}, status=400)
+
+        try:
+            mix = _parse_mix(data.get("mix") or data.get("task_type"))
+            count = int(data.get("count") or 1)
+            complexity = data.get("complexity")
+            complexity = None if complexity in (None, "") else int(complexity)
+            seed = resolve_seed(None if data.get("seed") in (None, "") else int(data["seed"]))
+        except (TypeError, ValueError) as e:
+            return JsonResponse({"error": str(e) or "Некорректные параметры"}, status=400)
+        if not 1 <= count <= MAX_STREAM_TASKS:
+            return JsonResponse({"error": f"'count' должен быть от 1 до {MAX_STREAM_TASKS}"}, status=400)
+
+        unknown = [t for t, _ in mix if t not in controller._generators]
+        if unknown:
+            return JsonResponse({"error": f"Генератор '{unknown[0]}' не найден"}, status=404)
+        for topic_id, _ in mix:
+            error = controller.complexity_error(topic_id, complexity)
+            if error:
+                return JsonResponse({"error": error}, status=400)
 
-        return JsonResponse({"html": html})
+        response = StreamingHttpResponse(_stream_tasks(mix, count, complexity, seed),
+                                         content_type="application/x-ndjson")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"     # nginx: не копить ответ в буфере
+        return response
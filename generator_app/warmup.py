@@ -0,0 +1,178 @@
+# generator_app/warmup.py
+"""
+Прогрев анализатора до fork'а воркеров (gunicorn --preload).
+
+Генераторы, sympy, индексы и таблицы ответов грузятся лениво, при первом обращении
+(реестр тем — generator_app/topics.py), так что первый экзаменационный запрос
+каждого воркера платит за импорт sympy, построение индексов параметров и т.п.
+Если прогреть это один раз в мастере до fork'а, воркеры получат готовое
+состояние copy-on-write, а память под него будет общей.
+
+Что греется (по порядку):
+  - sympy (+ парсер и latex) и numpy;
+  - генераторы и стратегии всех тем из topics.py;
+  - индексы параметров (param_index) для заданных сложностей;
+  - таблицы ответов (mmap);
+  - шаги: SAMPLES вариантов на (тема, сложность) через анализатор, ответы первого
+    варианта прогоняются через sympy-проверку (парсер, simplify, lambdify);
+  - опционально — пул вариантов (без фонового потока: поток поднимет уже воркер);
+  - gc.freeze(): прогретые объекты уходят из-под сборщика мусора, и он не трогает
+    их заголовки в воркерах (иначе страницы копируются при первом же gc).
+
+Включается settings.WARMUP["ON_READY"] или GENERATOR_WARMUP=1 в окружении
+(тогда в ready(), т.е. в мастере при --preload); замер — `manage.py warmup`.
+
+settings.WARMUP = {"ON_READY": False, "COMPLEXITIES": [None], "SAMPLES": 2,
+                   "VARIANT_POOL": True, "FREEZE_GC": True}
+"""
+import gc
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+DEFAULTS = {"ON_READY": False, "COMPLEXITIES": [None], "SAMPLES": 2, "VARIANT_POOL": True, "FREEZE_GC": True}
+
+
+def warmup_settings() -> Dict[str, Any]:
+    try:
+        from django.conf import settings
+        user = getattr(settings, "WARMUP", {}) if settings.configured else {}
+    except Exception:
+        user = {}
+    return {**DEFAULTS, **(user or {})}
+
+
+def enabled_on_ready() -> bool:
+    return bool(warmup_settings()["ON_READY"]) or os.environ.get("GENERATOR_WARMUP") == "1"
+
+
+class WarmupReport:
+    def __init__(self):
+        self.phases: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        """with report.phase("sympy") as detail: detail["..."] = ..."""
+        detail: Dict[str, Any] = {}
+        t0 = time.perf_counter()
+        try:
+            yield detail
+        except Exception as e:
+            detail["error"] = str(e)
+            print(f"⚠️ Прогрев: этап '{name}' упал: {e}")
+        self.phases.append({"name": name, "ms": round(1000 * (time.perf_counter() - t0), 1), **detail})
+
+    def as_dict(self) -> Dict[str, Any]:
+        from .memory import current_rss_mb
+
+        return {
+            "pid": os.getpid(),
+            "total_ms": round(1000 * (time.perf_counter() - self.started), 1),
+            "rss_mb": current_rss_mb(),
+            "phases": self.phases,
+        }
+
+
+def warm_up(
+    complexities: Optional[Sequence[Optional[int]]] = None,
+    samples: Optional[int] = None,
+    variant_pool: Optional[bool] = None,
+    freeze_gc: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Прогревает всё перечисленное в шапке модуля; -> отчёт {total_ms, rss_mb, phases: [...]}."""
+    conf = warmup_settings()
+    complexities = list(conf["COMPLEXITIES"] if complexities is None else complexities) or [None]
+    samples = int(conf["SAMPLES"] if samples is None else samples)
+    variant_pool = conf["VARIANT_POOL"] if variant_pool is None else variant_pool
+    freeze_gc = conf["FREEZE_GC"] if freeze_gc is None else freeze_gc
+
+    from .registry import controller
+
+    report = WarmupReport()
+    topic_ids = [t["id"] for t in controller.topics()]
+
+    with report.phase("sympy") as detail:
+        import sympy
+        from sympy.parsing import sympy_parser  # noqa: F401
+        from sympy.printing import latex  # noqa: F401
+        detail["version"] = sympy.__version__
+
+    with report.phase("numpy") as detail:
+        from .batch import get_numpy
+        np = get_numpy()
+        detail["version"] = np.__version__ if np is not None else None
+
+    with report.phase("topics") as detail:
+        loaded = [t for t in topic_ids
+                  if controller.get_generator(t) is not None and controller.get_strategy(t) is not None]
+        detail["topics"] = loaded
+
+    with report.phase("param_indexes") as detail:
+        from .param_index import get_index
+        rows = {}
+        for topic_id in topic_ids:
+            generator_class = controller.get_generator(topic_id)
+            for complexity in complexities:
+                index = get_index(generator_class, complexity) if generator_class is not None else None
+                if index is not None:
+                    rows[f"{topic_id}:{complexity if complexity is not None else '-'}"] = len(index)
+        detail["rows"] = rows
+
+    with report.phase("answer_tables") as detail:
+        from . import answer_tables
+        detail["opened"] = [t for t in answer_tables.TABLE_TOPICS if answer_tables.get_table(t) is not None]
+
+    with report.phase("steps") as detail:
+        detail["variants"] = _warm_steps(topic_ids, complexities, samples)
+
+    if variant_pool:
+        with report.phase("variant_pool") as detail:
+            from .variant_pool import get_variant_pool
+            pool = get_variant_pool(start=False)
+            if pool is not None:
+                pool.warm(complexities, start=False)
+                detail["added"] = pool.refill()
+            else:
+                detail["added"] = 0
+
+    if freeze_gc and hasattr(gc, "freeze"):
+        with report.phase("gc_freeze") as detail:
+            gc.collect()
+            gc.freeze()
+            detail["frozen"] = gc.get_freeze_count()
+
+    return report.as_dict()
+
+
+def _warm_steps(topic_ids: Sequence[str], complexities: Sequence[Optional[int]], samples: int) -> int:
+    """Варианты через анализатор; ответы первого — через локальную sympy-проверку (без пула)."""
+    from .analyzer import _sympy_equal_local
+    from .seeding import derive_seed
+    from .variants import build_variant
+
+    built = 0
+    for topic_id in topic_ids:
+        for complexity in complexities:
+            for i in range(max(0, samples)):
+                variant = build_variant(topic_id, complexity, derive_seed("warmup", topic_id, complexity, i))
+                if variant is None:
+                    break
+                built += 1
+                if i:
+                    continue
+                for step in variant[1]:
+                    if step.get("answer_expr") and step.get("type") == "input":
+                        _sympy_equal_local(step["answer_expr"], step["answer_expr"])
+    return built
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Короткий отчёт в лог (ready())."""
+    parts = ", ".join(f"{p['name']} {p['ms']:.0f} ms" for p in report["phases"])
+    print(f"🔥 Прогрев анализатора (pid={report['pid']}): {report['total_ms']:.0f} ms, "
+          f"RSS {report['rss_mb']} МБ — {parts}")
+    for p in report["phases"]:
+        if "error" in p:
+            print(f"   ⚠️ {p['name']}: {p['error']}")
@@ -51,6 +51,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'generator_app.middleware.MemoryWatchdogMiddleware',
 ]
 
 ROOT_URLCONF = 'task_project.urls'
@@ -80,6 +81,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # atomic() сразу берёт блокировку на запись: иначе чтение-потом-запись в транзакции
+        # при параллельной записи (фоновая доливка банка) падает "database is locked" без ожидания
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
@@ -128,6 +132,134 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 
+# Предвычисленные таблицы ответов (manage.py build_answer_tables), читаются через mmap
+ANSWER_TABLES_DIR = BASE_DIR / "answer_tables"
+
+# Медленные (sympy) проверки ответов — в отдельных процессах с лимитами времени/памяти.
+# По умолчанию выключено: sympy работает в веб-воркере, а заведомо тяжёлый ввод
+# (9**9**9, 100!) отклоняется до разбора — answer_parser.sympy_input_ok. В проде — включать.
+GRADING_POOL = {
+    "ENABLED": False,
+    "WORKERS": 2,
+    "TIMEOUT": 2.0,      # секунд на одну проверку
+    "MAX_RSS_MB": 1024,
+}
+
+# Мемо-кэш результатов sympy-проверок: (ожидаемый ответ, ввод) -> верно/неверно.
+# BACKEND="django" — общий для всех воркеров через CACHES[ALIAS].
+ANSWER_CACHE = {
+    "SIZE": 4096,
+    "BACKEND": "local",
+    "ALIAS": "default",
+    "TIMEOUT": 3600,
+}
+
+# Память воркера (generator_app/memory.py): лимит кэша sympy, периодическая чистка,
+# порог RSS. RECYCLE=True — воркер сам завершится (SIGTERM) после ответа, только под gunicorn.
+MEMORY_WATCHDOG = {
+    "SYMPY_CACHE_SIZE": 500,   # записей на каждую @cacheit-функцию sympy
+    "TRIM_EVERY": 200,         # запросов между проверками
+    "TRIM_ABOVE": 20000,       # чистить кэш sympy, если записей больше
+    "RSS_LIMIT_MB": 0,         # 0 — без порога
+    "RECYCLE": False,
+}
+
+# Пул готовых вариантов для предпросмотра в конструкторе (generator_app/variant_pool.py)
+VARIANT_POOL = {
+    "ENABLED": True,
+    "DEPTH": 4,              # готовых вариантов на (тема, сложность)
+    "REFILL_INTERVAL": 5.0,  # секунд между плановыми доливками (плюс доливка после каждого забора)
+}
+
+# Пул для CPU-работы анализатора в async-view (generator_app/offload.py).
+# KIND: "thread" или "process"; MAX_PENDING — сверх этого async-view отвечают 503.
+ANALYZER_EXECUTOR = {
+    "KIND": "thread",
+    "WORKERS": 4,
+    "MAX_PENDING": 64,
+}
+
+# Сборка всех вопросов попытки на её старте (exams/materialize.py).
+# PARALLEL — вопросы строятся в пуле ANALYZER_EXECUTOR, иначе по очереди в запросе.
+ATTEMPT_MATERIALIZE = {
+    "PARALLEL": True,
+}
+
+# Банк вариантов вопросов (exams/bank.py): собирается в Test.publish(), старт попытки забирает готовое.
+VARIANT_BANK = {
+    "ENABLED": True,
+    "SIZE": 30,              # на сколько слотов распределителя вперёд собирать варианты
+    "LOW_WATER": 10,         # собранных слотов впереди счётчика меньше — фоновая доливка ещё на SIZE
+    "BACKGROUND": True,      # False — доливка прямо в запросе старта
+}
+
+# Распределитель вариантов (exams/allocator.py): индекс параметров темы строится в запросе
+# старта попытки; полное пространство больше MAX_INDEX_ROWS — слоты только по сиду, без индекса.
+QUESTION_ALLOCATOR = {
+    "MAX_INDEX_ROWS": 200000,
+}
+
+# Буфер ответов (exams/answer_buffer.py): на пике экзамена ответы на шаги копятся в кэше
+# и пишутся в TestAnswer пачками раз в FLUSH_INTERVAL секунд; finish сбрасывает свою попытку сам.
+# Несброшенное теряется при падении процесса/кэша (гарантии — в шапке модуля).
+# LocMemCache — только для одного процесса; несколько воркеров — общий кэш (Redis/Memcached).
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "answer_buffer": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "answer-buffer",
+        "OPTIONS": {"MAX_ENTRIES": 100000},     # вытеснение несброшенного ответа = его потеря
+    },
+}
+ANSWER_BUFFER = {
+    "ENABLED": False,
+    "ALIAS": "answer_buffer",
+    "FLUSH_INTERVAL": 2.0,   # секунд между сбросами
+    "BATCH_SIZE": 500,       # записей журнала за одну транзакцию
+    "TIMEOUT": 3600,         # жизнь записи в кэше — с большим запасом над FLUSH_INTERVAL
+    "GAP_TIMEOUT": 30.0,     # запись журнала не появилась за это время — считается потерянной
+}
+
+# Перепроверка из API (exams/regrade.py): фоновое задание, проверка в WORKERS spawn-процессах.
+# Больше MAX_ATTEMPTS попыток — только `manage.py regrade_attempts`. Статус заданий — в CACHES[CACHE_ALIAS].
+REGRADE = {
+    "WORKERS": 2,
+    "MAX_ATTEMPTS": 500,
+    "BACKGROUND": True,      # False — прямо в запросе (тесты)
+    "CACHE_ALIAS": "default",
+    "JOB_TIMEOUT": 86400,    # сколько хранить статус и отчёт задания
+}
+
+# Бюджет генерации одной задачи (generator_app/budget.py): превысил — GenerationBudgetExceeded.
+# Генератор может переопределить лимиты атрибутами класса MAX_ATTEMPTS / MAX_SECONDS.
+GENERATION_BUDGET = {
+    "MAX_ATTEMPTS": 1000,    # попыток на задачу (budget.attempt()); проверка срока — на каждой попытке, в любом потоке
+    "MAX_SECONDS": 2.0,      # на задачу; в главном потоке — принудительно через SIGALRM
+    "IMPORT_SECONDS": 10.0,  # на импорт модуля при автопоиске генераторов
+    # найденные автопоиском генераторы вне главного потока — в отдельном процессе, который убивается по сроку
+    # (ISOLATE = True / False в классе генератора переопределяет)
+    "ISOLATE_DISCOVERED": True,
+}
+
+# Темы берутся из generator_app/topics.py, генераторы импортируются при первом обращении.
+# True — на старте дополнительно пробежать папку generators (темы не из topics.py).
+GENERATOR_AUTODISCOVER = False
+
+# Прогрев анализатора (generator_app/warmup.py): sympy, индексы параметров, таблицы ответов,
+# шаги и пул вариантов — один раз в мастере до fork'а воркеров (gunicorn --preload).
+# ON_READY=True (или GENERATOR_WARMUP=1 в окружении) — греть в AppConfig.ready();
+# без --preload каждый воркер будет греться сам. Замер: `manage.py warmup`.
+WARMUP = {
+    "ON_READY": False,
+    "COMPLEXITIES": [None],  # сложности, для которых строить индексы и варианты (None — по умолчанию)
+    "SAMPLES": 2,            # вариантов на (тема, сложность)
+    "VARIANT_POOL": True,    # заполнить пул вариантов конструктора
+    "FREEZE_GC": True,       # gc.freeze() в конце — чтобы gc воркеров не копировал общие страницы
+}
+
+# Бюджет холодного старта: `manage.py startup_profile` падает, если django.setup() + urls дольше.
+STARTUP_BUDGET_MS = 1500
+
 # Шаблоны: нужен корневой каталог templates/ (для _nav.html)
 # если у тебя ещё нет, добавь:
 from pathlib import Path